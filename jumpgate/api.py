@@ -1,5 +1,6 @@
-import importlib
+import collections
 import logging
+import threading
 
 import falcon
 import falcon.request
@@ -10,6 +11,7 @@ from jumpgate.common import dispatcher
 from jumpgate.common import error_handling
 from jumpgate.common import exceptions
 from jumpgate.common import hooks
+from jumpgate.common import metrics
 from jumpgate.common import nyi
 from jumpgate.common import utils
 from jumpgate.common import config
@@ -59,10 +61,35 @@ class Jumpgate(object):
 
         self._dispatchers = {}
         self._error_handlers = []
+        self._api = None
+
+        # (seconds, new modules) of the service and driver imports
+        self.import_times = collections.OrderedDict()
 
     def add_error_handler(self, ex, handler):
         if (ex, handler) not in self._error_handlers:
             self._error_handlers.insert(0, (ex, handler))
+            if self._api is not None:
+                # Registered by a driver loaded after the API was built
+                self._api.add_error_handler(
+                    ex, utils.wrap_handler_with_hooks(handler,
+                                                      self.after_hooks))
+
+    def import_module(self, name):
+        module, seconds, new_modules = utils.timed_import(name)
+        self.import_times[name] = (seconds, new_modules)
+        LOG.debug("Imported %s in %.3fs (%d new modules)",
+                  name, seconds, new_modules)
+        return module
+
+    def log_import_times(self):
+        total = 0
+        for name, (seconds, new_modules) in sorted(
+                self.import_times.items(), key=lambda i: i[1], reverse=True):
+            LOG.info("Import cost %-40s %.3fs (%d new modules)",
+                     name, seconds, new_modules)
+            total += seconds
+        LOG.info("Import cost total %.3fs", total)
 
     def make_api(self):
         LOG.info("GOT HERE JUMPGATE 2")
@@ -70,8 +97,14 @@ class Jumpgate(object):
         self.before_hooks.extend(self.hooks.optional_request_hooks())
         self.after_hooks.extend(self.hooks.optional_response_hooks())
 
+        # id(handler) -> endpoint template, the route of the hooks and metrics
+        routes = {}
+        middleware = [dispatcher.RouteMiddleware(routes)]
+        if config.getboolean('DEFAULT', 'enable_metrics', True):
+            middleware.append(metrics.MetricsMiddleware(routes))
+
         api = falcon.API(before=self.before_hooks, after=self.after_hooks,
-                         request_type=Request)
+                         request_type=Request, middleware=middleware)
 
         # Set the default route to the NYI object
         LOG.info("SELF: %s %s %s", self.default_route, self.before_hooks, self.after_hooks)
@@ -84,6 +117,8 @@ class Jumpgate(object):
                               handle_schema_validation_error),
                              (exceptions.ResponseException,
                               exceptions.ResponseException.handle),
+                             (exceptions.CachedResponse,
+                              exceptions.CachedResponse.handle),
                              (exceptions.InvalidTokenError,
                               exceptions.InvalidTokenError.handle)]
 
@@ -96,9 +131,12 @@ class Jumpgate(object):
         for _, disp in self._dispatchers.items():
             for endpoint, handler in disp.get_routes():
                 LOG.info("Loading endpoint %s %s", endpoint, handler)
+                routes.setdefault(id(handler), endpoint)
                 api.add_route(endpoint, handler)
                 api.add_route('%s.json' % endpoint, handler)
 
+        self._api = api
+        self.log_import_times()
         return api
 
     def add_dispatcher(self, service, disp):
@@ -118,7 +156,7 @@ class Jumpgate(object):
             enabled_services = self.config.get('DEFAULT','enabled_services').split(',')
             LOG.info("service %s enabled %s", service,enabled_services)
             if any(service in s for s in enabled_services):
-                service_module = importlib.import_module('jumpgate.' + service)
+                service_module = self.import_module('jumpgate.' + service)
 
                 # Import the dispatcher for the service
                 mount = self.config.get(service,'mount')
@@ -135,14 +173,127 @@ class Jumpgate(object):
             else:
                 self.installed_modules[service] = False
 
+    def load_metrics(self):
+        if not config.getboolean('DEFAULT', 'enable_metrics', True):
+            return
+        disp = dispatcher.Dispatcher()
+        disp.add_endpoint('metrics', '/metrics')
+        disp.set_handler('metrics', metrics.Metrics())
+        self.add_dispatcher('metrics', disp)
+
     def load_drivers(self):
         LOG.info("GOT HERE JUMPGATE 4")
 
+        lazy = config.getboolean('DEFAULT', 'lazy_drivers')
         for service, disp in self._dispatchers.items():
-            module = importlib.import_module(self.config.get(service,'driver'))
-
+            driver = LazyDriver(self, disp, self.config.get(service,'driver'))
+            if lazy:
+                driver.add_routes()
+            else:
+                driver.load()
+
+
+class LazyDriver(object):
+    """Imports a service driver and sets up its routes.
+
+    With lazy_drivers enabled every endpoint of the service is routed to
+    a LazyHandler and the driver is only imported by the first request to
+    one of them, so workers start without importing SoftLayer and the
+    handler modules of services they may never serve.
+    """
+
+    def __init__(self, app, disp, name):
+        self.app = app
+        self.disp = disp
+        self.name = name
+        self.loaded = False
+        # Hooks added by the driver after the API was built, which falcon
+        # doesn't know about
+        self.before_hooks = []
+        self.after_hooks = []
+        # Endpoints routed to a LazyHandler by add_routes
+        self.stubbed = []
+        self._lock = threading.Lock()
+
+    def add_routes(self):
+        for nickname in self.disp.get_unused_endpoints():
+            self.disp.set_handler(nickname, LazyHandler(self, nickname))
+            self.stubbed.append(nickname)
+
+    def load(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            before_hooks = list(self.app.before_hooks)
+            after_hooks = list(self.app.after_hooks)
+
+            # Drivers fill the unused endpoints, like the OpenStack proxy
+            for nickname in self.stubbed:
+                self.disp.set_handler(nickname, None)
+
+            module = self.app.import_module(self.name)
             if hasattr(module, 'setup_routes'):
-                module.setup_routes(self, disp)
+                module.setup_routes(self.app, self.disp)
+
+            for nickname in self.disp.get_unused_endpoints():
+                if nickname in self.stubbed:
+                    self.disp.set_handler(nickname,
+                                          LazyHandler(self, nickname))
+
+            if self.app._api is not None:
+                self.before_hooks = [hook for hook in self.app.before_hooks
+                                     if hook not in before_hooks]
+                self.after_hooks = [hook for hook in self.app.after_hooks
+                                    if hook not in after_hooks]
+                LOG.info("Loaded driver %s in %.3fs", self.name,
+                         self.app.import_times[self.name][0])
+            self.loaded = True
+
+    def dispatch(self, nickname, method, req, resp, params):
+        self.load()
+        for hook in self.before_hooks:
+            hook(req, resp, params)
+
+        handler = self.disp.get_handler(nickname)
+        if isinstance(handler, LazyHandler):
+            # The driver doesn't implement this endpoint
+            error_handling.not_implemented(resp, 'Not Implemented',
+                                           details='Not Implemented')
+        else:
+            responder = getattr(handler, 'on_' + method.lower(), None)
+            if responder is not None:
+                responder(req, resp, **params)
+            else:
+                allowed = [m for m in falcon.HTTP_METHODS
+                           if hasattr(handler, 'on_' + m.lower())]
+                if method != 'OPTIONS':
+                    raise falcon.HTTPMethodNotAllowed(allowed)
+                resp.status = falcon.HTTP_204
+                resp.set_header('Allow', ', '.join(allowed))
+
+        for hook in self.after_hooks:
+            hook(req, resp)
+
+
+class LazyHandler(object):
+    """Stand-in handler routing every method to a LazyDriver."""
+
+    def __init__(self, driver, nickname):
+        self.driver = driver
+        self.nickname = nickname
+
+
+def _lazy_responder(method):
+    def responder(self, req, resp, **kwargs):
+        self.driver.dispatch(self.nickname, method, req, resp, kwargs)
+    responder.__name__ = 'on_' + method.lower()
+    return responder
+
+
+for _method in falcon.HTTP_METHODS:
+    setattr(LazyHandler, 'on_' + _method.lower(), _lazy_responder(_method))
 
 
 def handle_unexpected_errors(ex, req, resp, params):
@@ -0,0 +1,8 @@
+"""Benchmarks of Jumpgate's own overhead against a simulated SoftLayer API.
+
+Run with::
+
+    python -m jumpgate.benchmark --guests 500 --latency 0.05
+
+See runner.main() for the options.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from jumpgate.benchmark import runner
+
+sys.exit(runner.main())
@@ -0,0 +1,397 @@
+"""A local stand-in for the SoftLayer API.
+
+FakeSoftLayer generates an account with a configurable number of guests,
+images, volumes and VLANs and answers the API methods Jumpgate's handlers
+use. FakeSoftLayerServer serves it over XML-RPC (and the REST transport's
+JSON) with a fixed latency per call and counts the calls per method, so a
+benchmark can report how many upstream calls each endpoint costs.
+"""
+import BaseHTTPServer
+import collections
+import json
+import SocketServer
+import threading
+import time
+import urlparse
+import xmlrpclib
+
+ACCOUNT_ID = 1000
+USER_ID = 2000
+USERNAME = 'benchmark'
+API_KEY = 'a' * 64
+PASSWORD = 'password'
+TOKEN_HASH = 'f' * 32
+
+DATE = '2014-01-01T00:00:00-06:00'
+
+
+class Fault(Exception):
+    def __init__(self, code, message):
+        super(Fault, self).__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _make_guests(count, images):
+    guests = []
+    for i in range(count):
+        guest_id = 100000 + i
+        guest = {
+            'id': guest_id,
+            'accountId': ACCOUNT_ID,
+            'hostname': 'guest%d' % i,
+            'domain': 'example.com',
+            'fullyQualifiedDomainName': 'guest%d.example.com' % i,
+            'createDate': DATE,
+            'modifyDate': DATE,
+            'provisionDate': DATE,
+            'maxCpu': 1 + i % 4,
+            'maxMemory': 1024 * (1 + i % 4),
+            'status': {'keyName': 'ACTIVE', 'name': 'Active'},
+            'powerState': {'keyName': 'RUNNING', 'name': 'Running'},
+            'datacenter': {'id': 1, 'name': 'dal05'},
+            'primaryIpAddress': '10.%d.%d.%d' % (i // 65536 % 256,
+                                                 i // 256 % 256, i % 256),
+            'primaryBackendIpAddress': '192.168.%d.%d' % (i // 256 % 256,
+                                                          i % 256),
+            'sshKeys': [],
+            'tagReferences': [],
+            'userData': [],
+            'operatingSystem': {
+                'softwareLicense': {
+                    'softwareDescription': {'referenceCode': 'UBUNTU_14_64'},
+                },
+            },
+        }
+        if images:
+            guest['blockDeviceTemplateGroup'] = {
+                'globalIdentifier': images[i % len(images)]['globalIdentifier']
+            }
+        guests.append(guest)
+    return guests
+
+
+def _make_images(count, private):
+    images = []
+    for i in range(count):
+        images.append({
+            'id': (20000 if private else 10000) + i,
+            'globalIdentifier': '%08d-0000-0000-0000-%012d' % (
+                int(private), i),
+            'name': '%s image %d' % ('private' if private else 'public', i),
+            'accountId': ACCOUNT_ID if private else 1,
+            # Larger than an XML-RPC int, the API sends it as a double
+            'blockDevicesDiskSpaceTotal': float(25 * 1024 ** 3),
+            'createDate': DATE,
+            'status': {'keyName': 'ACTIVE', 'name': 'Active'},
+            'parentId': None,
+            'flexImageFlag': False,
+        })
+    return images
+
+
+def _make_volumes(count, guests):
+    volumes = []
+    for i in range(count):
+        volume = {
+            'id': 300000 + i,
+            'name': 'volume%d' % i,
+            'description': 'benchmark volume %d' % i,
+            'capacity': 25 + i % 4 * 25,
+            'units': 'GB',
+            'typeId': 241,
+            'localDiskFlag': False,
+            'createDate': DATE,
+            'blockDevices': [],
+            'storageRepository': {'datacenter': {'name': 'dal05'}},
+            'billingItem': {'id': 400000 + i,
+                            'location': {'name': 'dal05'}},
+        }
+        if guests and i % 2 == 0:
+            guest = guests[i % len(guests)]
+            volume['blockDevices'] = [{
+                'id': 500000 + i,
+                'guestId': guest['id'],
+                'device': '2',
+                'bootableFlag': 0,
+                'guest': {'id': guest['id'],
+                          'fullyQualifiedDomainName':
+                          guest['fullyQualifiedDomainName']},
+            }]
+        volumes.append(volume)
+    return volumes
+
+
+def _make_vlans(count):
+    vlans = []
+    for i in range(count):
+        vlans.append({
+            'id': 600000 + i,
+            'name': 'vlan%d' % i,
+            'vlanNumber': 1000 + i,
+            'networkSpace': 'PRIVATE' if i % 2 else 'PUBLIC',
+            'subnets': [{'id': 700000 + i}],
+        })
+    return vlans
+
+
+def _make_subnets(vlans):
+    subnets = []
+    for i, vlan in enumerate(vlans):
+        for subnet in vlan['subnets']:
+            subnets.append({
+                'id': subnet['id'],
+                'networkVlanId': vlan['id'],
+                'networkIdentifier': '10.%d.%d.0' % (i // 256, i % 256),
+                'cidr': 24,
+                'netmask': '255.255.255.0',
+                'gateway': '10.%d.%d.1' % (i // 256, i % 256),
+                'broadcastAddress': '10.%d.%d.255' % (i // 256, i % 256),
+                'version': 4,
+                'modifyDate': DATE,
+            })
+    return subnets
+
+
+def _match(value, condition):
+    if not isinstance(condition, dict) or 'operation' not in condition:
+        return True
+    operation = condition['operation']
+    if operation == 'in':
+        for option in condition.get('options', []):
+            if option.get('name') == 'data':
+                return value in option.get('value', [])
+        return True
+    if isinstance(operation, basestring):
+        for prefix, compare in (('> ', lambda a, b: a > b),
+                                ('< ', lambda a, b: a < b)):
+            if operation.startswith(prefix):
+                try:
+                    return compare(value, int(operation[2:]))
+                except (TypeError, ValueError):
+                    return True
+        if operation.startswith('_= '):
+            return str(value) == operation[3:]
+    if isinstance(operation, (int, long)) or (
+            isinstance(operation, basestring) and operation.isdigit()):
+        return str(value) == str(operation)
+    # Other operations aren't simulated, they never exclude anything
+    return True
+
+
+def apply_filter(items, object_filter):
+    """Apply the simple id/name conditions of an object filter."""
+    if not object_filter:
+        return items
+    conditions = {}
+    for value in object_filter.values():
+        if isinstance(value, dict):
+            conditions.update(value)
+    for field, condition in conditions.items():
+        if isinstance(condition, dict) and 'operation' in condition:
+            items = [item for item in items
+                     if _match(item.get(field), condition)]
+    return items
+
+
+class FakeSoftLayer(object):
+    """The account and API methods simulated for a benchmark run."""
+
+    def __init__(self, guests=100, images=20, volumes=50, vlans=10):
+        self.public_images = _make_images(images, private=False)
+        self.private_images = _make_images(images, private=True)
+        self.guests = _make_guests(guests, self.private_images)
+        self.volumes = _make_volumes(volumes, self.guests)
+        self.vlans = _make_vlans(vlans)
+        self.subnets = _make_subnets(self.vlans)
+        self.user = {'id': USER_ID, 'username': USERNAME,
+                     'accountId': ACCOUNT_ID}
+
+        self.methods = {
+            ('SoftLayer_Account', 'getCurrentUser'): self.get_current_user,
+            ('SoftLayer_Account', 'getObject'): self.get_account,
+            ('SoftLayer_Account', 'getVirtualGuests'):
+                self._lister('guests'),
+            ('SoftLayer_Account', 'getPrivateBlockDeviceTemplateGroups'):
+                self._lister('private_images'),
+            ('SoftLayer_Account', 'getVirtualDiskImages'):
+                self._lister('volumes'),
+            ('SoftLayer_Account', 'getNetworkVlans'): self._lister('vlans'),
+            ('SoftLayer_Account', 'getSubnets'): self._lister('subnets'),
+            ('SoftLayer_Virtual_Guest_Block_Device_Template_Group',
+             'getPublicImages'): self._lister('public_images'),
+            ('SoftLayer_Virtual_Guest_Block_Device_Template_Group',
+             'getObject'): self._getter('public_images', 'private_images'),
+            ('SoftLayer_Virtual_Guest', 'getObject'): self._getter('guests'),
+            ('SoftLayer_Virtual_Disk_Image', 'getObject'):
+                self._getter('volumes'),
+            ('SoftLayer_Network_Vlan', 'getObject'): self._getter('vlans'),
+            ('SoftLayer_Network_Subnet', 'getObject'):
+                self._getter('subnets'),
+            ('SoftLayer_User_Customer', 'getPortalLoginToken'):
+                self.get_portal_login_token,
+        }
+
+    def call(self, service, method, headers, args):
+        """Return the result of a call as (value, total_items)."""
+        handler = self.methods.get((service, method))
+        if handler is None:
+            raise Fault('SoftLayer_Exception_MethodNotFound',
+                        '%s::%s is not simulated' % (service, method))
+        result = handler(headers, args)
+        if isinstance(result, list):
+            total = len(result)
+            limit = headers.get('resultLimit')
+            if limit:
+                offset = int(limit.get('offset') or 0)
+                result = result[offset:offset + int(limit['limit'])]
+            return result, total
+        return result, None
+
+    def get_current_user(self, headers, args):
+        return self.user
+
+    def get_account(self, headers, args):
+        return {'id': ACCOUNT_ID, 'companyName': 'Benchmark'}
+
+    def get_portal_login_token(self, headers, args):
+        if args[:2] != [USERNAME, PASSWORD]:
+            raise Fault('SoftLayer_Exception_User_Customer_LoginFailed',
+                        'Invalid username/password')
+        return {'userId': USER_ID, 'hash': TOKEN_HASH}
+
+    def _lister(self, *names):
+        def list_objects(headers, args):
+            items = []
+            for name in names:
+                items.extend(getattr(self, name))
+            for key, value in headers.items():
+                if key.endswith('ObjectFilter'):
+                    items = apply_filter(items, value)
+            return items
+        return list_objects
+
+    def _getter(self, *names):
+        def get_object(headers, args):
+            init = [value for key, value in headers.items()
+                    if key.endswith('InitParameters')]
+            object_id = init[0].get('id') if init else None
+            for name in names:
+                for item in getattr(self, name):
+                    if str(object_id) in (str(item['id']),
+                                          item.get('globalIdentifier')):
+                        return item
+            raise Fault('SoftLayer_Exception_ObjectNotFound',
+                        'Unable to find object with id of \'%s\'.'
+                        % object_id)
+        return get_object
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so the transport pool is exercised
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        params, method = xmlrpclib.loads(body)
+        service = self.path.rstrip('/').split('/')[-1]
+        headers = params[0].get('headers', {}) if params else {}
+        try:
+            result, total = self.server.dispatch(service, method, headers,
+                                                 list(params[1:]))
+            payload = xmlrpclib.dumps((result,), methodresponse=True,
+                                      allow_none=True)
+        except Fault as e:
+            total = None
+            payload = xmlrpclib.dumps(xmlrpclib.Fault(e.code, e.message),
+                                      methodresponse=True)
+        except Exception as e:
+            total = None
+            payload = xmlrpclib.dumps(
+                xmlrpclib.Fault('SoftLayer_Exception', str(e)),
+                methodresponse=True)
+        self._respond(200, 'text/xml', payload, total)
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        parts = url.path.rstrip('/').split('/')
+        service, method = parts[-2], parts[-1].split('.')[0]
+        query = urlparse.parse_qs(url.query)
+        headers = {}
+        if 'resultLimit' in query:
+            offset, limit = query['resultLimit'][0].split(',')
+            headers['resultLimit'] = {'offset': offset, 'limit': limit}
+        if 'objectFilter' in query:
+            headers[service + 'ObjectFilter'] = json.loads(
+                query['objectFilter'][0])
+        if method.isdigit():
+            headers[service + 'InitParameters'] = {'id': method}
+            method = 'getObject'
+        try:
+            result, total = self.server.dispatch(service, method, headers, [])
+            self._respond(200, 'application/json', json.dumps(result), total)
+        except Fault as e:
+            self._respond(404, 'application/json',
+                          json.dumps({'error': e.message, 'code': e.code}))
+
+    def _respond(self, status, content_type, payload, total=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        if total is not None:
+            self.send_header('SoftLayer-Total-Items', str(total))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeSoftLayerServer(SocketServer.ThreadingMixIn,
+                          BaseHTTPServer.HTTPServer):
+    """Serves a FakeSoftLayer on a local port in a background thread.
+
+    :param latency: Seconds every call is delayed by, to simulate the
+                    round trip to the real API.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fake, latency=0.0, host='127.0.0.1', port=0):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port), _Handler)
+        self.fake = fake
+        self.latency = latency
+        self.calls = collections.Counter()
+        self._calls_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def endpoint_url(self):
+        return 'http://%s:%s/xmlrpc/v3' % self.server_address
+
+    @property
+    def rest_endpoint_url(self):
+        return 'http://%s:%s/rest/v3' % self.server_address
+
+    def dispatch(self, service, method, headers, args):
+        with self._calls_lock:
+            self.calls['%s::%s' % (service, method)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.fake.call(service, method, headers, args)
+
+    def get_calls(self):
+        with self._calls_lock:
+            return collections.Counter(self.calls)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='fake-softlayer')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,261 @@
+"""Drive representative workloads through Jumpgate and report the cost.
+
+The WSGI app built by wsgi.make_api is called in-process, so the numbers
+cover Jumpgate's own request handling plus the simulated SoftLayer round
+trips, without any HTTP server in front of it.
+"""
+from __future__ import print_function
+import argparse
+import collections
+import ConfigParser
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from falcon.testing import helpers
+
+from jumpgate.benchmark import fake_softlayer
+from jumpgate.common.sl import pool
+from jumpgate import wsgi
+
+Workload = collections.namedtuple('Workload',
+                                  ['name', 'service', 'method', 'path',
+                                   'body'])
+
+# A 64 character password is taken as an API key
+TOKEN_BODY = {'auth': {'passwordCredentials': {
+    'username': fake_softlayer.USERNAME,
+    'password': fake_softlayer.API_KEY}}}
+
+WORKLOADS = collections.OrderedDict((w.name, w) for w in [
+    Workload('token_issue', 'identity', 'POST', '/v2.0/tokens', TOKEN_BODY),
+    Workload('token_validate', 'identity', 'GET', '/v2.0/tokens/{token_id}',
+             None),
+    Workload('servers_detail', 'compute', 'GET',
+             '/compute/v2/{tenant_id}/servers/detail', None),
+    Workload('images_list', 'image', 'GET', '/image/v2/images', None),
+    Workload('volumes_list', 'volume', 'GET',
+             '/volume/v1/{tenant_id}/volumes/detail', None),
+    Workload('networks_list', 'network', 'GET', '/network/v2.0/networks',
+             None),
+    Workload('subnets_list', 'network', 'GET', '/network/v2.0/subnets',
+             None),
+])
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of the sorted values."""
+    if not values:
+        return 0.0
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(rank - 1, 0)]
+
+
+class Result(object):
+    def __init__(self, workload, latencies, errors, elapsed, calls):
+        self.workload = workload
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        # SoftLayer calls made by the workload, by service::method
+        self.calls = calls
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def calls_per_request(self):
+        if not self.requests:
+            return 0.0
+        return float(sum(self.calls.values())) / self.requests
+
+    def percentile(self, percent):
+        return percentile(self.latencies, percent)
+
+
+class Benchmark(object):
+    """Runs workloads against a Jumpgate app backed by a fake SoftLayer."""
+
+    def __init__(self, app, server, tenant_id=fake_softlayer.ACCOUNT_ID):
+        self.app = app
+        self.server = server
+        self.tenant_id = tenant_id
+        self.token_id = None
+
+    def login(self):
+        """Issue a token used by the following requests."""
+        status, body = self.request(WORKLOADS['token_issue'])
+        if not status.startswith('2'):
+            raise RuntimeError('Unable to issue a token: %s %s'
+                               % (status, body))
+        self.token_id = json.loads(body)['access']['token']['id']
+        return self.token_id
+
+    def request(self, workload):
+        """Send one request of the workload, returns (status, body)."""
+        path = workload.path.format(tenant_id=self.tenant_id,
+                                    token_id=self.token_id)
+        headers = {'Content-Type': 'application/json'}
+        if self.token_id:
+            headers['X-Auth-Token'] = self.token_id
+        body = json.dumps(workload.body) if workload.body else ''
+        env = helpers.create_environ(path=path, method=workload.method,
+                                     headers=headers, body=body)
+
+        status = []
+
+        def start_response(resp_status, resp_headers, exc_info=None):
+            status.append(resp_status)
+
+        resp_body = ''.join(self.app(env, start_response))
+        return status[0], resp_body
+
+    def run(self, workload, requests, concurrency=1):
+        """Send requests of the workload from concurrent threads."""
+        latencies = []
+        errors = collections.Counter()
+        remaining = [requests]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                start = time.time()
+                status, _ = self.request(workload)
+                latency = time.time() - start
+                with lock:
+                    latencies.append(latency)
+                    if not status.startswith('2'):
+                        errors[status] += 1
+
+        calls = self.server.get_calls()
+        start = time.time()
+        threads = [threading.Thread(target=worker)
+                   for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+        calls = self.server.get_calls() - calls
+        return Result(workload, latencies, errors, elapsed, calls)
+
+
+def format_report(results):
+    lines = ['%-16s %8s %7s %9s %9s %9s %9s' % (
+        'workload', 'requests', 'errors', 'req/s', 'p50 ms', 'p99 ms',
+        'SL/req')]
+    for result in results:
+        lines.append('%-16s %8d %7d %9.1f %9.2f %9.2f %9.2f' % (
+            result.workload.name,
+            result.requests,
+            sum(result.errors.values()),
+            result.throughput,
+            result.percentile(50) * 1000,
+            result.percentile(99) * 1000,
+            result.calls_per_request))
+    lines.append('')
+    lines.append('SoftLayer calls per request:')
+    for result in results:
+        for call, count in sorted(result.calls.items()):
+            lines.append('  %-16s %-60s %6.2f' % (
+                result.workload.name, call,
+                float(count) / (result.requests or 1)))
+        for status, count in sorted(result.errors.items()):
+            lines.append('  %-16s %-60s %6d' % (result.workload.name,
+                                                'error ' + status, count))
+    return '\n'.join(lines)
+
+
+def write_config(path, endpoint_url, services):
+    """Write the jumpgate.conf overrides pointing Jumpgate at the fake.
+
+    Identity is always enabled, the other workloads being measured with
+    the token validation of auth_token.
+    """
+    parser = ConfigParser.RawConfigParser()
+    parser.set('DEFAULT', 'enabled_services',
+               ', '.join(sorted(set(services) | set(['identity']))))
+    # Skip per-request logging, it would dominate the measurements
+    parser.set('DEFAULT', 'request_hooks', 'auth_token')
+    parser.set('DEFAULT', 'response_hooks', 'core')
+    parser.add_section('softlayer')
+    parser.set('softlayer', 'endpoint', endpoint_url)
+    with open(path, 'w') as f:
+        parser.write(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark Jumpgate against a simulated SoftLayer API.')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help='comma separated workloads, one of %s'
+                             % ', '.join(WORKLOADS))
+    parser.add_argument('--requests', type=int, default=100,
+                        help='requests per workload')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='concurrent clients')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='unmeasured requests per workload first')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every SoftLayer call')
+    parser.add_argument('--guests', type=int, default=100)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--volumes', type=int, default=50)
+    parser.add_argument('--vlans', type=int, default=10)
+    parser.add_argument('--rest', action='store_true',
+                        help='use the REST instead of the XML-RPC endpoint')
+    args = parser.parse_args()
+
+    workloads = [WORKLOADS[name.strip()]
+                 for name in args.workloads.split(',')]
+    services = set(workload.service for workload in workloads)
+
+    fake = fake_softlayer.FakeSoftLayer(guests=args.guests,
+                                        images=args.images,
+                                        volumes=args.volumes,
+                                        vlans=args.vlans)
+    server = fake_softlayer.FakeSoftLayerServer(fake, latency=args.latency)
+    server.start()
+
+    fd, config_path = tempfile.mkstemp(suffix='.conf')
+    os.close(fd)
+    try:
+        write_config(config_path,
+                     server.rest_endpoint_url if args.rest
+                     else server.endpoint_url,
+                     services)
+        benchmark = Benchmark(wsgi.make_api(config_path), server)
+        benchmark.login()
+
+        results = []
+        for workload in workloads:
+            for _ in range(args.warmup):
+                benchmark.request(workload)
+            results.append(benchmark.run(workload, args.requests,
+                                         args.concurrency))
+        print(format_report(results))
+    finally:
+        os.remove(config_path)
+        # Close the keep-alive connections before the server goes away
+        pool.reset()
+        server.stop()
+
+    # Numbers of failing requests don't measure anything
+    errors = sum(sum(result.errors.values()) for result in results)
+    if errors:
+        print('%d requests failed' % errors, file=sys.stderr)
+        return 1
+    return 0
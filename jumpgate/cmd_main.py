@@ -1,13 +1,71 @@
 from __future__ import print_function
 import argparse
+import multiprocessing
 import os
 from wsgiref import simple_server
 
 from jumpgate import wsgi
 
 
+def default_workers():
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def get_server_options(args):
+    """Return the gunicorn settings for the parsed command line."""
+    return {
+        'bind': '%s:%s' % (args.host, args.port),
+        'workers': args.workers,
+        'threads': args.threads,
+        # The sync worker handles one request at a time and ignores
+        # keep-alive, the threaded worker supports both
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'keepalive': args.keepalive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        'pidfile': args.pidfile,
+        # Every worker builds its own app after forking, so pooled
+        # SoftLayer connections and fan-out threads are never shared
+        'preload_app': False,
+    }
+
+
+def serve_forever(config_path, options):
+    """Serve jumpgate from a pre-forking gunicorn arbiter.
+
+    Sending SIGHUP to the master gracefully reloads the workers and SIGTERM
+    shuts them down once their in-flight requests are done.
+    """
+    from gunicorn.app import base
+
+    class JumpgateApplication(base.BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return wsgi.make_api(config_path)
+
+    JumpgateApplication().run()
+
+
+def serve_single_threaded(config_path, host, port):
+    httpd = simple_server.make_server(host, port, wsgi.make_api(config_path))
+    print("Starting server on (%s:%s)" % (host, port))
+    print("""
+Warning: This is a single-threaded test server for Jumpgate and not fit for
+production, run without --dev to serve with multiple workers.""")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
 def main():
-    description = 'Start a single-threaded instance of jumpgate.'
+    description = 'Start jumpgate.'
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument('--config',
                         default=os.environ.get('JUMPGATE_CONFIG'),
@@ -19,18 +77,42 @@ def main():
                         type=int,
                         default=5000,
                         help='port to listen on')
+    parser.add_argument('--dev',
+                        action='store_true',
+                        help='run the single-threaded development server')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=default_workers(),
+                        help='worker processes, defaults to 2 * cores + 1')
+    parser.add_argument('--threads',
+                        type=int,
+                        default=4,
+                        help='request threads per worker process, more than '
+                             'one is needed for keep-alive connections')
+    parser.add_argument('--keepalive',
+                        type=int,
+                        default=5,
+                        help='seconds to wait for requests on a keep-alive '
+                             'connection')
+    parser.add_argument('--timeout',
+                        type=int,
+                        default=120,
+                        help='seconds before a silent worker is restarted')
+    parser.add_argument('--graceful-timeout',
+                        type=int,
+                        default=30,
+                        help='seconds workers get to finish requests on '
+                             'reload or shutdown')
+    parser.add_argument('--max-requests',
+                        type=int,
+                        default=0,
+                        help='restart workers after this many requests, '
+                             '0 disables it')
+    parser.add_argument('--pidfile',
+                        help='file to write the master pid to')
 
     args = parser.parse_args()
-    httpd = simple_server.make_server(args.host,
-                                      args.port,
-                                      wsgi.make_api(args.config))
-    print("Starting server on (%s:%s)" % (args.host, args.port))
-    print("""
-Warning: This is currently a test server for Jumpgate and not fit for
-production since it is single-threaded. Use the WSGI application directly
-along with a better wsgi server like gunicorn or uwsgi:
-    jumpgate.wsgi:make_api()""")
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("Exiting...")
+    if args.dev:
+        serve_single_threaded(args.config, args.host, args.port)
+    else:
+        serve_forever(args.config, get_server_options(args))
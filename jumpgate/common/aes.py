@@ -12,8 +12,16 @@ def pad(string):
     return string + (BLOCK_SIZE - len(string) % BLOCK_SIZE) * PADDING
 
 
+_cyphers = {}
+
+
 def create_cypher():
-    return AES.new(pad(config.PARSER.get('DEFAULT','secret_key')))
+    # ECB cyphers keep no state between calls, so one per key is reused
+    key = pad(config.PARSER.get('DEFAULT','secret_key'))
+    cypher = _cyphers.get(key)
+    if cypher is None:
+        cypher = _cyphers[key] = AES.new(key)
+    return cypher
 
 
 def encode_aes(string):
@@ -0,0 +1,80 @@
+import collections
+import threading
+import time
+import weakref
+
+_named_caches = weakref.WeakValueDictionary()
+
+
+def named_caches():
+    """Return (name, cache) pairs of the caches created with a name."""
+    return list(_named_caches.items())
+
+
+class LRUCache(object):
+    """Thread-safe, bounded LRU cache with optional per-entry expiry.
+
+    Entries expire either after the cache wide ttl (in seconds) or at the
+    absolute time.time() timestamp given to set(). Hit and miss counts are
+    kept so callers can report the cache efficiency. Caches given a name
+    are listed by named_caches(), which the metrics endpoint reports.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if name is not None:
+            _named_caches[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.time():
+                    # re-insert to mark the entry as most recently used
+                    self._data[key] = entry
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None, expires=None):
+        """Store value under key.
+
+        :param ttl: Seconds the entry is valid for, overrides the cache ttl.
+        :param expires: Absolute expiry timestamp, overrides any ttl.
+        """
+        if expires is None:
+            ttl = self.ttl if ttl is None else ttl
+            if ttl is not None:
+                expires = time.time() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._data)
@@ -1,6 +1,46 @@
 from ConfigParser import SafeConfigParser
+import os.path
 
 PARSER = SafeConfigParser()
 
+# Where the packaged jumpgate.conf and the data files it names live
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+def get(section, option, default=None):
+    """Return an option from jumpgate.conf or default when it is not set."""
+    if PARSER.has_option(section, option):
+        return PARSER.get(section, option)
+    return default
+
+
+def getint(section, option, default=None):
+    if PARSER.has_option(section, option):
+        return PARSER.getint(section, option)
+    return default
+
+
+def getfloat(section, option, default=None):
+    if PARSER.has_option(section, option):
+        return PARSER.getfloat(section, option)
+    return default
+
+
+def getboolean(section, option, default=False):
+    if PARSER.has_option(section, option):
+        return PARSER.getboolean(section, option)
+    return default
+
+
+def find_file(path):
+    """Return the path of a file named in jumpgate.conf, None if missing.
+
+    Relative paths are looked up in the working directory, then next to
+    the packaged jumpgate.conf.
+    """
+    if not path:
+        return None
+    for candidate in (path, os.path.join(PACKAGE_DIR, path)):
+        if os.path.exists(candidate):
+            return candidate
+    return None
@@ -1,36 +1,67 @@
 import collections
 import logging
+import re
+
+from six.moves.urllib import parse as urlparse
 LOG = logging.getLogger(__name__)
 
+BASE_URL_ENV = 'jumpgate.base_url'
+ROUTE_ENV = 'jumpgate.route'
+
+_VARIABLE_RE = re.compile(r'{(\w+)}')
+
+
+class EndpointTemplate(object):
+    """An endpoint path split once into its literal text and variables."""
+
+    def __init__(self, template):
+        self.template = template
+        parts = _VARIABLE_RE.split(template)
+        self._literals = parts[0::2]
+        self._variables = parts[1::2]
+        self.has_tenant_id = 'tenant_id' in self._variables
+
+    def format(self, tenant_id=None, **kwargs):
+        """Fill in the variables, unknown ones are left as they are."""
+        if not self._variables:
+            return self.template
+
+        path = [self._literals[0]]
+        for var, literal in zip(self._variables, self._literals[1:]):
+            if var == 'tenant_id':
+                path.append(tenant_id)
+            elif var in kwargs:
+                path.append(str(kwargs[var]))
+            else:
+                path.append('{%s}' % var)
+            path.append(literal)
+        return ''.join(path)
+
 
 class Dispatcher(object):
     def __init__(self, mount=None):
         self._endpoints = collections.OrderedDict()
+        self._templates = {}
         self.mount = mount
 
     def add_endpoint(self, nickname, endpoint):
         if self.mount:
             endpoint = self.mount + endpoint
         self._endpoints[nickname] = (endpoint, None)
+        self._templates[nickname] = EndpointTemplate(endpoint)
 
     def get_endpoint_path(self, req, nickname, **kwargs):
-        path = ''
-        if nickname in self._endpoints:
-            path = self._endpoints[nickname][0]
+        template = self._templates.get(nickname)
+        if template is None:
+            return ''
 
-        if '{tenant_id}' in path:
+        tenant_id = None
+        if template.has_tenant_id:
             tenant_id = req.env['tenant_id']
-            path = path.replace('{tenant_id}', tenant_id)
-
-        for var, value in kwargs.items():
-            if '{%s}' % var in path:
-                path = path.replace('{%s}' % var, str(value))
-        return path
+        return template.format(tenant_id, **kwargs)
 
     def get_endpoint_url(self, req, nickname, **kwargs):
-        return (req.protocol + '://' +
-                req.get_header('host') +
-                req.app +
+        return (get_base_url(req) +
                 self.get_endpoint_path(req, nickname, **kwargs))
 
     def get_unused_endpoints(self):
@@ -50,6 +81,9 @@ class Dispatcher(object):
 
         self._endpoints[nickname] = (endpoint, handler)
 
+    def get_handler(self, nickname):
+        return self._endpoints[nickname][1]
+
     def get_routes(self):
         endpoints = []
         for endpoint, h in self._endpoints.values():
@@ -57,3 +91,42 @@ class Dispatcher(object):
                 endpoints.append((endpoint, h))
 
         return endpoints
+
+
+def get_base_url(req):
+    """Return the scheme, host and app prefix, built once per request."""
+    base_url = req.env.get(BASE_URL_ENV)
+    if base_url is None:
+        base_url = req.protocol + '://' + req.get_header('host') + req.app
+        req.env[BASE_URL_ENV] = base_url
+    return base_url
+
+
+def get_next_link(req, marker):
+    """Return a Nova style link to the page of a list after the marker.
+
+    The request's URL and query string are kept, bar the marker.
+    """
+    query = [(name, value) for name, value in
+             urlparse.parse_qsl(req.query_string, keep_blank_values=True)
+             if name != 'marker']
+    query.append(('marker', marker))
+    return {'rel': 'next',
+            'href': '%s%s?%s' % (get_base_url(req), req.path,
+                                 urlparse.urlencode(query))}
+
+
+class RouteMiddleware(object):
+    """Falcon middleware recording the endpoint a request was routed to.
+
+    The endpoint template is kept in req.env[ROUTE_ENV] for the hooks.
+
+    :param routes: Dict of id(handler) to the endpoint template it is
+                   routed from.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    def process_resource(self, req, resp, resource):
+        req.env[ROUTE_ENV] = self.routes.get(id(resource))
@@ -24,6 +24,26 @@ class ResponseException(Exception):
                              code=ex.code)
 
 
+class CachedResponse(Exception):
+    """Raised by a request hook to answer with a stored response."""
+
+    def __init__(self, status, body=None, content_type=None, headers=None):
+        Exception.__init__(self, status)
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @staticmethod
+    def handle(ex, req, resp, params):
+        resp.status = ex.status
+        resp.body = ex.body
+        if ex.content_type:
+            resp.content_type = ex.content_type
+        for name, value in ex.headers.items():
+            resp.set_header(name, value)
+
+
 class Unauthorized(ResponseException):
     error_type = 'unauthorized'
     code = 401
@@ -0,0 +1,77 @@
+"""Issue independent SoftLayer calls concurrently.
+
+Several handlers need the results of API calls which don't depend on each
+other. fan_out() runs them on a shared, bounded pool of worker threads so a
+request only waits about as long as its slowest call instead of their sum.
+"""
+from concurrent import futures
+import logging
+import threading
+import time
+
+from jumpgate.common import config
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 16
+DEFAULT_TIMEOUT = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_executor():
+    """Return the process wide executor."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = futures.ThreadPoolExecutor(
+                    config.getint('softlayer', 'fanout_workers',
+                                  DEFAULT_WORKERS))
+    return _executor
+
+
+def _run_in_worker(call):
+    _local.worker = True
+    try:
+        return call()
+    finally:
+        _local.worker = False
+
+
+def fan_out(*calls, **kwargs):
+    """Run the given callables concurrently and return their results.
+
+    Results are returned in the order of the calls. When one of the calls
+    fails or the timeout expires, the calls which haven't started yet are
+    cancelled and the error is raised.
+
+    :param calls: Callables taking no arguments, see functools.partial.
+    :param timeout: Seconds to wait for all of the calls, [softlayer]
+                    fanout_timeout by default.
+    :raises concurrent.futures.TimeoutError: If the calls took longer.
+    """
+    timeout = kwargs.pop('timeout', None)
+    if kwargs:
+        raise TypeError('Unexpected arguments: %s' % ', '.join(kwargs))
+    # Waiting on the pool from one of its own workers can deadlock once
+    # every worker does so, nested calls simply run inline.
+    if len(calls) < 2 or getattr(_local, 'worker', False):
+        return [call() for call in calls]
+
+    if timeout is None:
+        timeout = config.getfloat('softlayer', 'fanout_timeout',
+                                  DEFAULT_TIMEOUT)
+    executor = get_executor()
+    pending = [executor.submit(_run_in_worker, call) for call in calls]
+    deadline = time.time() + timeout
+    try:
+        return [future.result(max(0, deadline - time.time()))
+                for future in pending]
+    except Exception:
+        cancelled = len([f for f in pending if f.cancel()])
+        LOG.debug("Fan-out failed, cancelled %d of %d calls",
+                  cancelled, len(pending))
+        raise
@@ -1,9 +1,5 @@
 import importlib
 import logging
-import os
-import imp
-
-
 
 from jumpgate.common import config
 
@@ -32,14 +28,13 @@ class APIHooks(object):
                 for hook in (['core'] +
                              config.PARSER.get('DEFAULT','request_hooks').split(',') +
                              config.PARSER.get('DEFAULT','response_hooks').split(',')):
+                    hook = hook.strip()
                     LOG.info("Importing hook module '%s'" % (hook))
                     self._load_module(hook)
             self._loaded = True
 
         def _load_module(self, module):
             try:
-                imp.load_source(module, os.path.dirname(__file__))
-                LOG.info("GOT HERE HOOK PATH %s "% os.path.join(os.path.dirname(__file__), module))
                 importlib.import_module('jumpgate.common.hooks.'+module)
             except ImportError:
                raise ImportError("Failed to import hook module '%s'. "
@@ -8,6 +8,7 @@ from jumpgate.identity.drivers import core as identity
 
 LOG = logging.getLogger(__name__)
 NOAUTH = [re.compile(e) for e in [r'GET:/$',
+                                  r'GET:\/metrics$',
                                   r'GET:\/compute[\/]?$',
                                   r'GET:\/v[\d]+[\/]?$',
                                   r'GET:\/v[\d]+.[\d]+[\/]?$',
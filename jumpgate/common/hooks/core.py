@@ -1,9 +1,9 @@
-import json
 import uuid
 
 from falcon import status_codes
 
 from jumpgate.common import hooks
+from jumpgate.common import streaming
 
 
 @hooks.response_hook(False)
@@ -11,7 +11,11 @@ def hook_format(req, resp):
     body = resp.body
     if body is not None and not resp.content_type:
         resp.content_type = 'application/json'
-        resp.body = json.dumps(body)
+        if streaming.is_streaming(body):
+            resp.body = None
+            resp.stream = streaming.iter_json(body)
+        else:
+            resp.body = streaming.dumps(body)
 
     if isinstance(resp.status, int):
         resp.status = getattr(status_codes,
@@ -0,0 +1,179 @@
+"""Cache the bodies of GET responses of read-mostly endpoints.
+
+Routes are given a ttl in the [response_cache] section of jumpgate.conf,
+keyed by their endpoint template. Their serialized responses are stored
+per route, tenant, user, URL and query string and served with a strong
+ETag, answering requests whose If-None-Match matches it with a 304.
+Successful writes to a cached path drop its responses.
+
+The hooks need to be listed in both request_hooks and response_hooks.
+Requests carrying a token are only looked up once the token has been
+validated, by auth_token or the SoftLayer client hook. With lazy_drivers
+the latter runs after this hook, so those responses are then stored but
+not served from the cache. Requests without a token only get what
+requests without a token were answered with.
+"""
+import collections
+import hashlib
+import time
+
+import falcon
+import six
+
+from jumpgate.common import cache
+from jumpgate.common import config
+from jumpgate.common import dispatcher
+from jumpgate.common import exceptions
+from jumpgate.common import hooks
+from jumpgate.common import metrics
+from jumpgate.common.sl import auth
+
+DEFAULT_SIZE = 10000
+
+CACHED_ENV = 'jumpgate.response_cache.cached'
+
+Entry = collections.namedtuple('Entry',
+                               ['etag', 'body', 'content_type', 'expires'])
+
+
+def get_etag(body):
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header to the ETag."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return True
+    return False
+
+
+class ResponseCache(object):
+    """Responses of the routes given a ttl, keyed by endpoint template.
+
+    The responses of a (route, tenant_id, user_id, url) are kept together,
+    by query string, so a write to the URL can drop all of them.
+    """
+
+    def __init__(self, ttls, maxsize=DEFAULT_SIZE):
+        self.ttls = dict((route.lower(), ttl) for route, ttl in ttls.items())
+        self._responses = cache.LRUCache(maxsize=maxsize,
+                                         name='response_cache')
+
+    def get_ttl(self, route):
+        if route is None:
+            return None
+        return self.ttls.get(route.lower())
+
+    def get(self, key, query_string):
+        entry = self._responses.get(key, {}).get(query_string)
+        if entry is not None and entry.expires > time.time():
+            return entry
+        return None
+
+    def set(self, key, query_string, body, content_type, ttl):
+        entry = Entry(get_etag(body), body, content_type, time.time() + ttl)
+        responses = dict(self._responses.get(key) or {})
+        responses[query_string] = entry
+        self._responses.set(key, responses, ttl=ttl)
+        return entry
+
+    def invalidate(self, key=None):
+        """Forget the responses of a key, or every response."""
+        if key is None:
+            self._responses.clear()
+        else:
+            self._responses.pop(key)
+
+
+_response_cache = None
+
+
+def response_cache():
+    global _response_cache
+    if _response_cache is None:
+        ttls = {}
+        if config.PARSER.has_section('response_cache'):
+            for option, value in config.PARSER.items('response_cache'):
+                # The other options are the defaults of every section
+                if option.startswith('/'):
+                    ttls[option] = int(value)
+        _response_cache = ResponseCache(
+            ttls, maxsize=config.getint('response_cache', 'size',
+                                        DEFAULT_SIZE))
+    return _response_cache
+
+
+def get_cache_key(req, route):
+    """Return the key of the request's responses, None until it is known.
+
+    A request with a token has no key until the token has been validated.
+    """
+    tenant_id = auth.get_account_id(req)
+    if tenant_id is None and req.get_header('X-Auth-Token'):
+        return None
+    # Links in the bodies are built from the URL the request was sent to
+    return (route, tenant_id, auth.get_user_id(req),
+            dispatcher.get_base_url(req) + req.path)
+
+
+@hooks.request_hook(True)
+def serve_cached_response(req, resp, kwargs):
+    route = req.env.get(dispatcher.ROUTE_ENV)
+    responses = response_cache()
+    if req.method != 'GET' or not responses.get_ttl(route):
+        return
+
+    key = get_cache_key(req, route)
+    if key is None:
+        return
+    entry = responses.get(key, req.query_string)
+    if entry is None:
+        return
+
+    req.env[CACHED_ENV] = True
+    headers = {'ETag': entry.etag}
+    if etag_matches(req.get_header('If-None-Match'), entry.etag):
+        raise exceptions.CachedResponse(falcon.HTTP_304, headers=headers)
+    raise exceptions.CachedResponse(falcon.HTTP_200, body=entry.body,
+                                    content_type=entry.content_type,
+                                    headers=headers)
+
+
+@hooks.response_hook(True)
+def cache_response(req, resp):
+    route = req.env.get(dispatcher.ROUTE_ENV)
+    responses = response_cache()
+    ttl = responses.get_ttl(route)
+    if not ttl or req.env.get(CACHED_ENV):
+        return
+
+    # Built again as the token may have been validated by the handler's
+    # hooks since the request hook ran
+    key = get_cache_key(req, route)
+    if key is None:
+        return
+
+    status = metrics.get_status_code(resp)
+    if req.method != 'GET':
+        if status.startswith('2'):
+            responses.invalidate(key)
+        return
+
+    # Streamed bodies aren't known until they are sent
+    if status != '200' or not isinstance(resp.body, six.string_types):
+        return
+
+    entry = responses.set(key, req.query_string, resp.body,
+                          resp.content_type, ttl)
+    resp.set_header('ETag', entry.etag)
+    if etag_matches(req.get_header('If-None-Match'), entry.etag):
+        resp.status = falcon.HTTP_304
+        resp.body = None
@@ -1,19 +1,11 @@
-from oslo_config import cfg
-import SoftLayer
-
 from jumpgate.common import hooks
 from jumpgate.common.sl import auth
+from jumpgate.common.sl import pool
 
 
 @hooks.request_hook(True)
 def bind_client(req, resp, kwargs):
-    extra_args = {}
-    if SoftLayer.__version__ > 'v3.0.3':
-        extra_args['proxy'] = cfg.CONF['softlayer']['proxy']
-
-    endpoint = cfg.CONF['softlayer']['endpoint']
-    client = SoftLayer.Client(endpoint_url=endpoint, **extra_args)
-    client.auth = None
+    client = pool.get_client()
     req.sl_client = client
 
     auth_token = req.env.get('auth', None)
@@ -1,19 +1,14 @@
 import time
 
-from oslo_config import cfg
-import SoftLayer
-
 from jumpgate.common import hooks
 from jumpgate.common.sl import auth
+from jumpgate.common.sl import pool
 
 
 @hooks.request_hook(True)
 def bind_client(req, resp, kwargs):
     req.env['sl_timehook_start_time'] = time.time()
-    endpoint = cfg.CONF['softlayer']['endpoint']
-    client = SoftLayer.TimedClient(endpoint_url=endpoint,
-                                   proxy=cfg.CONF['softlayer']['proxy'])
-    client.auth = None
+    client = pool.get_client(timed=True)
     req.sl_client = client
 
     auth_token = req.env.get('auth', None)
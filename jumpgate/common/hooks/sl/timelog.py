@@ -2,6 +2,7 @@ import logging
 import time
 
 from jumpgate.common import hooks
+from jumpgate.common import metrics
 
 LOG = logging.getLogger(__name__)
 
@@ -9,16 +10,18 @@ LOG = logging.getLogger(__name__)
 @hooks.response_hook(True)
 def log_request(req, resp):
     end_time = time.time()
-    start_time = req.env.get('sl_timehook_start_time', None)
-    if not start_time:
-        LOG.error(
-            "timelog can only be used along with timedclient request hook")
+    start_time = (req.env.get('sl_timehook_start_time') or
+                  req.env.get(metrics.START_TIME_ENV))
+    sl_client = getattr(req, 'sl_client', None)
+    if not start_time or sl_client is None:
+        LOG.error("timelog needs the timedclient request hook or metrics "
+                  "enabled, and a SoftLayer client bound to the request")
         return
 
-    timed_client = req.sl_client
+    timed_transport = sl_client.transport
     overall = end_time - start_time
     sl_total = 0
-    for call, time_stamp, duration in timed_client.get_last_calls():
+    for call, time_stamp, duration in timed_transport.get_last_calls():
         LOG.info("[ReqId: %s] %s %s %s",
                  req.env['REQUEST_ID'],
                  call,
@@ -0,0 +1,182 @@
+"""Background tracking of long running SoftLayer orders and transactions.
+
+Handlers which start an order or transaction that takes minutes to finish
+submit the wait as a job and answer 202 straight away with the job id.
+Jobs run on a small dedicated pool of threads, separate from the fan-out
+pool, and clients poll the job id through the resource's own endpoint
+until the job resolves it to the id of the provisioned resource.
+
+Jobs are kept in memory by the process which accepted the request, so
+handlers should also be able to resolve an unknown id from SoftLayer. Job
+ids made by get_pending_id carry the SoftLayer id to resolve them with.
+"""
+from concurrent import futures
+import logging
+import threading
+import time
+import uuid
+
+from jumpgate.common import cache
+from jumpgate.common import config
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_JOB_TTL = 60 * 60
+DEFAULT_MAX_JOBS = 10000
+
+PENDING = 'PENDING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+# Largest id SoftLayer's XML-RPC API accepts
+MAX_SOFTLAYER_ID = 2 ** 31 - 1
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_pending_id(prefix, softlayer_id):
+    """Return a uuid shaped job id carrying a SoftLayer id.
+
+    :param prefix: The first four groups of the uuid, with their dashes,
+                   marking what kind of id it carries.
+    """
+    return '%s%012x' % (prefix, int(softlayer_id))
+
+
+def get_softlayer_id(prefix, pending_id):
+    """Return the SoftLayer id of a get_pending_id id, None for other ids.
+    """
+    pending_id = str(pending_id)
+    if (not pending_id.startswith(prefix) or
+            len(pending_id) != len(prefix) + 12):
+        return None
+    try:
+        softlayer_id = int(pending_id[len(prefix):], 16)
+    except ValueError:
+        return None
+    if not 0 < softlayer_id <= MAX_SOFTLAYER_ID:
+        return None
+    return softlayer_id
+
+
+class Job(object):
+    """The state of a background job.
+
+    :ivar info: Details of the request, used to answer polls while the job
+                is still pending.
+    """
+
+    def __init__(self, job_id=None, info=None):
+        self.id = job_id or str(uuid.uuid4())
+        self.info = info or {}
+        self.state = PENDING
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self._done = threading.Event()
+
+    @property
+    def pending(self):
+        return self.state == PENDING
+
+    def run(self, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            LOG.exception("Job %s failed", self.id)
+            self.fail(str(e))
+        else:
+            self.finish(result)
+
+    def finish(self, result):
+        self.result = result
+        self.state = DONE
+        self._done.set()
+
+    def fail(self, error):
+        self.error = error
+        self.state = FAILED
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish, returns False on timeout."""
+        return self._done.wait(timeout)
+
+
+class JobTracker(object):
+    def __init__(self, max_workers=DEFAULT_WORKERS, ttl=DEFAULT_JOB_TTL,
+                 maxsize=DEFAULT_MAX_JOBS):
+        self._executor = futures.ThreadPoolExecutor(max_workers)
+        self._jobs = cache.LRUCache(maxsize=maxsize, ttl=ttl, name='jobs')
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn in the background and return its Job.
+
+        :param job_id: Id for the job, a random uuid by default.
+        :param info: Details kept with the job, see Job.info.
+        """
+        job = Job(job_id=kwargs.pop('job_id', None),
+                  info=kwargs.pop('info', None))
+        self._jobs.set(job.id, job)
+        self._executor.submit(job.run, fn, args, kwargs)
+        return job
+
+    def poll(self, fn, *args, **kwargs):
+        """Call fn every interval seconds until it returns a result.
+
+        fn returns None while the job is pending. Each call runs on a job
+        worker, but no worker is held between the calls, so long waits
+        don't starve the other jobs.
+
+        :param interval: Seconds between the calls.
+        :param timeout: Seconds before the job fails.
+        :param job_id: Id for the job, a random uuid by default.
+        :param info: Details kept with the job, see Job.info.
+        """
+        interval = kwargs.pop('interval')
+        deadline = time.time() + kwargs.pop('timeout')
+        job = Job(job_id=kwargs.pop('job_id', None),
+                  info=kwargs.pop('info', None))
+        self._jobs.set(job.id, job)
+
+        def attempt():
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                LOG.exception("Job %s failed", job.id)
+                return job.fail(str(e))
+            if result is not None:
+                job.finish(result)
+            elif time.time() >= deadline:
+                job.fail('Timed out')
+            else:
+                schedule()
+
+        def schedule():
+            timer = threading.Timer(interval, self._executor.submit,
+                                    (attempt,))
+            timer.daemon = True
+            timer.start()
+
+        schedule()
+        return job
+
+    def get(self, job_id):
+        """Return the job with the given id, or None if it is unknown."""
+        return self._jobs.get(job_id)
+
+
+def job_tracker():
+    """Return the process wide job tracker."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = JobTracker(
+                    max_workers=config.getint('DEFAULT', 'job_workers',
+                                              DEFAULT_WORKERS),
+                    ttl=config.getint('DEFAULT', 'job_ttl',
+                                      DEFAULT_JOB_TTL))
+    return _tracker
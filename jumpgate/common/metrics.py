@@ -0,0 +1,248 @@
+"""In-process request, SoftLayer call and cache metrics.
+
+Metrics are kept per worker process and exposed in the Prometheus text
+format on /metrics. Requests are measured by MetricsMiddleware, SoftLayer
+calls by the TracingTransport every pooled client is wrapped in, and the
+hit ratios of named caches are read when the metrics are rendered.
+"""
+import bisect
+import threading
+import time
+
+from jumpgate.common import cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+START_TIME_ENV = 'jumpgate.start_time'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(object):
+    kind = None
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.doc),
+                 '# TYPE %s %s' % (self.name, self.kind)]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return ['%s%s %s' % (self.name,
+                             _format_labels(self.labels, labels),
+                             _format_value(value))]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, labels=()):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # bucket counts followed by the sum of the observed values
+                counts = self._values[labels] = [0] * len(self.buckets) + [0]
+            counts[i] += 1
+            counts[-1] += value
+
+    def get_count(self, labels=()):
+        return sum(self._values.get(labels, [0])[:-1])
+
+    def _render_sample(self, labels, counts):
+        lines = []
+        total = 0
+        for bucket, count in zip(self.buckets, counts):
+            total += count
+            lines.append('%s_bucket%s %d' % (
+                self.name,
+                _format_labels(self.labels, labels,
+                               ('le', _format_value(bucket))),
+                total))
+        label_str = _format_labels(self.labels, labels)
+        lines.append('%s_sum%s %s' % (self.name, label_str,
+                                      _format_value(counts[-1])))
+        lines.append('%s_count%s %d' % (self.name, label_str, total))
+        return lines
+
+
+class Registry(object):
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics + _cache_metrics():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'jumpgate_requests_in_flight',
+    'Requests currently being handled.'))
+REQUESTS = REGISTRY.register(Counter(
+    'jumpgate_requests_total',
+    'Requests handled, by route and status code.',
+    ('method', 'route', 'status')))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'jumpgate_request_duration_seconds',
+    'Time spent handling requests, by route.',
+    ('method', 'route')))
+SL_CALLS = REGISTRY.register(Counter(
+    'jumpgate_softlayer_calls_total',
+    'SoftLayer API calls, by service, method and outcome.',
+    ('service', 'method', 'result')))
+SL_COALESCED_CALLS = REGISTRY.register(Counter(
+    'jumpgate_softlayer_coalesced_calls_total',
+    'SoftLayer read calls answered by an identical call in flight.',
+    ('service', 'method')))
+SL_CALL_DURATION = REGISTRY.register(Histogram(
+    'jumpgate_softlayer_call_duration_seconds',
+    'Duration of SoftLayer API calls, by service and method.',
+    ('service', 'method')))
+
+
+def _cache_metrics():
+    hits = Gauge('jumpgate_cache_hits', 'Cache hits.', ('cache',))
+    misses = Gauge('jumpgate_cache_misses', 'Cache misses.', ('cache',))
+    size = Gauge('jumpgate_cache_size', 'Entries in the cache.', ('cache',))
+    for name, lru in sorted(cache.named_caches()):
+        stats = lru.stats()
+        hits.set(stats['hits'], (name,))
+        misses.set(stats['misses'], (name,))
+        size.set(stats['size'], (name,))
+    return [hits, misses, size]
+
+
+def get_status_code(resp):
+    return str(resp.status)[:3]
+
+
+class MetricsMiddleware(object):
+    """Falcon middleware recording the latency of every request.
+
+    :param routes: Dict of id(handler) to the endpoint template it is
+                   routed from, used as the route label.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    def process_request(self, req, resp):
+        req.env[START_TIME_ENV] = time.time()
+        REQUESTS_IN_FLIGHT.inc()
+
+    def process_response(self, req, resp, resource):
+        REQUESTS_IN_FLIGHT.dec()
+        duration = time.time() - req.env[START_TIME_ENV]
+        route = self.routes.get(id(resource), 'unmatched')
+        REQUESTS.inc((req.method, route, get_status_code(resp)))
+        REQUEST_DURATION.observe(duration, (req.method, route))
+
+
+class TracingTransport(object):
+    """Transport wrapper recording the SoftLayer calls of a client.
+
+    Besides feeding the call metrics, the calls are kept in the same
+    (Request, start_time, duration) form as SoftLayer's TimingTransport so
+    the timelog hook can trace them per request.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.last_calls = []
+
+    def __call__(self, call):
+        start_time = time.time()
+        result = 'error'
+        try:
+            response = self.transport(call)
+            result = 'ok'
+            return response
+        finally:
+            duration = time.time() - start_time
+            self.last_calls.append((call, start_time, duration))
+            SL_CALLS.inc((call.service, call.method, result))
+            SL_CALL_DURATION.observe(duration, (call.service, call.method))
+
+    def get_last_calls(self):
+        last_calls = self.last_calls
+        self.last_calls = []
+        return last_calls
+
+
+class Metrics(object):
+    """Serves the metrics of this worker process at GET /metrics."""
+
+    def on_get(self, req, resp):
+        resp.status = 200
+        resp.content_type = CONTENT_TYPE
+        resp.body = REGISTRY.render()
@@ -1,5 +1,12 @@
+import threading
+
 from oslo_config import cfg
 import requests
+from requests import adapters
+from requests import structures
+from six.moves import http_cookiejar
+
+from jumpgate.common import config
 
 opts = [
     cfg.StrOpt('baremetal_endpoint', default='http://127.0.0.1:6385'),
@@ -12,6 +19,62 @@ opts = [
 
 cfg.CONF.register_opts(opts, group='openstack')
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 2
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+CHUNK_SIZE = 64 * 1024
+
+# Headers which only apply to a single connection and must not be proxied,
+# see RFC 2616 section 13.5.1
+HOP_BY_HOP_HEADERS = frozenset([
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(endpoint):
+    """Return the keep-alive session shared by every proxy to endpoint."""
+    session = _sessions.get(endpoint)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(endpoint)
+            if session is None:
+                # Only failed connection attempts are retried, the request
+                # was never sent so this is safe for any method
+                adapter = adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=config.getint('openstack', 'pool_size',
+                                               DEFAULT_POOL_SIZE),
+                    max_retries=config.getint('openstack', 'retries',
+                                              DEFAULT_RETRIES))
+                session = requests.Session()
+                # The proxied request carries its own headers, and cookies
+                # set for one user mustn't be sent with the next one's
+                session.headers.clear()
+                session.cookies.set_policy(
+                    http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[endpoint] = session
+    return session
+
+
+def get_timeout():
+    return (config.getfloat('openstack', 'connect_timeout',
+                            DEFAULT_CONNECT_TIMEOUT),
+            config.getfloat('openstack', 'read_timeout',
+                            DEFAULT_READ_TIMEOUT))
+
+
+def filter_headers(headers):
+    return structures.CaseInsensitiveDict(
+        (name, value) for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS)
+
 
 def setup_responder(app, disp, service):
     endpoint = app.config['openstack'][service + '_endpoint'].rstrip('/')
@@ -46,24 +109,31 @@ class OpenStackResponder(object):
         self.endpoint = endpoint
 
     def _standard_responder(self, req, resp, **_):
+        headers = filter_headers(req.headers)
         data = None
-        if (req.method == 'POST' or req.method == 'PUT'):
+        if req.method == 'POST' or req.method == 'PUT':
             if req.content_length:
                 data = OpenstackStream(req.stream, size=req.content_length)
+            elif 'chunked' in (req.get_header('transfer-encoding') or ''):
+                # Relay the body as it arrives, requests re-chunks it
+                data = iter(lambda: req.stream.read(CHUNK_SIZE), b'')
+                headers.pop('Content-Length', None)
 
         relative_uri = req.relative_uri
         if self.mount:
             relative_uri = relative_uri.replace(self.mount, '', 1)
         endpoint = self.endpoint + relative_uri
 
-        os_resp = requests.request(req.method,
-                                   endpoint,
-                                   data=data,
-                                   headers=req.headers,
-                                   stream=True)
+        os_resp = get_session(self.endpoint).request(req.method,
+                                                     endpoint,
+                                                     data=data,
+                                                     headers=headers,
+                                                     stream=True,
+                                                     timeout=get_timeout())
 
         resp.status = os_resp.status_code
-        content_type = os_resp.headers.pop(
+        os_headers = filter_headers(os_resp.headers)
+        content_type = os_headers.pop(
             'Content-Type', 'application/json').split(';', 1)[0]
 
         # Hack for test_delete_image_blank_id test. Somehow text/html comes
@@ -71,8 +141,13 @@ class OpenStackResponder(object):
         if content_type == 'text/html':
             content_type = 'text/plain; charset=UTF-8'
         resp.content_type = content_type
-        resp.stream_len = os_resp.headers.pop('Content-Length', 0)
-        resp.set_headers(os_resp.headers)
+
+        # Without a Content-Length the body is relayed chunked
+        content_length = os_headers.pop('Content-Length', None)
+        if content_length is not None:
+            resp.stream_len = int(content_length)
+        resp.set_headers(os_headers)
+        # The raw stream is passed on untouched, still content-encoded
         resp.stream = os_resp.raw
 
     on_get = _standard_responder
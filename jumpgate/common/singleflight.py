@@ -0,0 +1,56 @@
+"""Coalesce identical concurrent calls into one.
+
+While a call for a key is in flight, further calls for the same key wait
+for it and share its result instead of repeating the work. Nothing is
+cached: once the call returns, the next one for the key runs again.
+"""
+import sys
+import threading
+
+import six
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class Group(object):
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn unless a call for key is already in flight.
+
+        :returns: A (result, shared) tuple, shared being True when the
+                  result came from a call made by another thread. Errors
+                  are raised in every waiting thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.exc_info is not None:
+                six.reraise(*call.exc_info)
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        return len(self._calls)
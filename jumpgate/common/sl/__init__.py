@@ -2,13 +2,11 @@ import SoftLayer
 
 from jumpgate.common.sl import auth
 from jumpgate.common.sl import errors
-from jumpgate.common import config
+from jumpgate.common.sl import pool
 
 
 def hook_get_client(req, resp, kwargs):
-    endpoint = config.PARSER.get('softlayer','endpoint')
-    client = SoftLayer.Client(endpoint_url=endpoint)
-    client.auth = None
+    client = pool.get_client()
     req.env['tenant_id'] = None
 
     if req.headers.get('X-AUTH-TOKEN'):
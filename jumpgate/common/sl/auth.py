@@ -1,9 +1,10 @@
 import logging
 import time
 
+from jumpgate.common import aes
 from jumpgate.common import exceptions
+from jumpgate.common.sl import pool
 from jumpgate.common import utils
-from jumpgate.common import config
 
 from jumpgate.identity.drivers import core as identity
 
@@ -69,12 +70,7 @@ def get_new_token_v3(credentials):
 
     # If the 'password' is the right length, treat it as an API api_key
     if len(credential) == 64:
-        endpoint = config.PARSER.get('softlayer','endpoint')
-        client = SoftLayer.Client(username=username,
-                                  api_key=credential,
-                                  endpoint_url=endpoint,
-                                  proxy=cfg.CONF['softlayer']['proxy'])
-        user = client['Account'].getCurrentUser(mask=USER_MASK)
+        user = get_user_by_api_key(username, credential)
 
         username = token_driver.username(user)
 
@@ -86,14 +82,9 @@ def get_new_token_v3(credentials):
                 'expires': time.time() + TOKEN_LIFETIME_SEC}, user
 
     else:
-        endpoint = cfg.CONF['softlayer']['endpoint']
-        client = SoftLayer.Client(endpoint_url=endpoint,
-                                  proxy=cfg.CONF['softlayer']['proxy'])
-        client.auth = None
         try:
-            userId, tokenHash = client.authenticate_with_password(username,
-                                                                  credential)
-            user = client['Account'].getCurrentUser(mask=USER_MASK)
+            userId, tokenHash, user = get_user_by_password(username,
+                                                           credential)
             username = token_driver.username(user)
             return {'userId': userId,
                     'username': username,
@@ -108,6 +99,51 @@ def get_new_token_v3(credentials):
             raise
 
 
+def get_user_by_api_key(username, api_key):
+    """Return the SoftLayer user owning an API key.
+
+    Verified users are kept in the auth cache for a short while, keyed by a
+    salted hash of the credentials, so repeated logins skip the API call.
+    Failed logins are never cached.
+    """
+    key = identity.auth_cache_key('api_key', username, api_key)
+    user = identity.auth_cache().get(key)
+    if user is None:
+        client = pool.get_client(
+            auth=SoftLayer.BasicAuthentication(username, api_key))
+        user = client['Account'].getCurrentUser(mask=USER_MASK)
+        identity.auth_cache().set(key, user)
+    return dict(user)
+
+
+def get_user_by_password(username, password):
+    """Log in with a password, returns (user_id, token_hash, user)."""
+    key = identity.auth_cache_key('password', username, password)
+    entry = identity.auth_cache().get(key)
+    if entry is None:
+        client = pool.get_client()
+        user_id, token_hash = client.authenticate_with_password(username,
+                                                                password)
+        user = client['Account'].getCurrentUser(mask=USER_MASK)
+        # The token hash is a live session credential, keep it encrypted
+        entry = (user_id, aes.encode_aes(token_hash), user)
+        identity.auth_cache().set(key, entry)
+    user_id, token_hash, user = entry
+    return user_id, aes.decode_aes(token_hash), dict(user)
+
+
+def get_user_by_token(user_id, token_hash):
+    """Return the SoftLayer user owning a portal session token."""
+    key = identity.auth_cache_key('token', user_id, token_hash)
+    user = identity.auth_cache().get(key)
+    if user is None:
+        client = pool.get_client(
+            auth=SoftLayer.TokenAuthentication(user_id, token_hash))
+        user = client['Account'].getCurrentUser(mask=USER_MASK)
+        identity.auth_cache().set(key, user)
+    return dict(user)
+
+
 def get_auth(token_details):
     if token_details['auth_type'] == 'api_key':
         return SoftLayer.BasicAuthentication(token_details['username'],
@@ -117,3 +153,14 @@ def get_auth(token_details):
                                              token_details['api_key'])
 
     return None
+
+
+def get_account_id(req):
+    """Account the request's SoftLayer credentials belong to, if known."""
+    return (utils.lookup(req.env, 'auth', 'tenant_id') or
+            req.env.get('tenant_id'))
+
+
+def get_user_id(req):
+    """User the request's SoftLayer credentials belong to, if known."""
+    return utils.lookup(req.env, 'auth', 'user_id')
@@ -0,0 +1,172 @@
+"""Process wide pool of SoftLayer API transports.
+
+SoftLayer.Client builds a transport that goes through the module level
+requests.request, which opens (and TLS handshakes) a new connection for
+every single API call. The transports kept here hold a keep-alive
+requests.Session per (endpoint, proxy) pair instead, and each HTTP request
+only gets a thin SoftLayer.BaseClient carrying its own auth object.
+"""
+import json
+import logging
+import threading
+
+import requests
+from requests import adapters
+import SoftLayer
+from SoftLayer import transports
+
+from jumpgate.common import config
+from jumpgate.common import metrics
+from jumpgate.common import singleflight
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_call_key(request):
+    """Return what identifies the result of a call, credentials included."""
+    return json.dumps([request.service, request.method, request.identifier,
+                       request.mask, request.filter, request.limit,
+                       request.offset, request.args, request.headers],
+                      sort_keys=True, default=repr)
+
+
+def is_read(request):
+    return request.method.startswith('get')
+
+
+_local = threading.local()
+
+
+class _TransportRequests(object):
+    """Stands in for the requests module in SoftLayer.transports.
+
+    XmlRpcTransport sends its calls with requests.request, a fresh session
+    each time. Calls made by a SessionXmlRpcTransport go through its own
+    pooled session instead, anything else is left to requests.
+    """
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        call = getattr(_local, 'call', None)
+        if call is None:
+            return requests.request(method, url, **kwargs)
+        transport, request = call
+        return transport.send(request, method, url, **kwargs)
+
+
+transports.requests = _TransportRequests()
+
+
+class SessionXmlRpcTransport(transports.XmlRpcTransport):
+    """XML-RPC transport which reuses pooled keep-alive connections.
+
+    Only the HTTP request of XmlRpcTransport is replaced, the calls are
+    built and parsed by SoftLayer. With coalesce set, identical read calls
+    made concurrently with the same credentials, e.g. by dashboards polling
+    the same listing, share one upstream call. They share the raw response
+    and every caller parses its own result from it, as handlers are free
+    to modify what they get back.
+    """
+
+    def __init__(self, endpoint_url=None, timeout=None, proxy=None,
+                 user_agent=None, pool_size=DEFAULT_POOL_SIZE,
+                 coalesce=False):
+        super(SessionXmlRpcTransport, self).__init__(
+            endpoint_url=endpoint_url,
+            timeout=timeout,
+            proxy=proxy,
+            user_agent=user_agent)
+        self.session = requests.Session()
+        adapter = adapters.HTTPAdapter(pool_connections=1,
+                                       pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.coalesce = coalesce
+        self._flights = singleflight.Group()
+
+    def __call__(self, request):
+        _local.call = (self, request)
+        try:
+            return super(SessionXmlRpcTransport, self).__call__(request)
+        finally:
+            _local.call = None
+
+    def send(self, request, method, url, **kwargs):
+        """Make the HTTP request of a call, returns the response."""
+        if not (self.coalesce and is_read(request)):
+            return self.session.request(method, url, **kwargs)
+
+        resp, shared = self._flights.do(get_call_key(request),
+                                        self.session.request,
+                                        method, url, **kwargs)
+        if shared:
+            metrics.SL_COALESCED_CALLS.inc((request.service, request.method))
+        return resp
+
+
+def get_endpoint():
+    return config.get('softlayer', 'endpoint',
+                      SoftLayer.API_PUBLIC_ENDPOINT)
+
+
+def get_proxy():
+    return config.get('softlayer', 'proxy') or None
+
+
+def get_transport(endpoint_url=None, proxy=None):
+    """Return the shared transport for the given endpoint and proxy."""
+    endpoint_url = endpoint_url or get_endpoint()
+    key = (endpoint_url, proxy)
+    transport = _transports.get(key)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(key)
+            if transport is None:
+                if '/rest' in endpoint_url:
+                    # Only XML-RPC is pooled, the REST transport is only
+                    # ever used for read-only debugging.
+                    transport = transports.RestTransport(
+                        endpoint_url=endpoint_url, proxy=proxy)
+                else:
+                    transport = SessionXmlRpcTransport(
+                        endpoint_url=endpoint_url,
+                        proxy=proxy,
+                        timeout=config.getfloat('softlayer', 'timeout'),
+                        pool_size=config.getint('softlayer', 'pool_size',
+                                                DEFAULT_POOL_SIZE),
+                        coalesce=config.getboolean('softlayer',
+                                                   'coalesce_reads', True))
+                LOG.debug("Created SoftLayer transport for %s", endpoint_url)
+                _transports[key] = transport
+    return transport
+
+
+def get_client(auth=None, timed=False):
+    """Return a per-request client bound to a pooled transport.
+
+    Every client records its calls for the metrics endpoint and keeps them
+    for transport.get_last_calls(), see metrics.TracingTransport.
+
+    :param auth: SoftLayer auth object used for the request, or None.
+    :param timed: Kept for the timedclient hook, all clients are timed.
+    """
+    transport = metrics.TracingTransport(
+        get_transport(get_endpoint(), get_proxy()))
+    return SoftLayer.BaseClient(auth=auth, transport=transport)
+
+
+def reset():
+    """Drop every pooled transport, closing their connections."""
+    with _transports_lock:
+        for transport in _transports.values():
+            session = getattr(transport, 'session', None)
+            if session is not None:
+                session.close()
+        _transports.clear()
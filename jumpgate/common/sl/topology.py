@@ -0,0 +1,151 @@
+"""Process wide cache of the VLAN and subnet topology of accounts.
+
+The network listings and the VLAN validation of server creates all need
+the VLANs and subnets of the account, which rarely change, so they are
+downloaded once per ttl and shared by the requests of the account's user.
+What a user sees depends on its SoftLayer permissions, so topologies are
+never shared between users.
+"""
+import bisect
+import functools
+import operator
+
+from jumpgate.common import cache
+from jumpgate.common import config
+from jumpgate.common import fanout
+from jumpgate.common.sl import auth
+
+DEFAULT_TOPOLOGY_TTL = 300
+DEFAULT_TOPOLOGY_SIZE = 1024
+
+# The subnets of a VLAN are taken from the subnet index instead of the mask
+VLAN_MASK = 'id, name, vlanNumber, networkSpace'
+SUBNET_MASK = ('id, cidr, netmask, networkVlanId, networkIdentifier, '
+               'gateway, version, modifyDate, broadcastAddress, '
+               'reverseDomain, note')
+
+
+class Topology(object):
+    """The VLANs and subnets of an account, indexed by id."""
+
+    def __init__(self, vlans, subnets):
+        self.subnets = sorted(subnets, key=operator.itemgetter('id'))
+        self.subnet_ids = [subnet['id'] for subnet in self.subnets]
+        self.subnets_by_id = dict((subnet['id'], subnet)
+                                  for subnet in subnets)
+        self.subnets_by_vlan = {}
+        for subnet in subnets:
+            self.subnets_by_vlan.setdefault(subnet.get('networkVlanId'),
+                                            []).append(subnet)
+
+        self.vlans = vlans
+        self.vlans_by_id = {}
+        for vlan in vlans:
+            vlan['subnets'] = self.subnets_by_vlan.get(vlan['id'], [])
+            self.vlans_by_id[vlan['id']] = vlan
+
+    def get_vlan(self, vlan_id, network_space=None):
+        """Return the VLAN, optionally only if in the PUBLIC/PRIVATE space.
+        """
+        vlan = self.vlans_by_id.get(_to_id(vlan_id))
+        if (vlan is not None and network_space is not None and
+                vlan.get('networkSpace') != network_space):
+            return None
+        return vlan
+
+    def get_subnet(self, subnet_id):
+        return self.subnets_by_id.get(_to_id(subnet_id))
+
+    def page_subnets(self, marker=None, limit=None):
+        """Return the subnets after the marker id, sorted by id.
+
+        :raises ValueError: If the marker isn't a subnet id.
+        """
+        start = 0
+        if marker is not None:
+            marker_id = _to_id(marker)
+            if marker_id is None:
+                raise ValueError('Invalid marker')
+            start = bisect.bisect_right(self.subnet_ids, marker_id)
+        subnets = self.subnets[start:]
+        if limit is not None:
+            subnets = subnets[:limit]
+        return subnets
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_topology(client):
+    vlans, subnets = fanout.fan_out(
+        functools.partial(client['Account'].getNetworkVlans, mask=VLAN_MASK),
+        functools.partial(client['Account'].getSubnets, mask=SUBNET_MASK))
+    return Topology(list(vlans or []), list(subnets or []))
+
+
+class TopologyCache(object):
+    def __init__(self, ttl=DEFAULT_TOPOLOGY_TTL,
+                 maxsize=DEFAULT_TOPOLOGY_SIZE):
+        self._topologies = cache.LRUCache(maxsize=maxsize, ttl=ttl,
+                                          name='network_topology')
+
+    def get(self, client, account_id, user_id=None, refresh=False):
+        """Return the Topology of the user, downloading it if needed.
+
+        :param refresh: Download it again even if cached.
+        """
+        if account_id is None or user_id is None:
+            # Without a known user the topology can't be shared
+            return get_topology(client)
+        key = (account_id, user_id)
+        if not refresh:
+            topology = self._topologies.get(key)
+            if topology is not None:
+                return topology
+        topology = get_topology(client)
+        self._topologies.set(key, topology)
+        return topology
+
+    def get_vlan(self, client, account_id, vlan_id, network_space=None,
+                 user_id=None):
+        """Look a VLAN up, refreshing the topology once if it is unknown.
+
+        VLANs ordered since the topology was cached are found this way.
+        """
+        cached = self._topologies.get((account_id, user_id))
+        topology = cached or self.get(client, account_id, user_id)
+        vlan = topology.get_vlan(vlan_id, network_space)
+        if vlan is None and cached is not None:
+            topology = self.get(client, account_id, user_id, refresh=True)
+            vlan = topology.get_vlan(vlan_id, network_space)
+        return vlan
+
+    def invalidate(self, account_id=None, user_id=None):
+        """Forget the topology of a user, or of every user."""
+        if account_id is None:
+            self._topologies.clear()
+        else:
+            self._topologies.pop((account_id, user_id))
+
+
+_topology_cache = None
+
+
+def topology_cache():
+    global _topology_cache
+    if _topology_cache is None:
+        _topology_cache = TopologyCache(
+            ttl=config.getint('softlayer', 'topology_ttl',
+                              DEFAULT_TOPOLOGY_TTL),
+            maxsize=config.getint('softlayer', 'topology_size',
+                                  DEFAULT_TOPOLOGY_SIZE))
+    return _topology_cache
+
+
+def get_request_topology(req):
+    return topology_cache().get(req.sl_client, auth.get_account_id(req),
+                                auth.get_user_id(req))
@@ -0,0 +1,97 @@
+"""Incremental JSON serialization of large list responses.
+
+A handler opts in by wrapping a (lazy) list in StreamingList via
+list_body(). hook_format then sends the response with resp.stream, encoding
+one item at a time, so the full list and its JSON string are never held in
+memory and the first bytes go out before the last item is formatted.
+"""
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jumpgate.common import config
+
+CHUNK_SIZE = 64 * 1024
+
+_encoder = json.JSONEncoder()
+
+
+class StreamingList(object):
+    """A list value which is encoded item by item while it is sent."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def streaming_enabled():
+    return config.getboolean('DEFAULT', 'stream_responses')
+
+
+def list_body(items):
+    """Return items as a StreamingList if streaming is enabled.
+
+    :param items: An iterable, typically a generator formatting each item.
+    """
+    if streaming_enabled():
+        return StreamingList(items)
+    return list(items)
+
+
+def is_streaming(body):
+    if isinstance(body, StreamingList):
+        return True
+    if isinstance(body, dict):
+        return any(isinstance(value, StreamingList)
+                   for value in body.values())
+    return False
+
+
+def dumps(body):
+    return _encoder.encode(body)
+
+
+def iter_json(body, chunk_size=CHUNK_SIZE):
+    """Yield body as JSON in chunks of roughly chunk_size bytes."""
+    buf = []
+    size = 0
+    for part in _iter_parts(body):
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield _to_bytes(''.join(buf))
+            buf = []
+            size = 0
+    if buf:
+        yield _to_bytes(''.join(buf))
+
+
+def _iter_parts(obj):
+    if isinstance(obj, StreamingList):
+        yield '['
+        for i, item in enumerate(obj):
+            if i:
+                yield ', '
+            yield _encoder.encode(item)
+        yield ']'
+    elif isinstance(obj, dict) and is_streaming(obj):
+        yield '{'
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                yield ', '
+            yield _encoder.encode(key)
+            yield ': '
+            for part in _iter_parts(value):
+                yield part
+        yield '}'
+    else:
+        yield _encoder.encode(obj)
+
+
+def _to_bytes(chunk):
+    if isinstance(chunk, unicode):
+        return chunk.encode('utf-8')
+    return chunk
@@ -2,6 +2,8 @@ import functools
 import importlib
 import inspect
 import logging
+import sys
+import time
 
 LOG = logging.getLogger(__name__)
 _driver_cache = {}
@@ -32,6 +34,18 @@ def wrap_handler_with_hooks(handler, after):
     return wrapped
 
 
+def timed_import(name):
+    """Import a module and measure what it cost.
+
+    :returns: A (module, seconds, new_modules) tuple, new_modules being the
+              number of modules the import added to sys.modules.
+    """
+    loaded = len(sys.modules)
+    start = time.time()
+    module = importlib.import_module(name)
+    return module, time.time() - start, len(sys.modules) - loaded
+
+
 def import_class(canonical_name):
     segs = canonical_name.split('.')
     module_name, clazz = '.'.join(segs[0: len(segs) - 1]), segs[-1]
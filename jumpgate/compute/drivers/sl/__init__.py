@@ -78,10 +78,11 @@ def setup_routes(app, disp):
     disp.set_handler('v2_os_volume_attachments_detail',
                      volumes.OSVolumeAttachmentV2())
 
-    disp.set_handler('v2_server', servers.ServerV2(app))
+    disp.set_handler('v2_server', servers.ServerV2(app, flavors_from_config))
     disp.set_handler('v2_servers',
                      servers.ServersV2(app, flavors_from_config))
-    disp.set_handler('v2_servers_detail', servers.ServersDetailV2(app))
+    disp.set_handler('v2_servers_detail',
+                     servers.ServersDetailV2(app, flavors_from_config))
     disp.set_handler('v2_server_action',
                      servers.ServerActionV2(app, flavors_from_config))
     disp.set_handler('v2_os_instance_actions',
@@ -10,16 +10,12 @@ class ExtraSpecsFlavorV2(object):
         '''Returns the extra specs for a particular flavor
 
         '''
-        for flavor in self.flavors:
-            if str(flavor_id) == flavor['id']:
-                extra_specs = flavor['extra_specs']
-                resp.status = 200
-                resp.body = {'extra_specs': extra_specs}
-                return
-            else:
-                error_handling.bad_request(resp, message="Invalid Flavor ID "
-                                           "requested.")
-        return
+        flavor = self.flavors.get(flavor_id)
+        if flavor is None:
+            return error_handling.bad_request(
+                resp, message="Invalid Flavor ID requested.")
+        resp.status = 200
+        resp.body = {'extra_specs': flavor['extra_specs']}
 
 
 class ExtraSpecsFlavorKeyV2(object):
@@ -31,18 +27,13 @@ class ExtraSpecsFlavorKeyV2(object):
         '''Returns the requested key from the optional extra specs
 
         '''
-        for flavor in self.flavors:
-            if str(flavor_id) == flavor['id']:
-                extra_specs = flavor['extra_specs']
-                if key_id in extra_specs:
-                    resp.status = 200
-                    resp.body = {key_id: extra_specs[key_id]}
-                    return
-                else:
-                    error_handling.bad_request(resp, message="Invalid Key ID "
-                                               "requested")
-                    return
-            else:
-                error_handling.bad_request(resp, message="Invalid Flavor ID "
-                                           "requested.")
-                return
+        flavor = self.flavors.get(flavor_id)
+        if flavor is None:
+            return error_handling.bad_request(
+                resp, message="Invalid Flavor ID requested.")
+        extra_specs = flavor['extra_specs']
+        if key_id not in extra_specs:
+            return error_handling.bad_request(resp, message="Invalid Key ID "
+                                              "requested")
+        resp.status = 200
+        resp.body = {key_id: extra_specs[key_id]}
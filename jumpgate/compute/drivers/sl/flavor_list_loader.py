@@ -1,6 +1,12 @@
+import bisect
 import json
 import logging
 import os
+import threading
+import time
+
+from jumpgate.common import config
+from jumpgate.compute.drivers.sl import flavors
 
 LOG = logging.getLogger(__name__)
 
@@ -17,35 +23,173 @@ flavor5 = {"disk-type": "SAN", "name": "8 vCPU, 8GB ram, 100GB, SAN",
 FLAVOR_DICT = {'1': flavor1, '2': flavor2, '3': flavor3, '4': flavor4,
                '5': flavor5}
 
+DEFAULT_RELOAD_INTERVAL = 30
+
 
 class Flavors(object):
     _flavors = None
+    _path = None
 
     @classmethod
     def get_flavors(cls, app):
         try:
             if cls._flavors is None:
-                json_file = app.config.flavors.flavor_list
-                if not os.path.exists(json_file):
-                    json_file = app.config.find_file(json_file)
-
+                json_file = config.find_file(
+                    config.get('flavors', 'flavor_list'))
                 if json_file is None:
                     raise ValueError('flavor_list.json not found')
 
-                with open(json_file) as jf:
-                    json_str = jf.read()
-                    flavors = json.loads(json_str)
-                    cls._flavors = {
-                        int(key): format_flavor_extra_specs(val)
-                        for key, val in flavors.items()
-                    }
+                cls._flavors = read_flavor_file(json_file)
+                cls._path = json_file
         except Exception as err_str:
             LOG.info(str(err_str))
             cls._flavors = {int(key): format_flavor_extra_specs(val)
                             for key, val in FLAVOR_DICT.items()}
+            cls._path = None
         # Set flavor '1' as the default
         cls._flavors[None] = cls._flavors[1]
-        return get_listing_flavors(cls._flavors)
+        return FlavorRegistry(
+            get_listing_flavors(cls._flavors), path=cls._path,
+            reload_interval=config.getint('flavors', 'reload_interval',
+                                          DEFAULT_RELOAD_INTERVAL))
+
+
+def read_flavor_file(path):
+    with open(path) as jf:
+        flavor_dict = json.loads(jf.read())
+    return {int(key): format_flavor_extra_specs(val)
+            for key, val in flavor_dict.items()}
+
+
+def _get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+
+class FlavorIndex(object):
+    """Flavors by id and name, sorted views for paging and rendered bodies.
+    """
+
+    def __init__(self, flavor_list):
+        self.by_id = {}
+        self.by_name = {}
+        for flavor in flavor_list:
+            self.by_id[int(flavor['id'])] = flavor
+            self.by_name.setdefault(flavor['name'], flavor)
+
+        self.ids = sorted(self.by_id)
+        self.flavors = [self.by_id[flavor_id] for flavor_id in self.ids]
+        # Flavors by (cpus, ram) in id order, to infer the flavor of guests
+        self.by_shape = {}
+        for flavor in self.flavors:
+            self.by_shape.setdefault((flavor['cpus'], flavor['ram']),
+                                     []).append(flavor)
+        # (value, id) pairs, bisected for the minDisk and minRam filters
+        self.by_disk = sorted((flavor['disk'], flavor_id)
+                              for flavor_id, flavor in self.by_id.items())
+        self.by_ram = sorted((flavor['ram'], flavor_id)
+                             for flavor_id, flavor in self.by_id.items())
+
+        self.bodies = {}
+        for flavor_id, flavor in self.by_id.items():
+            for detail in (False, True):
+                self.bodies[flavor_id, detail] = flavors.get_flavor_body(
+                    flavor, detail=detail)
+
+    def page(self, marker=None, min_disk=None, min_ram=None, limit=None):
+        """Return the flavors after the marker id in numeric id order."""
+        start = 0
+        if marker is not None:
+            start = bisect.bisect_right(self.ids, marker)
+        ids = self.ids[start:]
+
+        for minimum, view in ((min_disk, self.by_disk),
+                              (min_ram, self.by_ram)):
+            if minimum is not None:
+                i = bisect.bisect_left(view, (minimum,))
+                allowed = set(flavor_id for _, flavor_id in view[i:])
+                ids = [flavor_id for flavor_id in ids if flavor_id in allowed]
+
+        if limit is not None:
+            ids = ids[:limit]
+        return [self.by_id[flavor_id] for flavor_id in ids]
+
+
+class FlavorRegistry(object):
+    """The flavors of flavor_list.json, reloaded when the file changes.
+
+    The file is checked at most every reload_interval seconds, so every
+    worker picks up edited flavors without being restarted. A file that
+    can't be loaded leaves the current flavors in place.
+    """
+
+    def __init__(self, flavor_list, path=None,
+                 reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index = FlavorIndex(flavor_list)
+        # Bumped on reload, for caches of what was derived from the flavors
+        self.generation = 0
+        self._mtime = _get_mtime(path)
+        self._checked_at = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if (self.path is not None and
+                time.time() - self._checked_at >= self.reload_interval):
+            self._reload_if_changed()
+        return self._index
+
+    def _reload_if_changed(self):
+        with self._lock:
+            if time.time() - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = time.time()
+            mtime = _get_mtime(self.path)
+            if mtime == self._mtime:
+                return
+            try:
+                flavor_dict = read_flavor_file(self.path)
+                flavor_dict[None] = flavor_dict[1]
+                index = FlavorIndex(get_listing_flavors(flavor_dict))
+            except Exception:
+                LOG.exception('Unable to reload flavors from %s', self.path)
+                return
+            self._index = index
+            self._mtime = mtime
+            self.generation += 1
+            LOG.info('Reloaded %d flavors from %s', len(index.ids),
+                     self.path)
+
+    def __iter__(self):
+        return iter(self.index.flavors)
+
+    def __len__(self):
+        return len(self.index.ids)
+
+    def get(self, flavor_id):
+        """Return the flavor with the id, given as a string or int."""
+        try:
+            return self.index.by_id.get(int(flavor_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_by_name(self, name):
+        return self.index.by_name.get(name)
+
+    def find_by_shape(self, cpus, ram):
+        """Return the flavors with the cpus and ram (MB), in id order."""
+        return self.index.by_shape.get((cpus, ram), [])
+
+    def get_body(self, flavor_id, detail=False):
+        """Return the pre-rendered flavor body, without the links."""
+        return self.index.bodies[int(flavor_id), detail]
+
+    def page(self, **kwargs):
+        return self.index.page(**kwargs)
 
 
 def format_flavor_extra_specs(flavor):
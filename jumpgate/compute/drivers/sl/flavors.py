@@ -12,13 +12,11 @@ class FlavorV2(object):
         self.flavors = flavors
 
     def on_get(self, req, resp, flavor_id, tenant_id=None):
-        for flavor in self.flavors:
-            if str(flavor_id) == flavor['id']:
-                flavor = get_flavor_details(self.app, req,
-                                            flavor, detail=True)
-                resp.body = {'flavor': flavor}
-                return
-        return error_handling.not_found(resp, 'Flavor could not be found')
+        flavor = self.flavors.get(flavor_id)
+        if flavor is None:
+            return error_handling.not_found(resp, 'Flavor could not be found')
+        resp.body = {'flavor': render_flavor(self.app, req, self.flavors,
+                                             flavor, detail=True)}
 
 
 class FlavorsV2(object):
@@ -33,7 +31,7 @@ class FlavorsV2(object):
         flavor_refs = filter_flavor_refs(req, resp, self.flavors)
         if flavor_refs is None:
             return
-        flavors = [get_flavor_details(self.app, req, flavor)
+        flavors = [render_flavor(self.app, req, self.flavors, flavor)
                    for flavor in flavor_refs]
         resp.body = {'flavors': flavors}
 
@@ -52,59 +50,45 @@ class FlavorsDetailV2(object):
         flavor_refs = filter_flavor_refs(req, resp, self.flavors)
         if flavor_refs is None:
             return
-        flavors = [get_flavor_details(self.app, req, flavor, detail=True)
+        flavors = [render_flavor(self.app, req, self.flavors, flavor,
+                                 detail=True)
                    for flavor in flavor_refs]
         resp.body = {'flavors': flavors}
 
 
-def filter_flavor_refs(req, resp, flavor_refs):
-    if req.get_param('marker') is not None:
-        marker = req.get_param('marker')
-        flavor_refs = [f for f in flavor_refs if str(f['id']) > marker]
-
-    if req.get_param('minDisk') is not None:
-        try:
-            min_disk = int(req.get_param('minDisk'))
-            flavor_refs = [f for f in flavor_refs
-                           if f['disk'] >= min_disk]
-        except ValueError:
-            error_handling.bad_request(resp,
-                                       message="Invalid minDisk parameter.")
-            return
-
-    if req.get_param('minRam') is not None:
-        try:
-            min_ram = int(req.get_param('minRam'))
-            flavor_refs = [f for f in flavor_refs if f['ram'] >= min_ram]
-        except ValueError:
-            error_handling.bad_request(resp,
-                                       message="Invalid minRam parameter.")
-            return
-
-    if req.get_param('limit') is not None:
-        try:
-            limit = int(req.get_param('limit'))
-            flavor_refs = flavor_refs[:limit]
-        except ValueError:
-            error_handling.bad_request(resp,
-                                       message="Invalid limit parameter.")
-            return
-
-    return flavor_refs
+def _get_int_param(req, resp, name):
+    """Return the integer parameter, or False after a 400 if malformed."""
+    value = req.get_param(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        error_handling.bad_request(resp,
+                                   message="Invalid %s parameter." % name)
+        return False
 
 
-def get_flavor_details(app, req, flavor_ref, detail=False):
+def filter_flavor_refs(req, resp, flavor_refs):
+    """Page the FlavorRegistry by marker, minDisk, minRam and limit.
+
+    :returns: The matching flavors in numeric id order, or None once a
+              malformed parameter has been answered with a 400.
+    """
+    params = {}
+    for name, key in (('marker', 'marker'), ('minDisk', 'min_disk'),
+                      ('minRam', 'min_ram'), ('limit', 'limit')):
+        params[key] = _get_int_param(req, resp, name)
+        if params[key] is False:
+            return None
+    return flavor_refs.page(**params)
+
+
+def get_flavor_body(flavor_ref, detail=False):
+    """Render a flavor, less the links which depend on the request."""
     flavor = {
         'id': flavor_ref['id'],
-        'links': [
-            {
-                'href': app.get_endpoint_url('compute', req, 'v2_flavor',
-                                             flavor_id=flavor_ref['id']),
-                'rel': 'self',
-            }
-        ],
         'name': flavor_ref['name'],
-
     }
     if detail:
         flavor['disk'] = flavor_ref['disk']
@@ -122,3 +106,27 @@ def get_flavor_details(app, req, flavor_ref, detail=False):
             pass
 
     return flavor
+
+
+def get_flavor_links(app, req, flavor_id):
+    return [
+        {
+            'href': app.get_endpoint_url('compute', req, 'v2_flavor',
+                                         flavor_id=flavor_id),
+            'rel': 'self',
+        }
+    ]
+
+
+def get_flavor_details(app, req, flavor_ref, detail=False):
+    flavor = get_flavor_body(flavor_ref, detail=detail)
+    flavor['links'] = get_flavor_links(app, req, flavor_ref['id'])
+    return flavor
+
+
+def render_flavor(app, req, flavors, flavor_ref, detail=False):
+    """Like get_flavor_details, from the body pre-rendered by the registry.
+    """
+    flavor = dict(flavors.get_body(flavor_ref['id'], detail=detail))
+    flavor['links'] = get_flavor_links(app, req, flavor_ref['id'])
+    return flavor
@@ -1,12 +1,12 @@
+from jumpgate.common.sl import topology
+
+NETWORK_MASK = ('id, modifyDate, gateway, networkVlanId, broadcastAddress, '
+                'netmask, networkIdentifier, cidr, reverseDomain, note')
 
 
 class OSNetworksV2(object):
     def on_get(self, req, resp, tenant_id):
-        networks = []
-        client = req.sl_client
-        sl_networks = client['Account'].getSubnets(
-            mask='id, modifyDate, gateway, networkVlanId, broadcastAddress, '
-            'netmask, networkIdentifier, cidr, reverseDomain, note')
+        sl_networks = topology.get_request_topology(req).subnets
         networks = [format_network(network) for network in sl_networks]
         resp.body = {'networks': networks}
 
@@ -14,10 +14,10 @@ class OSNetworksV2(object):
 class OSNetworkV2(object):
     def on_get(self, req, resp, tenant_id, network_id):
         client = req.sl_client
-        sl_network = client['Network_Subnet'].getObject(
-            id=network_id,
-            mask='id, modifyDate, gateway, networkVlanId, broadcastAddress, '
-            'netmask, networkIdentifier, cidr, reverseDomain, note')
+        sl_network = topology.get_request_topology(req).get_subnet(network_id)
+        if sl_network is None:
+            sl_network = client['Network_Subnet'].getObject(
+                id=network_id, mask=NETWORK_MASK)
         network = format_network(sl_network)
         resp.body = {'network': network}
 
@@ -1,13 +1,27 @@
+import collections
+import copy
+import datetime
 import json
 import logging
 import re
+import threading
+import time
 
+import iso8601
+import pytz
 import SoftLayer
 
 
+from jumpgate.common import cache
 from jumpgate.common import config
+from jumpgate.common import dispatcher
 from jumpgate.common import error_handling
+from jumpgate.common import jobs
+from jumpgate.common import streaming
 from jumpgate.common import utils
+from jumpgate.common.sl import auth as sl_auth
+from jumpgate.common.sl import topology
+from jumpgate.image.drivers.sl import images as glance_images
 
 
 LOG = logging.getLogger(__name__)
@@ -24,6 +38,39 @@ OPENSTACK_POWER_MAP = {
     "SUSPENDED": 7,
 }
 
+# Nova status -> (SoftLayer powerState keyName, provisionDate operation),
+# the reverse of _get_power_state_and_status
+STATUS_FILTERS = {
+    'ACTIVE': ('RUNNING', 'not null'),
+    'BUILD': ('RUNNING', 'is null'),
+    'PAUSED': ('PAUSED', None),
+    'ERROR': ('CRASHED', None),
+    'SUSPENDED': ('SUSPENDED', None),
+    'SHUTOFF': ('HALTED', None),
+}
+
+# Nova's default osapi_max_limit
+DEFAULT_MAX_LIMIT = 1000
+
+SERVER_LIST_MASK = 'mask[id,hostname]'
+
+# Dates in object filters are taken to be in the API's local time
+SOFTLAYER_TIMEZONE = pytz.timezone('America/Chicago')
+
+# Just what the guest state in snapshots is made of
+SNAPSHOT_MASK = ('mask[id,hostname,createDate,modifyDate,provisionDate,'
+                 'powerState.keyName,primaryIpAddress,'
+                 'primaryBackendIpAddress]')
+# Guests modified this long before the newest modifyDate seen are fetched
+# again on refresh, modifyDate only having a one second granularity
+SNAPSHOT_OVERLAP = datetime.timedelta(seconds=60)
+# Snapshots are rebuilt from scratch once this old, which drops the
+# guests deleted in the meantime
+DEFAULT_SNAPSHOT_TTL = 300
+DEFAULT_SNAPSHOT_SIZE = 1024
+
+DEFAULT_GUEST_FLAVOR_CACHE_SIZE = 10000
+
 
 class ServerActionV2(object):
     def __init__(self, app, flavors):
@@ -87,31 +134,31 @@ class ServerActionV2(object):
                 disks.append(disk)
 
             try:
-                vg_client.createArchiveTransaction(
+                transaction = vg_client.createArchiveTransaction(
                     image_name,
                     disks,
                     "Auto-created by OpenStack compatibility layer",
                     id=instance_id,
                 )
-                # Workaround for not having an image guid until the image is
-                # fully created. TODO(nbeitenmiller): Fix this
-                vs.wait_for_transaction(instance_id, 300)
-                _filter = {
-                    'privateBlockDeviceTemplateGroups': {
-                        'name': {'operation': image_name},
-                        'createDate': {
-                            'operation': 'orderBy',
-                            'options': [{'name': 'sort', 'value': ['DESC']}],
-                        }
-                    }}
-
-                acct = req.sl_client['Account']
-                matching_image = acct.getPrivateBlockDeviceTemplateGroups(
-                    mask='id, globalIdentifier', filter=_filter, limit=1)
-                image_guid = matching_image.get('globalIdentifier')
+                # There is no image guid until the image is fully created,
+                # so hand out an id carrying the new template group's id,
+                # which the image API resolves in any process once the
+                # capture transaction is done.
+                capture = glance_images.ImageCapture(
+                    req.sl_client, transaction['id'],
+                    sl_auth.get_account_id(req))
+                job_id = None
+                if capture.find_group() is not None:
+                    job_id = glance_images.get_pending_image_id(
+                        capture.group_id)
+                job = jobs.job_tracker().poll(
+                    capture,
+                    interval=glance_images.CAPTURE_POLL_INTERVAL,
+                    timeout=glance_images.DEFAULT_CAPTURE_TIMEOUT,
+                    job_id=job_id, info={'name': image_name})
 
                 url = self.app.get_endpoint_url('image', req, 'v2_image',
-                                                image_guid=image_guid)
+                                                image_guid=job.id)
 
                 resp.status = 202
                 resp.set_header('location', url)
@@ -123,16 +170,17 @@ class ServerActionV2(object):
             return
         elif 'resize' in body:
             flavor_id = int(body['resize'].get('flavorRef'))
-            for flavor in self.flavors:
-                if str(flavor_id) == flavor['id']:
-                    vg_client.setTags('{"flavor_id": ' + str(flavor_id) + '}',
-                                      id=instance_id)
-                    vs.upgrade(instance_id, cpus=flavor['cpus'],
-                               memory=flavor['ram'] / 1024)
-                    resp.status = 202
-                    return
-            return error_handling.bad_request(resp, message="Invalid flavor "
-                                              "id in the request body")
+            flavor = self.flavors.get(flavor_id)
+            if flavor is None:
+                return error_handling.bad_request(resp, message="Invalid "
+                                                  "flavor id in the request "
+                                                  "body")
+            vg_client.setTags('{"flavor_id": ' + str(flavor_id) + '}',
+                              id=instance_id)
+            vs.upgrade(instance_id, cpus=flavor['cpus'],
+                       memory=flavor['ram'] / 1024)
+            resp.status = 202
+            return
         elif 'confirmResize' in body:
             resp.status = 204
             return
@@ -152,11 +200,13 @@ class ServersV2(object):
         client = req.sl_client
         vs = SoftLayer.VSManager(client)
 
-        params = get_list_params(req)
+        try:
+            params = get_list_params(req, self.flavors,
+                                     mask=SERVER_LIST_MASK)
+        except ValueError as e:
+            return error_handling.bad_request(resp, message=str(e))
 
-        sl_instances = vs.list_instances(**params)
-        if not isinstance(sl_instances, list):
-            sl_instances = [sl_instances]
+        sl_instances = list_instances(req, vs, params)
 
         results = []
         for instance in sl_instances:
@@ -175,6 +225,9 @@ class ServersV2(object):
 
         resp.status = 200
         resp.body = {'servers': results}
+        links = get_servers_links(req, params, sl_instances)
+        if links:
+            resp.body['servers_links'] = links
 
     @staticmethod
     def _stash_user_id_in_metadata(req, body):
@@ -214,7 +267,9 @@ class ServersV2(object):
             self._handle_user_data(payload, body)
             self._handle_datacenter(payload, body)
             if networks:
-                self._handle_network(payload, client, networks)
+                self._handle_network(payload, client, networks,
+                                     account_id=sl_auth.get_account_id(req),
+                                     user_id=sl_auth.get_user_id(req))
             new_instance = vs.create_instance(**payload)
         except Exception as e:
             return error_handling.bad_request(resp, message=str(e))
@@ -246,21 +301,20 @@ class ServersV2(object):
 
     def _handle_flavor(self, payload, body):
         flavor_id = int(body['server'].get('flavorRef'))
-        for flavor in self.flavors:
-            if str(flavor_id) == flavor['id']:
-                payload['cpus'] = flavor['cpus']
-                payload['memory'] = flavor['ram']
-                payload['local_disk'] = (False if flavor['disk-type'] == 'SAN'
-                                         else True)
-                try:
-                    port_speed = flavor['portspeed']
-                    payload['nic_speed'] = port_speed
-                except Exception:
-                    # If port speed is not specified, it is left to SoftLayer
-                    # to provide the 'default' port speed
-                    pass
-                return
-        raise Exception('Flavor could not be found')
+        flavor = self.flavors.get(flavor_id)
+        if flavor is None:
+            raise Exception('Flavor could not be found')
+        payload['cpus'] = flavor['cpus']
+        payload['memory'] = flavor['ram']
+        payload['local_disk'] = (False if flavor['disk-type'] == 'SAN'
+                                 else True)
+        try:
+            port_speed = flavor['portspeed']
+            payload['nic_speed'] = port_speed
+        except Exception:
+            # If port speed is not specified, it is left to SoftLayer
+            # to provide the 'default' port speed
+            pass
 
     def _handle_sshkeys(self, payload, body, client):
         ssh_keys = []
@@ -293,7 +347,8 @@ class ServersV2(object):
             raise Exception('availability_zone missing')
         payload['datacenter'] = datacenter
 
-    def _handle_network(self, payload, client, networks):
+    def _handle_network(self, payload, client, networks, account_id=None,
+                        user_id=None):
         """Set the network part for the payload. Support the following:
 
         1) --net-id=public
@@ -323,17 +378,15 @@ class ServersV2(object):
             return
 
         private_network_only = True
+        vlans = topology.topology_cache()
         try:
-            _filter = {
-                'networkVlans': {'id': {'operation': int(networks[0]['uuid'])}}
-            }
+            private_id = int(networks[0]['uuid'])
         except Exception:
             raise ValueError('Invalid id format')
 
-        priv_id_valid = (
-            client['Account'].getPrivateNetworkVlans(filter=_filter))
-        if priv_id_valid:
-            payload['private_vlan'] = int(networks[0]['uuid'])
+        if vlans.get_vlan(client, account_id, private_id, 'PRIVATE',
+                          user_id=user_id):
+            payload['private_vlan'] = private_id
         else:
             raise Exception('Private vlan must be specified first '
                             'or is invalid')
@@ -341,16 +394,12 @@ class ServersV2(object):
         # if there is another net-id, then it should be a public network
         if len(networks) == 2:
             try:
-                _filter = {
-                    'networkVlans': {'id': {'operation':
-                                            int(networks[1]['uuid'])}}
-                }
+                public_id = int(networks[1]['uuid'])
             except Exception:
                 raise ValueError('Invalid id format')
-            pub_id_valid = (
-                client['Account'].getPublicNetworkVlans(filter=_filter))
-            if pub_id_valid:
-                payload['public_vlan'] = int(networks[1]['uuid'])
+            if vlans.get_vlan(client, account_id, public_id, 'PUBLIC',
+                              user_id=user_id):
+                payload['public_vlan'] = public_id
                 private_network_only = False
             else:
                 raise Exception('Public vlan must be specified second '
@@ -359,90 +408,327 @@ class ServersV2(object):
         payload['private'] = private_network_only
 
 
-def get_list_params(req):
+def get_list_params(req, flavors=None, mask=None):
+    """Translate the Nova server list query into list_instances arguments.
+
+    All filters, the marker and the page size are pushed down to SoftLayer
+    so only the requested page of guests is ever fetched.
+
+    :param req: The falcon request.
+    :param flavors: The FlavorRegistry used to resolve the flavor filter.
+    :param mask: The object mask, defaults to the full server detail mask.
+    :returns: The list_instances kwargs, or None when the filters can't
+              match any server.
+    :raises ValueError: If a filter value is malformed.
+    """
     _filter = {
         'virtualGuests': {
-            'createDate': {
+            'id': {
                 'operation': 'orderBy',
                 'options': [{'name': 'sort', 'value': ['ASC']}],
             }
         }
     }
+    guest_filter = _filter['virtualGuests']
 
     if req.get_param('marker') is not None:
-        _filter['virtualGuests']['id'] = {
-            'operation': '> %s' % req.get_param('marker')
-        }
+        try:
+            marker = int(req.get_param('marker'))
+        except ValueError:
+            raise ValueError('Invalid marker')
+        guest_filter['id']['operation'] = '> %s' % marker
 
     if req.get_param('image') is not None:
-        # TODO(kmcdonald): filter on image in URL format
-        pass
+        guest_filter['blockDeviceTemplateGroup'] = {
+            'globalIdentifier': {
+                'operation': _get_ref_id(req.get_param('image'))}
+        }
 
     if req.get_param('flavor') is not None:
-        # TODO(kmcdonald): filter on flavor in URL format
-        pass
+        flavor = None
+        if flavors is not None:
+            flavor = flavors.get(_get_ref_id(req.get_param('flavor')))
+        if flavor is None:
+            return None
+        guest_filter['maxCpu'] = {'operation': flavor['cpus']}
+        guest_filter['maxMemory'] = {'operation': flavor['ram']}
 
     if req.get_param('status') is not None:
-        # TODO(kmcdonald): filter on status
-        pass
+        status = STATUS_FILTERS.get(req.get_param('status').upper())
+        if status is None:
+            return None
+        power_state, provisioned = status
+        guest_filter['powerState'] = {
+            'keyName': {'operation': power_state}}
+        if provisioned is not None:
+            guest_filter['provisionDate'] = {'operation': provisioned}
 
     if req.get_param('changes-since') is not None:
-        # TODO(kmcdonald): filter on changes-since
-        pass
+        guest_filter['modifyDate'] = get_modified_filter(
+            _get_changes_since(req))
 
     if req.get_param('ip') is not None:
-        _filter['virtualGuests']['primaryIpAddress'] = {
+        guest_filter['primaryIpAddress'] = {
             'operation': req.get_param('ip')
         }
 
     if req.get_param('ip6') is not None:
-        # TODO(kmcdonald): filter on ipv6 address
-        pass
+        guest_filter['primaryNetworkComponent'] = {
+            'primaryVersion6IpAddressRecord': {
+                'ipAddress': {'operation': req.get_param('ip6')}}
+        }
 
     name = req.get_param('name') or req.get_param('instance_name')
     if name is not None:
-        _filter['virtualGuests']['hostname'] = {'operation': '~ %s' % name}
+        guest_filter['hostname'] = {'operation': '~ %s' % name}
 
-    limit = None
+    max_limit = config.getint('compute', 'max_limit', DEFAULT_MAX_LIMIT)
+    limit = max_limit
     if req.get_param('limit') is not None:
         try:
-            limit = int(req.get_param('limit'))
+            limit = min(int(req.get_param('limit')), max_limit)
         except ValueError:
             pass
 
     return {
         'limit': limit,
         'filter': _filter,
-        'mask': get_virtual_guest_mask(),
+        'mask': mask or get_virtual_guest_mask(),
+    }
+
+
+def _get_ref_id(ref):
+    """Return the id from an id or URL reference such as an imageRef."""
+    return ref.rstrip('/').rsplit('/', 1)[-1]
+
+
+def _get_changes_since(req):
+    try:
+        return iso8601.parse_date(req.get_param('changes-since'))
+    except iso8601.ParseError:
+        raise ValueError('Invalid changes-since value')
+
+
+def get_modified_filter(since):
+    """Return the filter matching guests modified after the since datetime.
+    """
+    return {
+        'operation': 'greaterThanDate',
+        'options': [{
+            'name': 'date',
+            'value': [since.astimezone(SOFTLAYER_TIMEZONE).strftime(
+                '%m/%d/%Y %H:%M:%S')],
+        }],
     }
 
 
+GuestState = collections.namedtuple('GuestState', [
+    'id', 'hostname', 'modified', 'power_state', 'status', 'ips'])
+
+
+def get_guest_state(instance):
+    """Return the GuestState of a guest fetched with SNAPSHOT_MASK."""
+    power_state, status = _get_power_state_and_status(instance)
+    ips = tuple(ip for ip in (instance.get('primaryIpAddress'),
+                              instance.get('primaryBackendIpAddress')) if ip)
+    modified = instance.get('modifyDate') or instance['createDate']
+    return GuestState(instance['id'], instance.get('hostname'),
+                      iso8601.parse_date(modified), power_state, status, ips)
+
+
+class GuestSnapshot(object):
+    """The state of the guests of a tenant, kept current by modifyDate.
+
+    The first refresh loads every guest, the following ones only fetch the
+    guests modified since the newest modifyDate seen. Requests waiting on
+    a refresh share the next one to start, so concurrent pollers of a
+    tenant cost a single call.
+    """
+
+    def __init__(self):
+        self.guests = {}
+        self.modified = None
+        self._refreshed_from = None
+        self._lock = threading.Lock()
+
+    def refresh(self, client):
+        requested = time.time()
+        with self._lock:
+            # A refresh started after this request came in is as recent
+            # as one we would make
+            if (self._refreshed_from is not None and
+                    self._refreshed_from >= requested):
+                return
+            started = time.time()
+            self._update(client)
+            self._refreshed_from = started
+
+    def _update(self, client):
+        params = {'mask': SNAPSHOT_MASK}
+        if self.modified is not None:
+            params['filter'] = {'virtualGuests': {
+                'modifyDate': get_modified_filter(
+                    self.modified - SNAPSHOT_OVERLAP)}}
+        instances = SoftLayer.VSManager(client).list_instances(**params)
+
+        # Readers keep using the previous dict while this one is built
+        guests = dict(self.guests)
+        for instance in instances:
+            state = get_guest_state(instance)
+            guests[state.id] = state
+            if self.modified is None or state.modified > self.modified:
+                self.modified = state.modified
+        self.guests = guests
+
+    def changed_since(self, since):
+        """Return the GuestStates of the guests modified after since."""
+        return [state for state in self.guests.values()
+                if state.modified > since]
+
+
+class GuestSnapshots(object):
+    """GuestSnapshots by tenant and user, guests visible being per user."""
+
+    def __init__(self, ttl=DEFAULT_SNAPSHOT_TTL,
+                 maxsize=DEFAULT_SNAPSHOT_SIZE):
+        self._snapshots = cache.LRUCache(maxsize=maxsize, ttl=ttl,
+                                         name='guest_snapshots')
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id, user_id):
+        key = (tenant_id, user_id)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                snapshot = GuestSnapshot()
+                self._snapshots.set(key, snapshot)
+        return snapshot
+
+
+_guest_snapshots = None
+
+
+def guest_snapshots():
+    global _guest_snapshots
+    if _guest_snapshots is None:
+        _guest_snapshots = GuestSnapshots(
+            ttl=config.getint('compute', 'guest_snapshot_ttl',
+                              DEFAULT_SNAPSHOT_TTL),
+            maxsize=config.getint('compute', 'guest_snapshot_size',
+                                  DEFAULT_SNAPSHOT_SIZE))
+    return _guest_snapshots
+
+
+def get_changed_ids(req):
+    """Return the ids of the guests a changes-since server list can have.
+
+    The tenant's guest snapshot is refreshed, which only fetches the
+    guests modified since its last refresh, and looked up for the changes
+    matching the status filter. None when the snapshots aren't used.
+    """
+    auth = req.env.get('auth')
+    if (req.get_param('changes-since') is None or not auth or
+            not config.getboolean('compute', 'guest_snapshots', True)):
+        return None
+
+    snapshot = guest_snapshots().get(auth.get('tenant_id'),
+                                     auth.get('user_id'))
+    snapshot.refresh(req.sl_client)
+    changed = snapshot.changed_since(_get_changes_since(req))
+    status = req.get_param('status')
+    if status is not None:
+        changed = [state for state in changed
+                   if state.status == status.upper()]
+    return [state.id for state in changed]
+
+
+def list_instances(req, vs, params):
+    """List the guests of get_list_params, in id order.
+
+    The details of a changes-since list are only fetched for the guests
+    the snapshot has changes of, so polling a tenant where nothing
+    happened doesn't list anything. Those are listed a page of ids at a
+    time, when only the filters the snapshot applied are given the first
+    page of ids is normally all it takes.
+    """
+    if not params:
+        return []
+
+    ids = get_changed_ids(req)
+    if ids is None:
+        instances = vs.list_instances(**params)
+        if not isinstance(instances, list):
+            instances = [instances]
+        return instances
+
+    if req.get_param('marker') is not None:
+        ids = [guest_id for guest_id in ids
+               if guest_id > int(req.get_param('marker'))]
+    if not ids:
+        return []
+
+    # The other filters still apply to every page of ids, the paging is
+    # done here
+    limit = params['limit']
+    ids = sorted(ids)
+    results = []
+    for start in range(0, len(ids), limit):
+        kwargs = dict((key, value) for key, value in params.items()
+                      if key not in ('filter', 'limit'))
+        kwargs['filter'] = copy.deepcopy(params['filter'])
+        kwargs['filter']['virtualGuests']['id'] = {
+            'operation': 'in',
+            'options': [{'name': 'data',
+                         'value': ids[start:start + limit]}],
+        }
+        instances = vs.list_instances(**kwargs)
+        if not isinstance(instances, list):
+            instances = [instances]
+        results.extend(instances)
+        if len(results) >= limit:
+            break
+    results.sort(key=lambda instance: instance['id'])
+    return results[:limit]
+
+
+def get_servers_links(req, params, instances):
+    """Return the next link of a server list, when the page is full."""
+    if not params or not instances or len(instances) < params['limit']:
+        return []
+    return [dispatcher.get_next_link(req, instances[-1]['id'])]
+
+
 class ServersDetailV2(object):
-    def __init__(self, app):
+    def __init__(self, app, flavors=None):
         self.app = app
+        self.flavors = flavors
 
     def on_get(self, req, resp, tenant_id=None):
         client = req.sl_client
         vs = SoftLayer.VSManager(client)
 
-        params = get_list_params(req)
+        try:
+            params = get_list_params(req, self.flavors)
+        except ValueError as e:
+            return error_handling.bad_request(resp, message=str(e))
 
-        sl_instances = vs.list_instances(**params)
-        if not isinstance(sl_instances, list):
-            sl_instances = [sl_instances]
+        sl_instances = list_instances(req, vs, params)
 
-        results = []
-        for instance in sl_instances:
-            results.append(
-                get_server_details_dict(self.app, req, instance, False))
+        results = (get_server_details_dict(self.app, req, instance,
+                                           self.flavors)
+                   for instance in sl_instances)
 
         resp.status = 200
-        resp.body = {'servers': results}
+        resp.body = {'servers': streaming.list_body(results)}
+        links = get_servers_links(req, params, sl_instances)
+        if links:
+            resp.body['servers_links'] = links
 
 
 class ServerV2(object):
-    def __init__(self, app):
+    def __init__(self, app, flavors=None):
         self.app = app
+        self.flavors = flavors
 
     def on_get(self, req, resp, tenant_id, server_id):
         client = req.sl_client
@@ -451,7 +737,8 @@ class ServerV2(object):
         instance = vs.get_instance(server_id,
                                    mask=get_virtual_guest_mask())
 
-        results = get_server_details_dict(self.app, req, instance, True)
+        results = get_server_details_dict(self.app, req, instance,
+                                          self.flavors)
 
         resp.body = {'server': results}
 
@@ -485,7 +772,8 @@ class ServerV2(object):
         instance = vs.get_instance(server_id,
                                    mask=get_virtual_guest_mask())
 
-        results = get_server_details_dict(self.app, req, instance, False)
+        results = get_server_details_dict(self.app, req, instance,
+                                          self.flavors)
         resp.body = {'server': results}
 
 
@@ -509,6 +797,82 @@ def _get_user_id_from_metadata(instance):
     return str(uid)
 
 
+def _get_flavor_id_from_tags(tags):
+    """Parse the flavor id stashed in the guest tags on create/resize.
+
+    :param tags: The SoftLayer_Tag_Reference list of the instance.
+    :returns: The flavor id as an int or None if no flavor tag is found.
+    """
+    for tag in tags:
+        tag_string = utils.lookup(tag, 'tag', 'name') or ''
+        if 'flavor_id' in tag_string:
+            # Try to parse the flavor id from the tag format
+            # i.e. 'flavor_id: 2'
+            match = re.search(r'\d+', tag_string)
+            if match:
+                return int(match.group())
+    return None
+
+
+def _infer_flavor_id(instance, flavors):
+    tag_flavor_id = _get_flavor_id_from_tags(
+        instance.get('tagReferences') or [])
+    if flavors is None:
+        return tag_flavor_id
+
+    candidates = flavors.find_by_shape(instance.get('maxCpu'),
+                                       instance.get('maxMemory'))
+    if len(candidates) > 1 and 'localDiskFlag' in instance:
+        disk_type = 'LOCAL' if instance['localDiskFlag'] else 'SAN'
+        candidates = ([flavor for flavor in candidates
+                       if flavor.get('disk-type', '').upper() == disk_type]
+                      or candidates)
+    candidate_ids = [int(flavor['id']) for flavor in candidates]
+    if tag_flavor_id in candidate_ids:
+        return tag_flavor_id
+    if candidate_ids:
+        return candidate_ids[0]
+    # Guests resized outside of Jumpgate or flavors since removed
+    return tag_flavor_id
+
+
+def get_flavor_id(instance, flavors=None):
+    """Infer the flavor of a guest from its maxCpu, maxMemory and disk type.
+
+    The flavor_id tag set on create and resize only breaks ties between
+    flavors of the same shape, or stands in when no flavor matches. The
+    result is cached by guest id and modifyDate.
+
+    :param instance: The SoftLayer_Virtual_Guest instance.
+    :param flavors: The FlavorRegistry, tags alone are used without one.
+    :returns: The flavor id as an int or None if it can't be told.
+    """
+    if not instance.get('modifyDate'):
+        return _infer_flavor_id(instance, flavors)
+
+    key = (instance['id'], instance['modifyDate'],
+           flavors.generation if flavors is not None else None)
+    flavor_id = guest_flavors().get(key, _NOT_CACHED)
+    if flavor_id is _NOT_CACHED:
+        flavor_id = _infer_flavor_id(instance, flavors)
+        guest_flavors().set(key, flavor_id)
+    return flavor_id
+
+
+_NOT_CACHED = object()
+_guest_flavors = None
+
+
+def guest_flavors():
+    global _guest_flavors
+    if _guest_flavors is None:
+        _guest_flavors = cache.LRUCache(
+            maxsize=config.getint('compute', 'guest_flavor_cache_size',
+                                  DEFAULT_GUEST_FLAVOR_CACHE_SIZE),
+            name='guest_flavors')
+    return _guest_flavors
+
+
 def _get_power_state_and_status(instance):
     """Get the power_state and status values based on the current VSI state.
 
@@ -546,39 +910,19 @@ def _get_power_state_and_status(instance):
     return power_state, status
 
 
-def get_server_details_dict(app, req, instance, is_list):
+def get_server_details_dict(app, req, instance, flavors=None):
 
     image_id = utils.lookup(instance,
                             'blockDeviceTemplateGroup',
                             'globalIdentifier')
     tenant_id = str(instance['accountId'])
 
-    client = req.sl_client
-    vs = client['Virtual_Guest']
-
-    flavor_url = None
-    flavor_id = 1
-
-    if is_list:
-        tags = vs.getTagReferences(id=instance['id'])
-        for tag in tags:
-            if 'flavor_id' in tag['tag']['name']:
-                try:
-                    # Try to parse the flavor id from the tag format
-                    # i.e. 'flavor_id: 2'
-                    tag_string = tag['tag']['name']
-
-                    flavor_id = int(re.search(r'\d+', tag_string).group())
-                    flavor_url = app.get_endpoint_url(
-                        'compute', req, 'v2_flavor', flavor_id=flavor_id)
-                except Exception:
-                    pass
-
-    # Workaround of hardcoded ID for VS's created before flavor-id
-    # pushed into tags
-    if not flavor_url:
-        flavor_url = app.get_endpoint_url(
-            'compute', req, 'v2_flavor', flavor_id=1)
+    # Workaround of hardcoded ID for VS's whose flavor can't be told
+    flavor_id = get_flavor_id(instance, flavors)
+    if flavor_id is None:
+        flavor_id = 1
+    flavor_url = app.get_endpoint_url(
+        'compute', req, 'v2_flavor', flavor_id=flavor_id)
 
     server_url = app.get_endpoint_url(
         'compute', req, 'v2_server', server_id=instance['id'])
@@ -698,6 +1042,7 @@ def get_virtual_guest_mask():
         'datacenter',
         'maxMemory',
         'maxCpu',
+        'localDiskFlag',
         'status',
         'powerState',
         'activeTransaction[transactionStatus]',
@@ -708,6 +1053,7 @@ def get_virtual_guest_mask():
         'sshKeys',
         'billingItem.orderItem.order.userRecordId',
         'userData',
+        'tagReferences.tag.name',
     ]
 
     return 'mask[%s]' % ','.join(mask)
@@ -1,15 +1,29 @@
 import base64
+import hashlib
+import hmac
 import json
 import logging
+import os
 import time
 
+import six
+
 from jumpgate.common import aes
+from jumpgate.common import cache
 from jumpgate.common import exceptions
 from jumpgate.common import utils
 from jumpgate.common import config
 
 DEFAULT_TOKEN_DURATION = 60 * 60 * 24
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+DEFAULT_AUTH_CACHE_SIZE = 1000
+DEFAULT_AUTH_CACHE_TTL = 300
 LOG = logging.getLogger(__name__)
+_token_cache = None
+_auth_cache = None
+# Random per process, so auth cache keys can't be precomputed from
+# guessed credentials
+_auth_cache_salt = os.urandom(32)
 
 
 def auth_driver():
@@ -24,6 +38,37 @@ def token_id_driver():
     return utils.load_driver(config.PARSER.get('identity','token_id_driver'))
 
 
+def token_cache():
+    """Cache of token ID -> decoded token, entries expire with the token."""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = cache.LRUCache(
+            maxsize=config.getint('identity', 'token_cache_size',
+                                  DEFAULT_TOKEN_CACHE_SIZE),
+            name='identity_tokens')
+    return _token_cache
+
+
+def auth_cache():
+    """Cache of credential hash -> verified user, entries are short lived."""
+    global _auth_cache
+    if _auth_cache is None:
+        _auth_cache = cache.LRUCache(
+            maxsize=config.getint('identity', 'auth_cache_size',
+                                  DEFAULT_AUTH_CACHE_SIZE),
+            ttl=config.getint('identity', 'auth_cache_ttl',
+                              DEFAULT_AUTH_CACHE_TTL),
+            name='identity_auth')
+    return _auth_cache
+
+
+def auth_cache_key(*parts):
+    """Return a salted hash of the credential parts for the auth cache."""
+    data = u'\0'.join(six.text_type(part) for part in parts)
+    return hmac.new(_auth_cache_salt, data.encode('utf-8'),
+                    hashlib.sha256).hexdigest()
+
+
 def validate_token_id(token_id, user_id=None, username=None, tenant_id=None):
     token = token_id_driver().token_from_id(token_id)
     token_driver().validate_token(token, user_id, username, tenant_id)
@@ -266,7 +311,17 @@ class AESTokenIdDriver(TokenIdDriver):
         return base64.b64encode(aes.encode_aes(json.dumps(token)))
 
     def token_from_id(self, token_id):
+        tokens = token_cache()
+        token = tokens.get(token_id)
+        if token is not None:
+            # callers (e.g. Request.user_id) may modify the token they get
+            return dict(token)
+
         try:
-            return json.loads(aes.decode_aes(base64.b64decode(token_id)))
+            token = json.loads(aes.decode_aes(base64.b64decode(token_id)))
         except (TypeError, ValueError):
             raise exceptions.InvalidTokenError('Malformed token')
+
+        if isinstance(token, dict) and 'expires' in token:
+            tokens.set(token_id, dict(token), expires=token['expires'])
+        return token
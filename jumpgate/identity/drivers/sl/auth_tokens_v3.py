@@ -8,6 +8,7 @@ import os.path
 from jumpgate.common import aes
 from jumpgate.common.sl import auth
 from jumpgate.identity.drivers import core as identity
+from jumpgate.identity.drivers.sl import catalog as sl_catalog
 
 LOG = logging.getLogger(__name__)
 
@@ -78,18 +79,11 @@ class AuthTokensV3(object):
         except IOError:
             LOG.critical('Unable to open template file %s', template_file)
             raise
+        self.catalog = sl_catalog.CatalogTemplate(self.templates,
+                                                  name='identity_catalog_v3')
 
     def _get_catalog(self, tenant_id, user_id):
-        d = {'tenant_id': tenant_id, 'user_id': user_id}
-
-        o = {}
-        for region, region_ref in self.templates.items():
-            o[region] = {}
-            for service, service_ref in region_ref.items():
-                o[region][service] = {}
-                for k, v in service_ref.items():
-                    o[region][service][k] = v.replace('$(', '%(') % d
-        return o
+        return self.catalog.render(tenant_id, user_id)
 
     def _build_catalog(self, token_details, user_id):
         raw_catalog = self._get_catalog(token_details['tenant_id'], user_id)
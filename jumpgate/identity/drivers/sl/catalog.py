@@ -0,0 +1,43 @@
+from jumpgate.common import cache
+from jumpgate.common import config
+
+DEFAULT_CATALOG_CACHE_SIZE = 1000
+
+
+class CatalogTemplate(object):
+    """Service catalog templates compiled once and rendered per user.
+
+    Template values use the keystone $(name)s syntax. They are turned into
+    %-format strings at load time, values without variables are kept as
+    they are, and rendered catalogs are cached per (tenant_id, user_id).
+    """
+
+    def __init__(self, templates, maxsize=None, name=None):
+        self._compiled = []
+        for region, region_ref in templates.items():
+            for service, service_ref in region_ref.items():
+                for key, value in service_ref.items():
+                    fmt = value.replace('$(', '%(')
+                    self._compiled.append(
+                        (region, service, key, fmt, '%(' in fmt))
+        if maxsize is None:
+            maxsize = config.getint('identity', 'catalog_cache_size',
+                                    DEFAULT_CATALOG_CACHE_SIZE)
+        self._cache = cache.LRUCache(maxsize=maxsize, name=name)
+
+    def render(self, tenant_id, user_id):
+        """Return the {region: {service: {key: value}}} catalog.
+
+        The result is shared between requests and must not be modified.
+        """
+        key = (tenant_id, user_id)
+        catalog = self._cache.get(key)
+        if catalog is None:
+            d = {'tenant_id': tenant_id, 'user_id': user_id}
+            catalog = {}
+            for region, service, name, fmt, has_vars in self._compiled:
+                service_ref = catalog.setdefault(region, {}).setdefault(
+                    service, {})
+                service_ref[name] = fmt % d if has_vars else fmt
+            self._cache.set(key, catalog)
+        return catalog
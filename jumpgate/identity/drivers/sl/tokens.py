@@ -10,6 +10,7 @@ from jumpgate.common import exceptions
 from jumpgate.common.sl import auth
 from jumpgate.common import utils
 from jumpgate.identity.drivers import core as identity
+from jumpgate.identity.drivers.sl import catalog as sl_catalog
 
 from jumpgate.common import config
 import SoftLayer
@@ -109,38 +110,25 @@ class SLAuthDriver(identity.AuthDriver):
                 raise exceptions.Unauthorized(
                     'Invalid username, password or tenant id')
 
-        endpoint = config.PARSER.get('softlayer','endpoint')
-        proxy = config.PARSER.get('softlayer','proxy')
         # If the 'password' is the right length, treat it as an API api_key
         if len(credential) == 64:
-            client = SoftLayer.Client(username=username,
-                                      api_key=credential,
-                                      endpoint_url=endpoint,
-                                      proxy=proxy)
-            user = client['Account'].getCurrentUser(mask=USER_MASK)
+            user = auth.get_user_by_api_key(username, credential)
             assert_tenant(user)
             return {'user': user, 'credential': credential,
                     'auth_type': 'api_key'}
 
         else:
-            client = SoftLayer.Client(endpoint_url=endpoint,
-                                      proxy=proxy)
-            client.auth = None
             try:
                 if token_auth:
-                    client.auth = SoftLayer.TokenAuthentication(
-                        token['user_id'], credential)
+                    tokenHash = credential
+                    user = auth.get_user_by_token(token['user_id'],
+                                                  credential)
                 else:
-                    userId, tokenHash = (
-                        client.authenticate_with_password(username, credential)
-                    )
+                    userId, tokenHash, user = auth.get_user_by_password(
+                        username, credential)
 
-                user = client['Account'].getCurrentUser(mask=USER_MASK)
                 assert_tenant(user)
 
-                if token_auth:
-                    tokenHash = credential
-
                 return {'user': user, 'credential': tokenHash,
                         'auth_type': 'token'}
             except SoftLayer.SoftLayerAPIError as e:
@@ -191,18 +179,11 @@ class TokensV2(object):
         except IOError:
             LOG.critical('Unable to open template file %s', template_file)
             raise
+        self.catalog = sl_catalog.CatalogTemplate(self.templates,
+                                                  name='identity_catalog')
 
     def _get_catalog(self, tenant_id, user_id):
-        d = {'tenant_id': tenant_id, 'user_id': user_id}
-
-        o = {}
-        for region, region_ref in self.templates.items():
-            o[region] = {}
-            for service, service_ref in region_ref.items():
-                o[region][service] = {}
-                for k, v in service_ref.items():
-                    o[region][service][k] = v.replace('$(', '%(') % d
-        return o
+        return self.catalog.render(tenant_id, user_id)
 
     def _add_catalog_to_access(self, access, token):
         tokens = identity.token_driver()
@@ -1,8 +1,18 @@
-import itertools
+import bisect
+import collections
+import functools
 import json
 import uuid
 
+import SoftLayer
+
+from jumpgate.common import cache
+from jumpgate.common import config
 from jumpgate.common import error_handling
+from jumpgate.common import fanout
+from jumpgate.common import jobs
+from jumpgate.common import streaming
+from jumpgate.common.sl import auth
 from jumpgate.common import utils
 from jumpgate.image.drivers.sl import schema
 
@@ -10,8 +20,23 @@ from jumpgate.image.drivers.sl import schema
 IMAGE_MASK = ('id,accountId,name,globalIdentifier,blockDevices,parentId,'
               'createDate,blockDevicesDiskSpaceTotal,status')
 
+# Images being captured are polled by the id of their template group in
+# the last group of this uuid, until the capture gives them a guid
+PENDING_IMAGE_ID_PREFIX = '00000000-0000-0000-0001-'
+CAPTURE_GROUP_MASK = 'id'
+PENDING_IMAGE_MASK = 'id, name, globalIdentifier, transactionId'
+
 GLANCE_IMAGE_STATUS_ACTIVE = 'active'
 GLANCE_IMAGE_STATUS_DEACTIVATED = 'deactivated'
+GLANCE_IMAGE_STATUS_SAVING = 'saving'
+
+DEFAULT_CATALOG_SIZE = 1000
+DEFAULT_CATALOG_TTL = 60
+DEFAULT_PUBLIC_CATALOG_TTL = 600
+DEFAULT_CAPTURE_TIMEOUT = 60 * 60
+CAPTURE_POLL_INTERVAL = 30
+
+_image_catalog = None
 
 
 class SchemaImageV2(object):
@@ -91,6 +116,31 @@ class ImageV2(object):
 
     def on_get(self, req, resp, image_guid, tenant_id=None):
         client = req.sl_client
+        job = jobs.job_tracker().get(image_guid)
+        group_id = get_pending_group_id(image_guid)
+        if job is not None:
+            if job.pending:
+                resp.status = 200
+                resp.body = get_pending_image_details_dict(
+                    self.app, req, image_guid, job.info.get('name'),
+                    tenant_id)
+                return
+            image_guid = job.result or image_guid
+        elif group_id is not None:
+            # Captured through another process, or the job expired
+            try:
+                group = get_pending_image(client, group_id)
+            except SoftLayer.SoftLayerAPIError:
+                return error_handling.not_found(
+                    resp, 'Image could not be found')
+            if group.get('transactionId') or not group.get(
+                    'globalIdentifier'):
+                resp.status = 200
+                resp.body = get_pending_image_details_dict(
+                    self.app, req, image_guid, group.get('name'), tenant_id)
+                return
+            image_guid = group['globalIdentifier']
+
         results = get_image(client, image_guid)
 
         if not results:
@@ -119,6 +169,7 @@ class ImagesV2(object):
 
         client['Virtual_Guest_Block_Device_Template_Group'].deleteObject(
             id=results['id'])
+        image_catalog().invalidate(auth.get_account_id(req))
 
         resp.status = 204
 
@@ -142,6 +193,7 @@ class ImagesV2(object):
         image_service = req.sl_client[
             'SoftLayer_Virtual_Guest_Block_Device_Template_Group']
         img = image_service.createFromExternalSource(configuration)
+        image_catalog().invalidate(auth.get_account_id(req))
 
         resp.body = {
             'id': img['globalIdentifier'],
@@ -164,30 +216,20 @@ class ImagesV2(object):
         client = req.sl_client
         tenant_id = tenant_id or utils.lookup(req.env, 'auth', 'tenant_id')
 
-        images = []
-        for image in get_all_images(client):
-            img = get_v2_image_details_dict(self.app, req, image, tenant_id,
-                                            self.detail)
-
-            # Apply conditions from filters
-            # TODO(zhiyan): Will add more filters continuously
-            # with requirement-driven way.
-            if req.get_param('name'):
-                if img['name'] != req.get_param('name'):
-                    continue
-
-            images.append(img)
-
-        sorted_images = sorted(images, key=lambda x: x['id'].lower())
-        if req.get_param('marker'):
-            predicate = lambda x: x['id'] <= req.get_param('marker')
-            sorted_images = list(itertools.dropwhile(predicate, sorted_images))
+        index = image_catalog().get_index(client, auth.get_account_id(req))
 
-        if req.get_param('limit'):
-            sorted_images = sorted_images[:int(req.get_param('limit'))]
+        # TODO(zhiyan): Will add more filters continuously
+        # with requirement-driven way.
+        limit = req.get_param('limit')
+        page = index.page(name=req.get_param('name'),
+                          marker=req.get_param('marker'),
+                          limit=int(limit) if limit else None)
 
         resp.status = 200
-        resp.body = {'images': sorted_images}
+        resp.body = {'images': streaming.list_body(
+            get_v2_image_details_dict(self.app, req, image, tenant_id,
+                                      self.detail)
+            for image in page)}
 
 
 class ImageV1(object):
@@ -206,6 +248,7 @@ class ImageV1(object):
 
         client['Virtual_Guest_Block_Device_Template_Group'].deleteObject(
             id=results['id'])
+        image_catalog().invalidate(auth.get_account_id(req))
 
         resp.status = 204
 
@@ -328,6 +371,19 @@ def get_v2_image_details_dict(app, req, image, tenant_id, detail=True):
     return results
 
 
+def get_pending_image_details_dict(app, req, image_id, name, tenant_id):
+    """Return the v2 details of an image which is still being captured."""
+    results = get_v2_image_details_dict(
+        app, req,
+        {'globalIdentifier': image_id,
+         'name': name,
+         'visibility': 'private',
+         'status': {'name': 'Active'}},
+        tenant_id)
+    results.update({'status': GLANCE_IMAGE_STATUS_SAVING, 'progress': 0})
+    return results
+
+
 def get_v1_image_details_dict(app, req, image, tenant_id=None):
     if not image or not image.get('globalIdentifier'):
         return {}
@@ -380,21 +436,186 @@ def get_image_status(image):
     return GLANCE_IMAGE_STATUS_DEACTIVATED
 
 
-def get_all_images(client):
+class ImageIndex(object):
+    """Image list sorted by id with an index by id and name."""
+
+    def __init__(self, images):
+        self.images = sorted(
+            [image for image in images if image.get('globalIdentifier')],
+            key=lambda x: x['globalIdentifier'].lower())
+        self.keys = [image['globalIdentifier'].lower()
+                     for image in self.images]
+        self.by_id = {}
+        self.by_name = collections.defaultdict(list)
+        for image in self.images:
+            self.by_id[image['globalIdentifier']] = image
+            self.by_name[image.get('name')].append(image)
+
+    def page(self, name=None, marker=None, limit=None):
+        """Return the images after marker, optionally matching name."""
+        if name:
+            images = self.by_name.get(name, [])
+            if marker:
+                marker = marker.lower()
+                images = [image for image in images
+                          if image['globalIdentifier'].lower() > marker]
+        else:
+            start = 0
+            if marker:
+                start = bisect.bisect_right(self.keys, marker.lower())
+            images = self.images[start:]
+
+        if limit is not None:
+            images = images[:limit]
+        return images
+
+
+class ImageCatalog(object):
+    """Process wide cache of the SoftLayer image catalog.
+
+    Public images are the same for every account and are cached once,
+    private images are cached per account. Each account gets an ImageIndex
+    of its private images merged with the current public ones, which is
+    rebuilt whenever either side is refreshed.
+    """
+
+    def __init__(self, ttl=DEFAULT_CATALOG_TTL,
+                 public_ttl=DEFAULT_PUBLIC_CATALOG_TTL,
+                 maxsize=DEFAULT_CATALOG_SIZE):
+        self._public = cache.LRUCache(maxsize=1, ttl=public_ttl,
+                                      name='image_public')
+        self._accounts = cache.LRUCache(maxsize=maxsize, ttl=ttl,
+                                        name='image_accounts')
+
+    def get_index(self, client, account_id):
+        public = self._public.get('public')
+        entry = None
+        if account_id is not None:
+            # Without a known account private images can't be shared
+            entry = self._accounts.get(account_id)
+            if entry is not None and entry[0] is public:
+                return entry[2]
+        private = entry[1] if entry is not None else None
+
+        fetch_public = public is None
+        if fetch_public and private is None:
+            public, private = fanout.fan_out(
+                functools.partial(get_public_images, client),
+                functools.partial(get_private_images, client))
+        elif fetch_public:
+            public = get_public_images(client)
+        elif private is None:
+            private = get_private_images(client)
+        if fetch_public:
+            self._public.set('public', public)
+
+        index = ImageIndex(private + public)
+        if account_id is not None:
+            self._accounts.set(account_id, (public, private, index))
+        return index
+
+    def invalidate(self, account_id=None):
+        """Forget the private images of an account, or everything."""
+        if account_id is None:
+            self._public.clear()
+            self._accounts.clear()
+        else:
+            self._accounts.pop(account_id)
+
+
+def image_catalog():
+    global _image_catalog
+    if _image_catalog is None:
+        _image_catalog = ImageCatalog(
+            ttl=config.getint('image', 'catalog_ttl', DEFAULT_CATALOG_TTL),
+            public_ttl=config.getint('image', 'public_catalog_ttl',
+                                     DEFAULT_PUBLIC_CATALOG_TTL),
+            maxsize=config.getint('image', 'catalog_size',
+                                  DEFAULT_CATALOG_SIZE))
+    return _image_catalog
+
+
+def get_private_images(client):
     images = []
     get_private_images = client['Account'].getPrivateBlockDeviceTemplateGroups
     for image in force_list(get_private_images(mask=IMAGE_MASK)):
         image['visibility'] = 'private'
         images.append(image)
+    return images
+
 
+def get_public_images(client):
+    images = []
     vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
     for image in force_list(vgbdtg.getPublicImages(mask=IMAGE_MASK)):
         image['visibility'] = 'public'
         images.append(image)
-
     return images
 
 
+def get_all_images(client, account_id=None):
+    return list(image_catalog().get_index(client, account_id).images)
+
+
+class ImageCapture(object):
+    """Polls a guest capture until its template group has a guid.
+
+    The template group is the one made by the capture's archive
+    transaction, other images with the same name are never mistaken for
+    it. Called as a jobs.JobTracker.poll job by the compute createImage
+    action, returns None while the capture is pending.
+    """
+
+    def __init__(self, client, transaction_id, account_id=None):
+        self.client = client
+        self.transaction_id = transaction_id
+        self.account_id = account_id
+        self.group_id = None
+
+    def find_group(self):
+        """Return the id of the capture's template group, None if unseen.
+
+        The group only carries the transaction's id while it runs.
+        """
+        if self.group_id is None:
+            _filter = {'privateBlockDeviceTemplateGroups': {
+                'transactionId': {'operation': self.transaction_id}}}
+            groups = force_list(
+                self.client['Account'].getPrivateBlockDeviceTemplateGroups(
+                    mask=CAPTURE_GROUP_MASK, filter=_filter, limit=1))
+            if groups and groups[0]:
+                self.group_id = groups[0]['id']
+        return self.group_id
+
+    def __call__(self):
+        if self.find_group() is None:
+            return None
+        group = get_pending_image(self.client, self.group_id)
+        if group.get('transactionId') or not group.get('globalIdentifier'):
+            return None
+        image_catalog().invalidate(self.account_id)
+        return group['globalIdentifier']
+
+
+def get_pending_image_id(group_id):
+    """Return the image id handed out while a template group is captured.
+
+    The group id is encoded in the id, so any jumpgate process can resolve
+    it, not only the one which started the capture.
+    """
+    return jobs.get_pending_id(PENDING_IMAGE_ID_PREFIX, group_id)
+
+
+def get_pending_group_id(image_id):
+    """Return the template group id of a pending image id, or None."""
+    return jobs.get_softlayer_id(PENDING_IMAGE_ID_PREFIX, image_id)
+
+
+def get_pending_image(client, group_id):
+    vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+    return vgbdtg.getObject(id=group_id, mask=PENDING_IMAGE_MASK)
+
+
 def get_image(client, guid):
     vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
     return vgbdtg.getObject(id=guid, mask=IMAGE_MASK)
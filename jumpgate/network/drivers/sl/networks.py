@@ -1,6 +1,7 @@
 import operator
 
 from jumpgate.common import error_handling
+from jumpgate.common.sl import topology
 
 NETWORK_MASK = 'id, name, subnets, vlanNumber, networkSpace'
 
@@ -34,8 +35,11 @@ class NetworkV2(object):
                 return error_handling.bad_request(
                     resp, message="Malformed request body")
 
-            vlan = client['Network_Vlan'].getObject(id=network_id,
-                                                    mask=NETWORK_MASK)
+            vlan = topology.get_request_topology(req).get_vlan(network_id)
+            if vlan is None:
+                # Let SoftLayer tell whether it's missing or not allowed
+                vlan = client['Network_Vlan'].getObject(id=network_id,
+                                                        mask=NETWORK_MASK)
 
         resp.body = {'network': format_network(vlan, tenant_id)}
         resp.status = 200
@@ -49,21 +53,17 @@ class NetworksV2(object):
         @param resp: Http Response body
         """
         tenant_id = req.env['auth']['tenant_id']
-        client = req.sl_client
 
-        _filter = {'networkVlans': {}}
         name_filter = req.get_param('name')
-        if not name_filter:
-            vlans = client['Account'].getNetworkVlans(mask=NETWORK_MASK,
-                                                      filter=_filter)
-            vlans += VLANS.values()
         if name_filter in VLANS:
             vlans = [VLANS[name_filter]]
         else:
-            _filter['networkVlans']['id'] = {
-                'operation': name_filter}
-            vlans = client['Account'].getNetworkVlans(mask=NETWORK_MASK,
-                                                      filter=_filter)
+            account_vlans = topology.get_request_topology(req).vlans
+            if not name_filter:
+                vlans = account_vlans + list(VLANS.values())
+            else:
+                vlans = [vlan for vlan in account_vlans
+                         if str(vlan['id']) == name_filter]
 
         network = [format_network(vlan, tenant_id)
                    for vlan in sorted(vlans, key=operator.itemgetter('id'))]
@@ -1,11 +1,16 @@
-import operator
-
 import ipaddress
 
+from jumpgate.common import cache
+from jumpgate.common import config
+from jumpgate.common import dispatcher
 from jumpgate.common import error_handling
+from jumpgate.common.sl import topology
 
 SUBNET_MASK = ('id, cidr, netmask, networkVlanId, networkIdentifier, gateway, '
-               'version')
+               'version, modifyDate')
+
+# Subnets rendered by (id, modifyDate), the tenant_id being filled in
+DEFAULT_SUBNET_CACHE_SIZE = 10000
 
 
 class SubnetV2(object):
@@ -25,8 +30,10 @@ class SubnetV2(object):
             return error_handling.bad_request(resp,
                                               message="Malformed request body")
 
-        subnet = client['Network_Subnet'].getObject(id=subnet_id,
-                                                    mask=SUBNET_MASK)
+        subnet = topology.get_request_topology(req).get_subnet(subnet_id)
+        if subnet is None:
+            subnet = client['Network_Subnet'].getObject(id=subnet_id,
+                                                        mask=SUBNET_MASK)
         resp.body = {'subnet': format_subnetwork(subnet, tenant_id)}
         resp.status = 200
 
@@ -40,32 +47,51 @@ class SubnetsV2(object):
         @param req: Http Request body
         @param resp: Http Response body
         """
-        client = req.sl_client
         tenant_id = req.env['auth']['tenant_id']
+        account_topology = topology.get_request_topology(req)
 
-        _filter = {'subnets': {}}
+        limit = None
         if req.get_param('name'):
-            _filter['subnets']['id'] = {
-                'operation': req.get_param('name')}
+            subnets = [account_topology.get_subnet(req.get_param('name'))]
+            subnets = [subnet for subnet in subnets if subnet is not None]
+        else:
+            if req.get_param('limit'):
+                if not req.get_param('limit').isdigit():
+                    return error_handling.bad_request(
+                        resp, message='Invalid limit')
+                limit = int(req.get_param('limit'))
+            try:
+                subnets = account_topology.page_subnets(
+                    marker=req.get_param('marker'), limit=limit)
+            except ValueError as e:
+                return error_handling.bad_request(resp, message=str(e))
 
-        subnets = client['Account'].getSubnets(mask=SUBNET_MASK,
-                                               filter=_filter)
         resp.body = {
             'subnets': [format_subnetwork(subnet, tenant_id)
-                        for subnet in sorted(subnets,
-                                             key=operator.itemgetter('id'))]
+                        for subnet in subnets]
         }
+        # A full page may not be the last one
+        if subnets and limit is not None and len(subnets) == limit:
+            resp.body['subnets_links'] = [
+                dispatcher.get_next_link(req, subnets[-1]['id'])]
         resp.status = 200
 
 
 def format_subnetwork(subnet, tenant_id):
-    allocation_pools = []
+    """Render a subnet, reusing the rendering of unmodified subnets."""
+    key = None
+    if subnet.get('modifyDate'):
+        key = (subnet['id'], subnet['modifyDate'])
+        rendered = rendered_subnets().get(key)
+        if rendered is not None:
+            return dict(rendered, tenant_id=tenant_id)
 
     cidr = str(subnet['networkIdentifier']) + '/' + str(subnet['cidr'])
+    network = ipaddress.ip_network(cidr)
 
-    allocation_pools.append({"start": str(ipaddress.ip_network(cidr)[0] + 2),
-                             "end": str(ipaddress.ip_network(cidr)[-1] - 1)})
-    return {
+    allocation_pools = [{"start": str(network[0] + 2),
+                         "end": str(network[-1] - 1)}]
+    rendered = {
         "name": '',
         "tenant_id": tenant_id,
         "allocation_pools": allocation_pools,
@@ -78,3 +104,19 @@ def format_subnetwork(subnet, tenant_id):
         "dns_nameservers": [],
         "host_routes": [],
     }
+    if key is not None:
+        rendered_subnets().set(key, rendered)
+    return rendered
+
+
+_rendered_subnets = None
+
+
+def rendered_subnets():
+    global _rendered_subnets
+    if _rendered_subnets is None:
+        _rendered_subnets = cache.LRUCache(
+            maxsize=config.getint('network', 'subnet_cache_size',
+                                  DEFAULT_SUBNET_CACHE_SIZE),
+            name='subnet_render')
+    return _rendered_subnets
@@ -11,6 +11,7 @@ from jumpgate.common.hooks.core import hook_format
 from jumpgate.common.hooks.core import hook_set_uuid
 from jumpgate.common.hooks.log import log_request
 from jumpgate.common.hooks.log import log_response
+from jumpgate.common import streaming
 
 
 class TestHookFormat(unittest.TestCase):
@@ -25,6 +26,18 @@ class TestHookFormat(unittest.TestCase):
         resp.body = '{"example": "JSON"}'
         resp.content_type = 'application/json'
 
+    def test_format_streaming(self):
+        req = MagicMock()
+        resp = MagicMock()
+        resp.body = {"servers": streaming.StreamingList(iter([1, 2]))}
+        resp.content_type = None
+
+        hook_format(req, resp)
+
+        self.assertIsNone(resp.body)
+        self.assertEqual('{"servers": [1, 2]}', ''.join(resp.stream))
+        self.assertEqual('application/json', resp.content_type)
+
     def test_format_int_status(self):
         req = MagicMock()
         resp = MagicMock()
@@ -0,0 +1,220 @@
+import json
+import unittest
+
+import falcon
+from falcon import testing
+from falcon.testing import helpers
+import mock
+
+from jumpgate import api
+from jumpgate.common import dispatcher
+from jumpgate.common import exceptions
+from jumpgate.common.hooks import core
+from jumpgate.common.hooks import response_cache
+from jumpgate.common import utils
+
+
+class CountingResource(object):
+    def __init__(self):
+        self.calls = 0
+
+    def on_get(self, req, resp, tenant_id):
+        self.calls += 1
+        resp.status = 200
+        resp.body = {'tenant_id': tenant_id,
+                     'validated': req.env.get('tenant_id') is not None}
+
+    def on_put(self, req, resp, tenant_id):
+        resp.status = 202
+
+
+def validate_token(req, resp, kwargs):
+    # Stands in for the SoftLayer client hook
+    if req.get_header('X-Auth-Token'):
+        req.env['tenant_id'] = kwargs['tenant_id']
+
+
+class LazyResource(CountingResource):
+    def on_get(self, req, resp, tenant_id):
+        validate_token(req, resp, {'tenant_id': tenant_id})
+        super(LazyResource, self).on_get(req, resp, tenant_id)
+
+
+class TestEtagMatches(unittest.TestCase):
+    def test_matches(self):
+        self.assertTrue(response_cache.etag_matches('"a"', '"a"'))
+        self.assertTrue(response_cache.etag_matches('"b", "a"', '"a"'))
+        self.assertTrue(response_cache.etag_matches('W/"a"', '"a"'))
+        self.assertTrue(response_cache.etag_matches('*', '"a"'))
+
+    def test_no_match(self):
+        self.assertFalse(response_cache.etag_matches(None, '"a"'))
+        self.assertFalse(response_cache.etag_matches('"b"', '"a"'))
+
+    def test_strong_etag(self):
+        etag = response_cache.get_etag('{"a": 1}')
+        self.assertEqual(etag, response_cache.get_etag(u'{"a": 1}'))
+        self.assertNotEqual(etag, response_cache.get_etag('{"a": 2}'))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_ttls_by_route(self):
+        responses = response_cache.ResponseCache({'/v2/Flavors': 30})
+        self.assertEqual(responses.get_ttl('/v2/flavors'), 30)
+        self.assertIsNone(responses.get_ttl('/v2/servers'))
+        self.assertIsNone(responses.get_ttl(None))
+
+    def test_get_by_query_string(self):
+        responses = response_cache.ResponseCache({'/a': 30})
+        entry = responses.set('key', 'limit=1', 'body', 'text/plain', 30)
+
+        self.assertEqual(responses.get('key', 'limit=1'), entry)
+        self.assertIsNone(responses.get('key', 'limit=2'))
+        self.assertIsNone(responses.get('other', 'limit=1'))
+
+    @mock.patch('time.time')
+    def test_expiry(self, time):
+        time.return_value = 100
+        responses = response_cache.ResponseCache({'/a': 30})
+        responses.set('key', '', 'body', 'text/plain', 30)
+
+        time.return_value = 131
+        self.assertIsNone(responses.get('key', ''))
+
+    def test_invalidate(self):
+        responses = response_cache.ResponseCache({'/a': 30})
+        responses.set('key', 'a=1', 'body', 'text/plain', 30)
+        responses.set('key', 'a=2', 'body', 'text/plain', 30)
+        responses.set('other', '', 'body', 'text/plain', 30)
+
+        responses.invalidate('key')
+        self.assertIsNone(responses.get('key', 'a=1'))
+        self.assertIsNone(responses.get('key', 'a=2'))
+        self.assertIsNotNone(responses.get('other', ''))
+
+
+class TestResponseCacheHooks(unittest.TestCase):
+    resource_class = CountingResource
+    auth_hooks = [validate_token]
+
+    def setUp(self):
+        response_cache._response_cache = response_cache.ResponseCache(
+            {'/v2/{tenant_id}/cached': 60})
+        self.cached = self.resource_class()
+        self.uncached = self.resource_class()
+
+        before = [core.hook_set_uuid] + self.auth_hooks + [
+            response_cache.serve_cached_response]
+        after = [core.hook_format, response_cache.cache_response]
+        routes = {id(self.cached): '/v2/{tenant_id}/cached',
+                  id(self.uncached): '/v2/{tenant_id}/uncached'}
+        self.api = falcon.API(
+            before=before, after=after, request_type=api.Request,
+            middleware=[dispatcher.RouteMiddleware(routes)])
+        self.api.add_error_handler(
+            exceptions.CachedResponse,
+            utils.wrap_handler_with_hooks(exceptions.CachedResponse.handle,
+                                          after))
+        self.api.add_route('/v2/{tenant_id}/cached', self.cached)
+        self.api.add_route('/v2/{tenant_id}/uncached', self.uncached)
+
+    def tearDown(self):
+        response_cache._response_cache = None
+
+    def request(self, path, method='GET', query_string='', headers=None):
+        env = helpers.create_environ(path=path, method=method,
+                                     query_string=query_string,
+                                     headers=headers)
+        srmock = testing.StartResponseMock()
+        body = ''.join(self.api(env, srmock))
+        return srmock.status, srmock.headers_dict, body
+
+    def test_cached(self):
+        status, headers, body = self.request('/v2/123/cached')
+        self.assertEqual(status, falcon.HTTP_200)
+        self.assertEqual(json.loads(body),
+                         {'tenant_id': '123', 'validated': False})
+        etag = headers['etag']
+
+        status, headers, cached_body = self.request('/v2/123/cached')
+        self.assertEqual(status, falcon.HTTP_200)
+        self.assertEqual(cached_body, body)
+        self.assertEqual(headers['etag'], etag)
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertIn('x-compute-request-id', headers)
+        self.assertEqual(self.cached.calls, 1)
+
+    def test_not_modified(self):
+        _, headers, _ = self.request('/v2/123/cached')
+
+        status, _, body = self.request(
+            '/v2/123/cached', headers={'If-None-Match': headers['etag']})
+        self.assertEqual(status, falcon.HTTP_304)
+        self.assertEqual(body, '')
+        self.assertEqual(self.cached.calls, 1)
+
+        status, _, body = self.request(
+            '/v2/123/cached', headers={'If-None-Match': '"stale"'})
+        self.assertEqual(status, falcon.HTTP_200)
+        self.assertNotEqual(body, '')
+
+    def test_not_modified_on_miss(self):
+        _, headers, _ = self.request('/v2/123/cached')
+        response_cache.response_cache().invalidate()
+
+        status, _, _ = self.request(
+            '/v2/123/cached', headers={'If-None-Match': headers['etag']})
+        self.assertEqual(status, falcon.HTTP_304)
+        self.assertEqual(self.cached.calls, 2)
+
+    def test_keyed_by_tenant_and_query(self):
+        self.request('/v2/123/cached')
+        self.request('/v2/456/cached')
+        self.request('/v2/123/cached', query_string='a=1')
+        self.request('/v2/123/cached', query_string='a=1')
+        self.assertEqual(self.cached.calls, 3)
+
+    def test_uncached_route(self):
+        _, headers, _ = self.request('/v2/123/uncached')
+        self.request('/v2/123/uncached')
+        self.assertEqual(self.uncached.calls, 2)
+        self.assertNotIn('etag', headers)
+
+    def test_write_invalidates(self):
+        self.request('/v2/123/cached')
+        status, _, _ = self.request('/v2/123/cached', method='PUT')
+        self.assertEqual(status, falcon.HTTP_202)
+
+        self.request('/v2/123/cached')
+        self.assertEqual(self.cached.calls, 2)
+
+    def test_keyed_by_validated_tenant(self):
+        token = {'X-Auth-Token': 'token'}
+        _, _, body = self.request('/v2/123/cached', headers=token)
+        self.assertTrue(json.loads(body)['validated'])
+
+        _, _, cached_body = self.request('/v2/123/cached', headers=token)
+        self.assertEqual(cached_body, body)
+        _, _, body = self.request('/v2/123/cached')
+        self.assertFalse(json.loads(body)['validated'])
+        self.assertEqual(self.cached.calls, 2)
+
+
+class TestResponseCacheLazyHooks(TestResponseCacheHooks):
+    # The token is validated by the handler's hooks, after the lookup
+    resource_class = LazyResource
+    auth_hooks = []
+
+    def test_keyed_by_validated_tenant(self):
+        token = {'X-Auth-Token': 'token'}
+        _, headers, body = self.request('/v2/123/cached', headers=token)
+        self.assertTrue(json.loads(body)['validated'])
+        self.assertIn('etag', headers)
+
+        self.request('/v2/123/cached', headers=token)
+        self.assertEqual(self.cached.calls, 2)
+
+        _, _, body = self.request('/v2/123/cached')
+        self.assertFalse(json.loads(body)['validated'])
+        self.assertEqual(self.cached.calls, 3)
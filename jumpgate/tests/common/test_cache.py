@@ -0,0 +1,52 @@
+import unittest
+
+import mock
+
+from jumpgate.common import cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_set(self):
+        lru = cache.LRUCache(maxsize=2)
+        self.assertIsNone(lru.get('a'))
+        lru.set('a', 1)
+        self.assertEqual(1, lru.get('a'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2},
+                         lru.stats())
+
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(2, len(lru))
+        self.assertEqual(1, lru.get('a'))
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(3, lru.get('c'))
+
+    @mock.patch('jumpgate.common.cache.time.time')
+    def test_ttl(self, time_mock):
+        time_mock.return_value = 100
+        lru = cache.LRUCache(ttl=10)
+        lru.set('a', 1)
+        lru.set('b', 2, ttl=60)
+        lru.set('c', 3, expires=105)
+        time_mock.return_value = 106
+        self.assertEqual(1, lru.get('a'))
+        self.assertEqual(2, lru.get('b'))
+        self.assertIsNone(lru.get('c'))
+        time_mock.return_value = 111
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(2, lru.get('b'))
+
+    def test_pop_clear(self):
+        lru = cache.LRUCache()
+        lru.set('a', 1)
+        self.assertEqual(1, lru.pop('a'))
+        self.assertIsNone(lru.pop('a'))
+        lru.set('a', 1)
+        lru.get('a')
+        lru.clear()
+        self.assertEqual({'hits': 0, 'misses': 0, 'size': 0,
+                          'maxsize': 1024}, lru.stats())
@@ -1,6 +1,7 @@
 from mock import MagicMock
 import unittest
 
+from jumpgate.common import dispatcher
 from jumpgate.common.dispatcher import Dispatcher
 
 
@@ -89,3 +90,41 @@ class TestDispatcherUrls(unittest.TestCase):
             req, 'instance_detail', instance_id='9876')
 
         self.assertEqual(path, 'http://some_host/path/to/1234/9876')
+
+    def test_get_endpoint_url_base_computed_once(self):
+        req = MagicMock()
+        req.env = {'tenant_id': '1234'}
+        req.protocol = 'http'
+        req.get_header.return_value = 'some_host'
+        req.app = '/app'
+
+        for instance_id in range(3):
+            path = self.disp.get_endpoint_url(
+                req, 'instance_detail', instance_id=instance_id)
+
+        self.assertEqual(path, 'http://some_host/app/path/to/1234/2')
+        req.get_header.assert_called_once_with('host')
+
+    def test_get_endpoint_path_unknown_variables(self):
+        req = MagicMock()
+        req.env = {'tenant_id': '1234'}
+
+        path = self.disp.get_endpoint_path(req, 'instance_detail',
+                                           other='x')
+
+        self.assertEqual(path, '/path/to/1234/{instance_id}')
+        self.assertEqual(self.disp.get_endpoint_path(req, 'unknown'), '')
+
+    def test_get_next_link(self):
+        req = MagicMock()
+        req.env = {}
+        req.protocol = 'http'
+        req.get_header.return_value = 'some_host'
+        req.app = ''
+        req.path = '/path/to/1234'
+        req.query_string = 'limit=2&marker=5&name='
+
+        self.assertEqual(
+            {'rel': 'next',
+             'href': 'http://some_host/path/to/1234?limit=2&name=&marker=7'},
+            dispatcher.get_next_link(req, 7))
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+import mock
+
+from jumpgate.common import fanout
+
+
+class TestFanOut(unittest.TestCase):
+    def test_results_in_order(self):
+        self.assertEqual([1, 2, 3], fanout.fan_out(lambda: 1,
+                                                   lambda: 2,
+                                                   lambda: 3))
+
+    def test_runs_concurrently(self):
+        # Neither call can return before both have started
+        started = []
+        both_started = threading.Event()
+
+        def call():
+            started.append(threading.current_thread().name)
+            if len(started) == 2:
+                both_started.set()
+            return both_started.wait(5)
+
+        self.assertEqual([True, True], fanout.fan_out(call, call, timeout=5))
+        self.assertEqual(2, len(set(started)))
+
+    def test_error_raised(self):
+        def fail():
+            raise ValueError('boom')
+
+        self.assertRaises(ValueError, fanout.fan_out, lambda: 1, fail)
+
+    def test_timeout(self):
+        event = threading.Event()
+        self.addCleanup(event.set)
+        self.assertRaises(fanout.futures.TimeoutError, fanout.fan_out,
+                          event.wait, lambda: 1, timeout=0.01)
+
+    @mock.patch.object(fanout, 'get_executor')
+    def test_configured_timeout(self, get_executor):
+        future = get_executor.return_value.submit.return_value
+        future.result.return_value = 1
+        self.assertEqual([1, 1], fanout.fan_out(lambda: 1, lambda: 1))
+        timeout = future.result.call_args[0][0]
+        self.assertTrue(0 < timeout <= fanout.DEFAULT_TIMEOUT)
+
+    def test_nested_calls_run_inline(self):
+        def nested():
+            return fanout.fan_out(threading.current_thread,
+                                  threading.current_thread)
+
+        outer, _ = fanout.fan_out(nested, lambda: None)
+        self.assertEqual(1, len(set(outer)))
@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+from jumpgate.common import jobs
+
+
+class TestJobTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = jobs.JobTracker(max_workers=1, ttl=60)
+
+    def test_submit(self):
+        release = threading.Event()
+
+        def work(value):
+            release.wait(5)
+            return value * 2
+
+        job = self.tracker.submit(work, 21, job_id='job-1',
+                                  info={'name': 'test'})
+
+        self.assertEqual('job-1', job.id)
+        self.assertIs(job, self.tracker.get('job-1'))
+        self.assertTrue(job.pending)
+        self.assertEqual({'name': 'test'}, job.info)
+
+        release.set()
+        self.assertTrue(job.wait(5))
+        self.assertEqual(jobs.DONE, job.state)
+        self.assertEqual(42, job.result)
+
+    def test_failed_job(self):
+        def fail():
+            raise ValueError('boom')
+
+        job = self.tracker.submit(fail)
+
+        self.assertTrue(job.wait(5))
+        self.assertEqual(jobs.FAILED, job.state)
+        self.assertEqual('boom', job.error)
+        self.assertIsNone(job.result)
+
+    def test_get_unknown(self):
+        self.assertIsNone(self.tracker.get('unknown'))
+
+    def test_poll(self):
+        results = [None, None, 'ready']
+        blocker = threading.Event()
+
+        job = self.tracker.poll(results.pop, 0, interval=0.01, timeout=5,
+                                job_id='job-2')
+        # The pending job doesn't hold the only worker
+        other = self.tracker.submit(blocker.set)
+
+        self.assertTrue(other.wait(5))
+        self.assertIs(job, self.tracker.get('job-2'))
+        self.assertTrue(job.wait(5))
+        self.assertEqual(jobs.DONE, job.state)
+        self.assertEqual('ready', job.result)
+        self.assertEqual([], results)
+
+    def test_poll_timeout(self):
+        job = self.tracker.poll(lambda: None, interval=0.01, timeout=0.05)
+
+        self.assertTrue(job.wait(5))
+        self.assertEqual(jobs.FAILED, job.state)
+        self.assertEqual('Timed out', job.error)
+
+    def test_poll_failed(self):
+        def fail():
+            raise ValueError('boom')
+
+        job = self.tracker.poll(fail, interval=0.01, timeout=5)
+
+        self.assertTrue(job.wait(5))
+        self.assertEqual(jobs.FAILED, job.state)
+        self.assertEqual('boom', job.error)
@@ -0,0 +1,119 @@
+import unittest
+
+import falcon
+import mock
+from SoftLayer import transports
+
+from jumpgate.common import cache
+from jumpgate.common import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter(self):
+        counter = metrics.Counter('test_total', 'Test counter.', ('route',))
+        counter.inc(('/a',))
+        counter.inc(('/a',), 2)
+        counter.inc(('/b"',))
+
+        self.assertEqual(3, counter.get(('/a',)))
+        self.assertEqual(['# HELP test_total Test counter.',
+                          '# TYPE test_total counter',
+                          'test_total{route="/a"} 3.0',
+                          'test_total{route="/b\\""} 1.0'],
+                         counter.render())
+
+    def test_gauge(self):
+        gauge = metrics.Gauge('test_gauge', 'Test gauge.')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(1, gauge.get())
+        gauge.set(5)
+        self.assertEqual('test_gauge 5.0', gauge.render()[-1])
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_seconds', 'Test histogram.',
+                                      ('route',), buckets=(0.1, 1))
+        histogram.observe(0.05, ('/a',))
+        histogram.observe(0.5, ('/a',))
+        histogram.observe(5, ('/a',))
+
+        self.assertEqual(3, histogram.get_count(('/a',)))
+        self.assertEqual(['test_seconds_bucket{route="/a",le="0.1"} 1',
+                          'test_seconds_bucket{route="/a",le="1.0"} 2',
+                          'test_seconds_bucket{route="/a",le="+Inf"} 3',
+                          'test_seconds_sum{route="/a"} 5.55',
+                          'test_seconds_count{route="/a"} 3'],
+                         histogram.render()[2:])
+
+    def test_render_caches(self):
+        lru = cache.LRUCache(name='test_cache')
+        lru.set('key', 'value')
+        lru.get('key')
+        lru.get('missing')
+
+        body = metrics.REGISTRY.render()
+        self.assertIn('jumpgate_cache_hits{cache="test_cache"} 1.0', body)
+        self.assertIn('jumpgate_cache_misses{cache="test_cache"} 1.0', body)
+        self.assertIn('jumpgate_cache_size{cache="test_cache"} 1.0', body)
+
+    def test_on_get(self):
+        resp = falcon.Response()
+        metrics.Metrics().on_get(mock.MagicMock(), resp)
+        self.assertEqual(200, resp.status)
+        self.assertEqual(metrics.CONTENT_TYPE, resp.content_type)
+        self.assertIn('# TYPE jumpgate_requests_total counter', resp.body)
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def test_process_response(self):
+        handler = object()
+        middleware = metrics.MetricsMiddleware(
+            {id(handler): '/v2/{tenant_id}/servers'})
+        req = mock.MagicMock(method='GET', env={})
+        resp = falcon.Response()
+        labels = ('GET', '/v2/{tenant_id}/servers')
+        count = metrics.REQUEST_DURATION.get_count(labels)
+        in_flight = metrics.REQUESTS_IN_FLIGHT.get()
+
+        middleware.process_request(req, resp)
+        self.assertEqual(in_flight + 1, metrics.REQUESTS_IN_FLIGHT.get())
+        resp.status = falcon.HTTP_404
+        middleware.process_response(req, resp, handler)
+
+        self.assertEqual(in_flight, metrics.REQUESTS_IN_FLIGHT.get())
+        self.assertEqual(count + 1,
+                         metrics.REQUEST_DURATION.get_count(labels))
+        self.assertTrue(metrics.REQUESTS.get(labels + ('404',)) >= 1)
+
+
+class TestTracingTransport(unittest.TestCase):
+    def setUp(self):
+        self.request = transports.Request()
+        self.request.service = 'SoftLayer_Test'
+        self.request.method = 'getObject'
+
+    def test_call(self):
+        transport = metrics.TracingTransport(
+            mock.MagicMock(return_value={'id': 1}))
+        ok_calls = metrics.SL_CALLS.get(
+            ('SoftLayer_Test', 'getObject', 'ok'))
+
+        self.assertEqual({'id': 1}, transport(self.request))
+
+        self.assertEqual(ok_calls + 1, metrics.SL_CALLS.get(
+            ('SoftLayer_Test', 'getObject', 'ok')))
+        last_calls = transport.get_last_calls()
+        self.assertEqual(1, len(last_calls))
+        self.assertIs(self.request, last_calls[0][0])
+        self.assertEqual([], transport.get_last_calls())
+
+    def test_call_error(self):
+        transport = metrics.TracingTransport(
+            mock.MagicMock(side_effect=ValueError))
+        errors = metrics.SL_CALLS.get(
+            ('SoftLayer_Test', 'getObject', 'error'))
+
+        self.assertRaises(ValueError, transport, self.request)
+        self.assertEqual(errors + 1, metrics.SL_CALLS.get(
+            ('SoftLayer_Test', 'getObject', 'error')))
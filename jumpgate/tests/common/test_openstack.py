@@ -1,11 +1,16 @@
+import threading
+import unittest
+
 from mock import ANY
 from mock import MagicMock
 from mock import patch
 import six
-import unittest
+from six.moves import BaseHTTPServer
 
 from jumpgate.common.openstack import OpenStackResponder
 from jumpgate.common.openstack import OpenstackStream
+from jumpgate.common.openstack import get_session
+from jumpgate.common.openstack import get_timeout
 from jumpgate.common.openstack import setup_responder
 
 
@@ -50,8 +55,9 @@ class TestOpenstackResponder(unittest.TestCase):
         self.assertEqual(responder.mount, '/mount-point')
         self.assertEqual(responder.endpoint, 'http://127.0.0.1:1234/v2')
 
-    @patch('jumpgate.common.openstack.requests.request')
-    def test_standard_responder_get(self, request):
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_get(self, get_session):
+        request = get_session.return_value.request
         request.return_value = make_response()
         responder = OpenStackResponder(None, 'http://127.0.0.1:1234/v2')
         req, resp = MagicMock(), MagicMock()
@@ -63,17 +69,19 @@ class TestOpenstackResponder(unittest.TestCase):
             req.method,
             'http://127.0.0.1:1234/v2/path/to/resource',
             data=None,
-            headers=req.headers,
-            stream=True)
+            headers={},
+            stream=True,
+            timeout=get_timeout())
 
         self.assertEqual(resp.status, 200)
         self.assertEqual(resp.content_type, 'application/json')
-        self.assertEqual(resp.stream_len, '0')
+        self.assertEqual(resp.stream_len, 0)
         resp.set_headers.assert_called_with({})
         self.assertEqual(resp.stream.read(), '')
 
-    @patch('jumpgate.common.openstack.requests.request')
-    def test_standard_responder_post(self, request):
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_post(self, get_session):
+        request = get_session.return_value.request
         request.return_value = make_response(body='TEST BODY')
         responder = OpenStackResponder(None, 'http://127.0.0.1:1234/v2')
         req, resp = MagicMock(), MagicMock()
@@ -85,17 +93,19 @@ class TestOpenstackResponder(unittest.TestCase):
             req.method,
             'http://127.0.0.1:1234/v2/path/to/resource',
             data=ANY,
-            headers=req.headers,
-            stream=True)
+            headers={},
+            stream=True,
+            timeout=get_timeout())
 
         self.assertEqual(resp.status, 200)
         self.assertEqual(resp.content_type, 'application/json')
-        self.assertEqual(resp.stream_len, '10')
+        self.assertEqual(resp.stream_len, 10)
         resp.set_headers.assert_called_with({})
         self.assertEqual(resp.stream.read(), 'TEST BODY')
 
-    @patch('jumpgate.common.openstack.requests.request')
-    def test_standard_responder_with_mount(self, request):
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_with_mount(self, get_session):
+        request = get_session.return_value.request
         responder = OpenStackResponder('/mount/point',
                                        'http://127.0.0.1:1234/v2')
         req, resp = MagicMock(), MagicMock()
@@ -107,11 +117,13 @@ class TestOpenstackResponder(unittest.TestCase):
             req.method,
             'http://127.0.0.1:1234/v2/path/to/resource',
             data=ANY,
-            headers=req.headers,
-            stream=True)
+            headers={},
+            stream=True,
+            timeout=get_timeout())
 
-    @patch('jumpgate.common.openstack.requests.request')
-    def test_standard_responder_plain_text_hack(self, request):
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_plain_text_hack(self, get_session):
+        request = get_session.return_value.request
         request.return_value = make_response(content_type='text/html')
         responder = OpenStackResponder(None, 'http://127.0.0.1:1234/v2')
         req, resp = MagicMock(), MagicMock()
@@ -123,15 +135,104 @@ class TestOpenstackResponder(unittest.TestCase):
             req.method,
             'http://127.0.0.1:1234/v2/path/to/resource',
             data=None,
-            headers=req.headers,
-            stream=True)
+            headers={},
+            stream=True,
+            timeout=get_timeout())
 
         self.assertEqual(resp.status, 200)
         self.assertEqual(resp.content_type, 'text/plain; charset=UTF-8')
-        self.assertEqual(resp.stream_len, '0')
+        self.assertEqual(resp.stream_len, 0)
         resp.set_headers.assert_called_with({})
         self.assertEqual(resp.stream.read(), '')
 
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_strips_hop_by_hop_headers(self,
+                                                           get_session):
+        request = get_session.return_value.request
+        os_resp = make_response()
+        os_resp.headers['Connection'] = 'keep-alive'
+        os_resp.headers['X-Openstack-Request-Id'] = 'req-1'
+        request.return_value = os_resp
+        responder = OpenStackResponder(None, 'http://127.0.0.1:1234/v2')
+        req, resp = MagicMock(), MagicMock()
+        req.method = 'GET'
+        req.relative_uri = '/path/to/resource'
+        req.headers = {'X-AUTH-TOKEN': 'token', 'CONNECTION': 'keep-alive'}
+        responder.on_get(req, resp)
+
+        _, kwargs = request.call_args
+        self.assertEqual({'X-AUTH-TOKEN': 'token'}, kwargs['headers'])
+        resp.set_headers.assert_called_with(
+            {'X-Openstack-Request-Id': 'req-1'})
+
+    @patch('jumpgate.common.openstack.get_session')
+    def test_standard_responder_chunked(self, get_session):
+        request = get_session.return_value.request
+        os_resp = make_response(body='TEST BODY')
+        del os_resp.headers['Content-Length']
+        request.return_value = os_resp
+        responder = OpenStackResponder(None, 'http://127.0.0.1:1234/v2')
+        req, resp = MagicMock(), MagicMock()
+        req.method = 'PUT'
+        req.relative_uri = '/path/to/resource'
+        req.content_length = None
+        req.get_header.return_value = 'chunked'
+        req.stream = six.StringIO('A' * 100)
+        resp.stream_len = None
+        responder.on_put(req, resp)
+
+        _, kwargs = request.call_args
+        self.assertEqual('A' * 100, ''.join(kwargs['data']))
+        self.assertIsNone(resp.stream_len)
+
+
+class TestGetSession(unittest.TestCase):
+    def test_session_per_endpoint(self):
+        session = get_session('http://127.0.0.1:1234/v2')
+        self.assertIs(session, get_session('http://127.0.0.1:1234/v2'))
+        self.assertIsNot(session, get_session('http://127.0.0.1:4321/v2'))
+
+
+class CookieHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.cookies.append(self.headers.get('Cookie'))
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=%s; Path=/' % self.path)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessionCookies(unittest.TestCase):
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                CookieHandler)
+        self.server.cookies = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def proxy(self, responder, path, token):
+        req, resp = MagicMock(), MagicMock()
+        req.method = 'GET'
+        req.relative_uri = path
+        req.headers = {'X-Auth-Token': token}
+        responder.on_get(req, resp)
+        resp.stream.read()
+
+    def test_cookies_not_shared_between_users(self):
+        responder = OpenStackResponder(
+            None, 'http://127.0.0.1:%s' % self.server.server_port)
+        self.proxy(responder, '/user1', 'token1')
+        self.proxy(responder, '/user2', 'token2')
+
+        self.assertEqual([None, None], self.server.cookies)
+        self.assertEqual(0, len(get_session(responder.endpoint).cookies))
+
 
 class TestOpenstackStream(unittest.TestCase):
     def test_init(self):
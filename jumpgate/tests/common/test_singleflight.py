@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+
+from jumpgate.common import singleflight
+
+
+class TestGroup(unittest.TestCase):
+    def setUp(self):
+        self.group = singleflight.Group()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.calls = []
+
+    def slow_call(self, value):
+        self.calls.append(value)
+        self.release.wait(5)
+        return value
+
+    def start_follower(self, key, fn, results):
+        # Hold the release until the follower waits on the leader's call
+        call = self.group._calls[key]
+        waiting = threading.Event()
+        wait = call.done.wait
+
+        def wait_for_leader(*args):
+            waiting.set()
+            return wait(*args)
+        call.done.wait = wait_for_leader
+
+        def follower():
+            try:
+                results.append(self.group.do(key, fn, 'follower'))
+            except Exception as e:
+                results.append(e)
+        thread = threading.Thread(target=follower)
+        thread.start()
+        waiting.wait(5)
+        return thread
+
+    def wait_for_leader(self):
+        for _ in range(500):
+            if self.calls:
+                return
+            time.sleep(0.01)
+
+    def test_single_call(self):
+        self.assertEqual((1, False), self.group.do('key', lambda: 1))
+        self.assertEqual(0, self.group.in_flight())
+
+    def test_concurrent_calls_shared(self):
+        leader_results = []
+        leader = threading.Thread(target=lambda: leader_results.append(
+            self.group.do('key', self.slow_call, 'leader')))
+        leader.start()
+        self.wait_for_leader()
+
+        follower_results = []
+        follower = self.start_follower('key', self.slow_call,
+                                       follower_results)
+        self.release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(['leader'], self.calls)
+        self.assertEqual([('leader', False)], leader_results)
+        self.assertEqual([('leader', True)], follower_results)
+        self.assertEqual(0, self.group.in_flight())
+
+    def test_different_keys_not_shared(self):
+        self.assertEqual(('a', False), self.group.do('a', lambda: 'a'))
+        self.assertEqual(('b', False), self.group.do('b', lambda: 'b'))
+
+    def test_error_raised_in_followers(self):
+        def fail(value):
+            self.calls.append(value)
+            self.release.wait(5)
+            raise ValueError(value)
+
+        leader_errors = []
+
+        def leader():
+            try:
+                self.group.do('key', fail, 'leader')
+            except ValueError as e:
+                leader_errors.append(e)
+        leader_thread = threading.Thread(target=leader)
+        leader_thread.start()
+        self.wait_for_leader()
+
+        follower_results = []
+        follower = self.start_follower('key', fail, follower_results)
+        self.release.set()
+        leader_thread.join()
+        follower.join()
+
+        self.assertEqual(['leader'], self.calls)
+        self.assertEqual(1, len(leader_errors))
+        self.assertIsInstance(follower_results[0], ValueError)
+        self.assertEqual(0, self.group.in_flight())
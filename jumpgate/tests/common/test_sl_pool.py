@@ -0,0 +1,158 @@
+import unittest
+
+import mock
+import SoftLayer
+from SoftLayer import transports
+from SoftLayer import utils
+
+from jumpgate.common import metrics
+from jumpgate.common import singleflight
+from jumpgate.common.sl import pool
+
+ENDPOINT = 'https://api.softlayer.com/xmlrpc/v3/'
+
+
+class TestTransportPool(unittest.TestCase):
+    def setUp(self):
+        pool.reset()
+        self.addCleanup(pool.reset)
+
+    def test_get_transport_shared(self):
+        transport = pool.get_transport(ENDPOINT)
+        self.assertIsInstance(transport, pool.SessionXmlRpcTransport)
+        self.assertIs(transport, pool.get_transport(ENDPOINT))
+
+    def test_get_transport_keyed_by_proxy(self):
+        direct = pool.get_transport(ENDPOINT)
+        proxied = pool.get_transport(ENDPOINT, proxy='http://proxy:3128')
+        self.assertIsNot(direct, proxied)
+        self.assertEqual('http://proxy:3128', proxied.proxy)
+
+    def test_get_transport_rest(self):
+        transport = pool.get_transport('https://api.softlayer.com/rest/v3')
+        self.assertIsInstance(transport, transports.RestTransport)
+
+    @mock.patch('jumpgate.common.sl.pool.get_endpoint', return_value=ENDPOINT)
+    def test_get_client_swaps_auth_only(self, endpoint_mock):
+        auth = SoftLayer.BasicAuthentication('user', 'key')
+        first = pool.get_client(auth=auth)
+        second = pool.get_client()
+        # Calls are traced per client over the shared transport
+        self.assertIsNot(first.transport, second.transport)
+        self.assertIs(first.transport.transport, second.transport.transport)
+        self.assertIs(auth, first.auth)
+        self.assertIsNone(second.auth)
+
+    @mock.patch('jumpgate.common.sl.pool.get_endpoint', return_value=ENDPOINT)
+    def test_get_client_timed(self, endpoint_mock):
+        client = pool.get_client(timed=True)
+        self.assertIsInstance(client.transport, metrics.TracingTransport)
+        self.assertIs(pool.get_transport(ENDPOINT), client.transport.transport)
+
+
+def get_response(content, total_items=0):
+    resp = mock.MagicMock()
+    resp.content = utils.xmlrpc_client.dumps(content, methodresponse=True)
+    resp.headers = {'softlayer-total-items': str(total_items)}
+    return resp
+
+
+class TestSessionXmlRpcTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = pool.SessionXmlRpcTransport(endpoint_url=ENDPOINT)
+        self.transport.session = mock.MagicMock()
+        self.request = transports.Request()
+        self.request.service = 'SoftLayer_Account'
+        self.request.method = 'getObject'
+        self.request.mask = 'mask[id]'
+        self.request.limit = 5
+
+    def test_call_uses_session(self):
+        self.transport.session.request.return_value = get_response(
+            ([{'id': 1}],), 10)
+
+        result = self.transport(self.request)
+
+        self.assertEqual([{'id': 1}], result)
+        self.assertEqual(10, result.total_count)
+        args, kwargs = self.transport.session.request.call_args
+        self.assertEqual(('POST',
+                          ENDPOINT.rstrip('/') + '/SoftLayer_Account'), args)
+        self.assertIn('resultLimit', kwargs['data'])
+        self.assertIn('SoftLayer_ObjectMask', kwargs['data'])
+
+    def test_call_fault(self):
+        self.transport.session.request.return_value = get_response(
+            utils.xmlrpc_client.Fault('SoftLayer_Exception', 'Bad'))
+
+        self.assertRaises(SoftLayer.SoftLayerAPIError,
+                          self.transport, self.request)
+
+    @mock.patch('requests.request')
+    def test_other_transports_use_requests(self, request_mock):
+        request_mock.return_value = get_response(({'id': 1},))
+        transport = transports.XmlRpcTransport(endpoint_url=ENDPOINT)
+
+        self.assertEqual({'id': 1}, transport(self.request))
+        self.assertTrue(request_mock.called)
+        self.assertFalse(self.transport.session.request.called)
+
+
+class TestCoalescedReads(unittest.TestCase):
+    def setUp(self):
+        self.transport = pool.SessionXmlRpcTransport(endpoint_url=ENDPOINT,
+                                                     coalesce=True)
+        self.response = get_response(([{'id': 1}],), 3)
+        self.transport.session = mock.MagicMock()
+        self.transport.session.request.return_value = self.response
+        self.transport._flights = mock.MagicMock()
+        self.request = transports.Request()
+        self.request.service = 'SoftLayer_Account'
+        self.request.method = 'getHardware'
+        self.request.headers = {'authenticate': {'username': 'user'}}
+
+    def test_shared_response_parsed(self):
+        self.transport._flights.do.return_value = (self.response, True)
+        before = metrics.SL_COALESCED_CALLS.get(('SoftLayer_Account',
+                                                 'getHardware'))
+
+        result = self.transport(self.request)
+
+        self.assertEqual([{'id': 1}], result)
+        self.assertEqual(3, result.total_count)
+        self.assertEqual(before + 1, metrics.SL_COALESCED_CALLS.get(
+            ('SoftLayer_Account', 'getHardware')))
+        args = self.transport._flights.do.call_args[0]
+        self.assertEqual(pool.get_call_key(self.request), args[0])
+        self.assertEqual(self.transport.session.request, args[1])
+        self.assertEqual('POST', args[2])
+
+    def test_every_caller_gets_its_own_result(self):
+        self.transport._flights = singleflight.Group()
+
+        leader = self.transport(self.request)
+        leader[0]['id'] = 2
+        leader.append({'id': 3})
+
+        self.assertEqual([{'id': 1}], self.transport(self.request))
+
+    def test_writes_not_coalesced(self):
+        self.request.method = 'createObject'
+
+        self.transport(self.request)
+
+        self.assertTrue(self.transport.session.request.called)
+        self.assertFalse(self.transport._flights.do.called)
+
+    def test_disabled(self):
+        self.transport.coalesce = False
+
+        self.transport(self.request)
+
+        self.assertTrue(self.transport.session.request.called)
+        self.assertFalse(self.transport._flights.do.called)
+
+    def test_key_includes_credentials(self):
+        key = pool.get_call_key(self.request)
+        self.request.headers = {'authenticate': {'username': 'other'}}
+        self.assertNotEqual(key, pool.get_call_key(self.request))
@@ -0,0 +1,87 @@
+import unittest
+
+import mock
+
+from jumpgate.common.sl import topology
+
+VLANS = [{'id': 1, 'name': 'backend', 'networkSpace': 'PRIVATE'},
+         {'id': 2, 'name': 'frontend', 'networkSpace': 'PUBLIC'}]
+SUBNETS = [{'id': 10, 'networkVlanId': 1},
+           {'id': 11, 'networkVlanId': 1},
+           {'id': 20, 'networkVlanId': 2}]
+
+
+def get_client():
+    client = mock.MagicMock()
+    client['Account'].getNetworkVlans.side_effect = (
+        lambda **kwargs: [dict(vlan) for vlan in VLANS])
+    client['Account'].getSubnets.return_value = SUBNETS
+    return client
+
+
+class TestTopology(unittest.TestCase):
+    def setUp(self):
+        self.topology = topology.get_topology(get_client())
+
+    def test_vlan_subnets(self):
+        self.assertEqual([10, 11], [subnet['id'] for subnet in
+                                    self.topology.get_vlan(1)['subnets']])
+        self.assertEqual([20], [subnet['id'] for subnet in
+                                self.topology.get_vlan('2')['subnets']])
+
+    def test_get_vlan_network_space(self):
+        self.assertEqual(1, self.topology.get_vlan(1, 'PRIVATE')['id'])
+        self.assertIsNone(self.topology.get_vlan(1, 'PUBLIC'))
+        self.assertIsNone(self.topology.get_vlan('bad'))
+
+    def test_get_subnet(self):
+        self.assertEqual(20, self.topology.get_subnet('20')['id'])
+        self.assertIsNone(self.topology.get_subnet(30))
+
+    def test_page_subnets(self):
+        self.assertEqual([10, 11, 20], self.topology.subnet_ids)
+        self.assertEqual([11], [subnet['id'] for subnet in
+                                self.topology.page_subnets('10', 1)])
+        self.assertEqual([20], [subnet['id'] for subnet in
+                                self.topology.page_subnets(15)])
+        self.assertRaises(ValueError, self.topology.page_subnets, 'bad')
+
+
+class TestTopologyCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = topology.TopologyCache()
+        self.client = get_client()
+        self.get_vlans = self.client['Account'].getNetworkVlans
+
+    def test_cached_per_user(self):
+        first = self.cache.get(self.client, 1, 10)
+        self.assertIs(first, self.cache.get(self.client, 1, 10))
+        self.assertIsNot(first, self.cache.get(self.client, 1, 11))
+        self.assertIsNot(first, self.cache.get(self.client, 2, 10))
+        self.assertEqual(3, self.get_vlans.call_count)
+
+    def test_refresh(self):
+        first = self.cache.get(self.client, 1, 10)
+        second = self.cache.get(self.client, 1, 10, refresh=True)
+        self.assertIsNot(first, second)
+        self.assertIs(second, self.cache.get(self.client, 1, 10))
+
+    def test_unknown_user_not_cached(self):
+        self.cache.get(self.client, None, 10)
+        self.cache.get(self.client, None, 10)
+        self.cache.get(self.client, 1)
+        self.cache.get(self.client, 1)
+        self.assertEqual(4, self.get_vlans.call_count)
+
+    def test_invalidate(self):
+        self.cache.get(self.client, 1, 10)
+        self.cache.invalidate(1, 10)
+        self.cache.get(self.client, 1, 10)
+        self.assertEqual(2, self.get_vlans.call_count)
+
+    def test_get_vlan_refreshes_once(self):
+        self.assertIsNotNone(self.cache.get_vlan(self.client, 1, 1,
+                                                 user_id=10))
+        self.assertIsNone(self.cache.get_vlan(self.client, 1, 3,
+                                              user_id=10))
+        self.assertEqual(2, self.get_vlans.call_count)
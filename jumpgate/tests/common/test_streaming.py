@@ -0,0 +1,39 @@
+import json
+import unittest
+
+import mock
+
+from jumpgate.common import streaming
+
+
+class TestStreaming(unittest.TestCase):
+    def test_iter_json(self):
+        body = {'images': streaming.StreamingList(
+            {'id': i, 'name': u'image\xe9'} for i in range(100)),
+            'next': None}
+
+        chunks = list(streaming.iter_json(body, chunk_size=512))
+
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(isinstance(c, str) for c in chunks))
+        decoded = json.loads(''.join(chunks))
+        self.assertEqual(range(100), [i['id'] for i in decoded['images']])
+        self.assertIsNone(decoded['next'])
+
+    def test_is_streaming(self):
+        self.assertTrue(streaming.is_streaming(
+            {'servers': streaming.StreamingList([])}))
+        self.assertFalse(streaming.is_streaming({'servers': []}))
+        self.assertFalse(streaming.is_streaming('string'))
+
+    @mock.patch('jumpgate.common.streaming.streaming_enabled',
+                return_value=False)
+    def test_list_body_disabled(self, enabled):
+        self.assertEqual([1, 2], streaming.list_body(iter([1, 2])))
+
+    @mock.patch('jumpgate.common.streaming.streaming_enabled',
+                return_value=True)
+    def test_list_body_enabled(self, enabled):
+        body = streaming.list_body(iter([1, 2]))
+        self.assertIsInstance(body, streaming.StreamingList)
+        self.assertEqual([1, 2], list(body))
@@ -1,9 +1,14 @@
 import falcon
 from falcon.testing import helpers
+import json
 import mock
+import os
+import tempfile
+import time
 import unittest
 
 from jumpgate import api
+from jumpgate.common import config
 from jumpgate.compute.drivers.sl import flavor_list_loader
 from jumpgate.compute.drivers.sl import flavors
 
@@ -97,7 +102,8 @@ class TestFlavorList(unittest.TestCase):
     def format_flavors(self, flavors):
         flavors = {int(key): flavor_list_loader.format_flavor_extra_specs(val)
                    for key, val in flavors.items()}
-        return flavor_list_loader.get_listing_flavors(flavors)
+        return flavor_list_loader.FlavorRegistry(
+            flavor_list_loader.get_listing_flavors(flavors))
 
     def test_on_get_flavor_list_missing_id(self):
         # Testing that a flavor is ignored when it is missing a required
@@ -250,3 +256,122 @@ class TestFlavorV2(unittest.TestCase):
                                           {'message': 'Flavor could not '
                                            'be found', 'code': '404'}})
         self.assertEqual(self.resp.status, 404)
+
+
+def get_flavor(flavor_id, disk=100, ram=1024):
+    return {'id': str(flavor_id), 'name': 'flavor%s' % flavor_id,
+            'disk': disk, 'ram': ram, 'cpus': 1, 'disk-type': 'SAN',
+            'extra_specs': {}}
+
+
+class TestFlavorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = flavor_list_loader.FlavorRegistry(
+            [get_flavor(flavor_id, disk=flavor_id * 10, ram=flavor_id * 512)
+             for flavor_id in (12, 2, 9, 10, 1)])
+
+    def ids(self, flavor_list):
+        return [flavor['id'] for flavor in flavor_list]
+
+    def test_numeric_order(self):
+        self.assertEqual(['1', '2', '9', '10', '12'], self.ids(self.registry))
+        self.assertEqual(['10', '12'], self.ids(self.registry.page(marker=9)))
+
+    def test_lookup(self):
+        self.assertEqual('10', self.registry.get('10')['id'])
+        self.assertEqual('10', self.registry.get(10)['id'])
+        self.assertEqual('9', self.registry.get_by_name('flavor9')['id'])
+        self.assertIsNone(self.registry.get('bad'))
+        self.assertIsNone(self.registry.get(3))
+
+    def test_page_filters(self):
+        self.assertEqual(['9', '10', '12'],
+                         self.ids(self.registry.page(min_disk=90)))
+        self.assertEqual(['10'], self.ids(self.registry.page(
+            marker=2, min_disk=20, min_ram=5000, limit=1)))
+
+    def test_pre_rendered_bodies(self):
+        body = self.registry.get_body('10', detail=True)
+        self.assertEqual(100, body['disk'])
+        self.assertNotIn('disk', self.registry.get_body(10))
+
+    def test_marker_invalid(self):
+        env = get_client_env(query_string='marker=abc')
+        resp = falcon.Response()
+        flavors.FlavorsV2(mock.MagicMock(), self.registry).on_get(
+            api.Request(env), resp)
+        self.assertEqual(400, resp.status)
+
+
+class TestGetFlavors(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, flavor_list_loader.Flavors, '_flavors',
+                        flavor_list_loader.Flavors._flavors)
+        self.addCleanup(setattr, flavor_list_loader.Flavors, '_path',
+                        flavor_list_loader.Flavors._path)
+        flavor_list_loader.Flavors._flavors = None
+        if not config.PARSER.has_section('flavors'):
+            config.PARSER.add_section('flavors')
+            self.addCleanup(config.PARSER.remove_section, 'flavors')
+
+    def set_flavor_list(self, path):
+        self.addCleanup(config.PARSER.remove_option, 'flavors',
+                        'flavor_list')
+        config.PARSER.set('flavors', 'flavor_list', path)
+
+    def test_configured_file(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with open(path, 'w') as f:
+            json.dump({'1': get_flavor(1), '7': get_flavor(7)}, f)
+        self.set_flavor_list(path)
+
+        registry = flavor_list_loader.Flavors.get_flavors(mock.MagicMock())
+        self.assertEqual(path, registry.path)
+        self.assertEqual(['1', '7'], [flavor['id'] for flavor in registry])
+
+    def test_relative_to_package(self):
+        self.set_flavor_list(os.path.join('tests', 'flavor_list.json'))
+
+        registry = flavor_list_loader.Flavors.get_flavors(mock.MagicMock())
+        self.assertEqual(
+            os.path.join(config.PACKAGE_DIR, 'tests', 'flavor_list.json'),
+            registry.path)
+        self.assertIsNotNone(registry.get(1))
+
+    def test_missing_file(self):
+        self.set_flavor_list('missing_flavor_list.json')
+
+        registry = flavor_list_loader.Flavors.get_flavors(mock.MagicMock())
+        self.assertIsNone(registry.path)
+        self.assertEqual(len(flavor_list_loader.FLAVOR_DICT), len(registry))
+
+
+class TestFlavorRegistryReload(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.write({'1': get_flavor(1)})
+        self.registry = flavor_list_loader.FlavorRegistry(
+            flavor_list_loader.get_listing_flavors(
+                flavor_list_loader.read_flavor_file(self.path)),
+            path=self.path, reload_interval=0)
+
+    def write(self, flavor_dict, mtime=None):
+        with open(self.path, 'w') as f:
+            json.dump(flavor_dict, f)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_reloaded_when_changed(self):
+        self.write({'1': get_flavor(1), '2': get_flavor(2)},
+                   mtime=time.time() + 10)
+        self.assertEqual('2', self.registry.get(2)['id'])
+
+    def test_invalid_file_keeps_flavors(self):
+        with open(self.path, 'w') as f:
+            f.write('{')
+        os.utime(self.path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(['1'], [flavor['id'] for flavor in self.registry])
@@ -6,8 +6,11 @@ import SoftLayer
 import unittest
 
 from jumpgate import api
+from jumpgate.common import jobs
+from jumpgate.common.sl import topology
 from jumpgate.compute.drivers.sl import flavor_list_loader
 from jumpgate.compute.drivers.sl import servers
+from jumpgate.image.drivers.sl import images as glance_images
 
 
 TENANT_ID = 333333
@@ -17,6 +20,8 @@ FLAVOR_LIST = flavor_list_loader.Flavors.get_flavors(app=mock.MagicMock())
 
 
 def get_client_env(**kwargs):
+    # Every fake client stands for an account with a new topology
+    topology.topology_cache().invalidate()
     client = mock.MagicMock()
     env = helpers.create_environ(**kwargs)
     if 'auth' not in env:
@@ -27,8 +32,14 @@ def get_client_env(**kwargs):
 class TestServersServerActionV2(unittest.TestCase):
 
     def perform_server_action(self, body_str, tenant_id,
-                              instance_id, flavors):
+                              instance_id, flavors, image_groups=None,
+                              client=None):
         self.client, self.env = get_client_env(body=body_str)
+        if client is not None:
+            self.client = client
+        if image_groups is not None:
+            self.client['Account'].getPrivateBlockDeviceTemplateGroups \
+                .return_value = image_groups
         self.vg_clientMock = self.client['Virtual_Guest']
         self.req = api.Request(self.env, sl_client=self.client)
         self.resp = falcon.Response()
@@ -39,20 +50,44 @@ class TestServersServerActionV2(unittest.TestCase):
     @mock.patch('jumpgate.compute.drivers.sl.servers.SoftLayer.VSManager')
     def test_on_post_create(self, vsMock):
         body_str = '{"createImage": {"name": "foobar"}}'
-        self.perform_server_action(body_str, TENANT_ID,
-                                   INSTANCE_ID, flavors=FLAVOR_LIST)
+        tracker = jobs.JobTracker(max_workers=1)
+        polled = []
+
+        def poll(*args, **kwargs):
+            kwargs['interval'] = 0.01
+            job = jobs.JobTracker.poll(tracker, *args, **kwargs)
+            polled.append(job)
+            return job
+
+        tracker.poll = poll
+        client = mock.MagicMock()
+        client['Virtual_Guest'].createArchiveTransaction.return_value = {
+            'id': 555}
+        vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+        vgbdtg.getObject.side_effect = [
+            {'id': 42, 'globalIdentifier': None, 'transactionId': 555},
+            {'id': 42, 'globalIdentifier': 'guid', 'transactionId': None}]
+        with mock.patch.object(servers.jobs, 'job_tracker',
+                               return_value=tracker):
+            self.perform_server_action(
+                body_str, TENANT_ID, INSTANCE_ID, flavors=FLAVOR_LIST,
+                image_groups=[{'id': 42}], client=client)
+        self.assertEqual(1, len(polled))
+        # The job id resolves to the new template group in any process
+        self.assertEqual(42, glance_images.get_pending_group_id(
+            polled[0].id))
+        self.assertTrue(polled[0].wait(5))
+        self.assertEqual(jobs.DONE, polled[0].state)
+        self.assertEqual('guid', polled[0].result)
         client_cat = self.vg_clientMock.createArchiveTransaction
         client_cat.assert_called_with("foobar", [], 'Auto-created by '
                                       'OpenStack compatibility layer',
                                       id=INSTANCE_ID)
+        # The group is found by its capture transaction, not by name
         filterMock = {'privateBlockDeviceTemplateGroups':
-                      {'name': {'operation': "foobar"},
-                       'createDate': {'operation': 'orderBy',
-                                      'options': [{'name': 'sort',
-                                                   'value': ['DESC']}], }}}
+                      {'transactionId': {'operation': 555}}}
         acc = self.client['Account'].getPrivateBlockDeviceTemplateGroups
-        acc.assert_called_with(mask='id, globalIdentifier',
-                               filter=filterMock, limit=1)
+        acc.assert_called_once_with(mask='id', filter=filterMock, limit=1)
         self.assertEqual(self.resp.status, 202)
 
     @mock.patch('jumpgate.compute.drivers.sl.servers.SoftLayer.VSManager')
@@ -248,6 +283,33 @@ class TestServersServersDetailV2(unittest.TestCase):
                          set(inst.keys()))
         self.assertEqual(resp.status, 200)
 
+    @mock.patch('SoftLayer.VSManager.list_instances')
+    def test_on_get_flavor_from_mask_tags(self, mockListInstance):
+        client, env = get_client_env()
+        instance = {'id': 1234,
+                    'accountId': 333582,
+                    'hostname': 'foobar',
+                    'createDate': 'foobar',
+                    'modifyDate': 'foobar',
+                    'status': {'keyName': 'ACTIVE'},
+                    'powerState': {'keyName': 'RUNNING'},
+                    'sshKeys': [],
+                    'tagReferences': [
+                        {'tag': {'name': 'other'}},
+                        {'tag': {'name': '{"flavor_id": 3}'}}]}
+        mockListInstance.return_value = [instance, dict(instance, id=5678)]
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+        servers.guest_flavors().clear()
+        instance = servers.ServersDetailV2(app=mock.MagicMock())
+        instance.on_get(req, resp, TENANT_ID)
+        self.assertEqual(['3', '3'], [s['flavor']['id']
+                                      for s in resp.body['servers']])
+        # tags come from the list mask, no per-server lookups are made
+        self.assertFalse(client['Virtual_Guest'].getTagReferences.called)
+        self.assertIn('tagReferences.tag.name',
+                      mockListInstance.call_args[1]['mask'])
+
 
 class TestServerDetail(unittest.TestCase):
     # Certain properties such as 'metadata' and 'progress' are not being sent
@@ -509,6 +571,9 @@ class TestServersV2(unittest.TestCase):
                            '"min_count": 1, ' \
                            '"networks": [{"uuid": 489586}, {"uuid": 489588}]}}'
         self.client, env = get_client_env()
+        self.client['Account'].getNetworkVlans.return_value = [
+            {'id': 489586, 'networkSpace': 'PRIVATE'},
+            {'id': 489588, 'networkSpace': 'PUBLIC'}]
 
     def test_init(self):
         self.assertEqual(self.app, self.instance.app)
@@ -592,6 +657,26 @@ class TestServersV2(unittest.TestCase):
         self.assertEqual(self.payload['private_vlan'], 489586)
         self.assertEqual(self.payload['private'], False)
 
+    def test_handle_network_new_vlan_refreshes(self):
+        self.instance._handle_network(self.payload, self.client,
+                                      [{'uuid': 489586}],
+                                      account_id=1, user_id=2)
+        self.client['Account'].getNetworkVlans.return_value.append(
+            {'id': 489590, 'networkSpace': 'PRIVATE'})
+
+        self.instance._handle_network(self.payload, self.client,
+                                      [{'uuid': 489590}],
+                                      account_id=1, user_id=2)
+        self.assertEqual(489590, self.payload['private_vlan'])
+        self.assertEqual(2, self.client['Account'].getNetworkVlans.call_count)
+
+    def test_handle_network_topology_cached(self):
+        for _ in range(2):
+            self.instance._handle_network(self.payload, self.client,
+                                          [{'uuid': 489586}],
+                                          account_id=1, user_id=2)
+        self.assertEqual(1, self.client['Account'].getNetworkVlans.call_count)
+
     def test_handle_network_invalid_too_many(self):
         should_fail = False
         try:
@@ -605,7 +690,6 @@ class TestServersV2(unittest.TestCase):
             self.fail('Exception excepted, too many arguments')
 
     def test_handle_network_invalid_id_order(self):
-        self.client['Account'].getPrivateNetworkVlans.return_value = []
         should_fail = False
         try:
             self.instance._handle_network(self.payload, self.client,
@@ -617,7 +701,6 @@ class TestServersV2(unittest.TestCase):
             self.fail('Exception excepted')
 
     def test_handle_network_invalid_id_format(self):
-        self.client['Account'].getPrivateNetworkVlans.return_value = []
         should_fail = False
         try:
             self.instance._handle_network(self.payload, self.client,
@@ -629,7 +712,6 @@ class TestServersV2(unittest.TestCase):
             self.fail('Exception excepted')
 
     def test_handle_network_invalid_id_format_public(self):
-        self.client['Account'].getPrivateNetworkVlans.return_value = []
         should_fail = False
         try:
             self.instance._handle_network(self.payload, self.client,
@@ -642,15 +724,12 @@ class TestServersV2(unittest.TestCase):
             self.fail('Exception excepted')
 
     def test_handle_network_valid_private_ids(self):
-        self.client['Account'].getPrivateNetworkVlans.return_value = [489586]
         self.instance._handle_network(self.payload, self.client,
                                       [{'uuid': 489586}])
         self.assertEqual(self.payload['private_vlan'], 489586)
         self.assertEqual(self.payload['private'], True)
 
     def test_handle_network_valid_ids(self):
-        self.client['Account'].getPrivateNetworkVlans.return_value = [489586]
-        self.client['Account'].getPublicNetworkVlans.return_value = [489588]
         self.instance._handle_network(self.payload, self.client,
                                       [{'uuid': 489586}, {'uuid': 489588}])
         self.assertEqual(self.payload['private_vlan'], 489586)
@@ -762,7 +841,8 @@ class TestServersV2(unittest.TestCase):
         get_url_mock.assert_called_once_with(
             'compute', req, 'v2_server', server_id='14331143')
         vs_list_instances.assert_called_once_with(
-            **servers.get_list_params(req))
+            **servers.get_list_params(req, FLAVOR_LIST,
+                                      mask=servers.SERVER_LIST_MASK))
         self.assertEqual(200, resp.status)
         self.assertEqual(['servers'], resp.body.keys())
         instances = resp.body['servers']
@@ -774,3 +854,314 @@ class TestServersV2(unittest.TestCase):
         self.assertEqual(1, len(server['links']))
         self.assertDictEqual({'href': link_url, 'rel': 'self'},
                              server['links'][0])
+
+    @mock.patch('SoftLayer.VSManager.list_instances',
+                return_value=[{'id': 1, 'hostname': 'a'},
+                              {'id': 2, 'hostname': 'b'}])
+    def test_list_servers_full_page(self, vs_list_instances):
+        client, env = get_client_env(path='/v2/123/servers',
+                                     query_string='limit=2&marker=0')
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+        self.instance.on_get(req, resp, tenant_id='123')
+        self.assertEqual(
+            [{'rel': 'next',
+              'href': 'http://falconframework.org/v2/123/servers'
+                      '?limit=2&marker=2'}],
+            resp.body['servers_links'])
+
+
+class TestGetListParams(unittest.TestCase):
+
+    def get_params(self, query_string):
+        client, env = get_client_env(query_string=query_string)
+        req = api.Request(env, sl_client=client)
+        return servers.get_list_params(req, FLAVOR_LIST)
+
+    def test_defaults(self):
+        params = self.get_params('')
+        self.assertEqual(servers.DEFAULT_MAX_LIMIT, params['limit'])
+        self.assertEqual(servers.get_virtual_guest_mask(), params['mask'])
+        self.assertEqual('orderBy',
+                         params['filter']['virtualGuests']['id']['operation'])
+
+    def test_limit_capped(self):
+        params = self.get_params('limit=5000')
+        self.assertEqual(servers.DEFAULT_MAX_LIMIT, params['limit'])
+        params = self.get_params('limit=10')
+        self.assertEqual(10, params['limit'])
+
+    def test_marker(self):
+        params = self.get_params('marker=1234')
+        self.assertEqual('> 1234',
+                         params['filter']['virtualGuests']['id']['operation'])
+        self.assertRaises(ValueError, self.get_params, 'marker=abc')
+
+    def test_status(self):
+        guest_filter = self.get_params('status=ACTIVE')['filter'][
+            'virtualGuests']
+        self.assertEqual({'keyName': {'operation': 'RUNNING'}},
+                         guest_filter['powerState'])
+        self.assertEqual({'operation': 'not null'},
+                         guest_filter['provisionDate'])
+        self.assertIsNone(self.get_params('status=UNKNOWN'))
+
+    def test_flavor(self):
+        flavor = list(FLAVOR_LIST)[0]
+        guest_filter = self.get_params(
+            'flavor=http://localhost/v2/flavors/%s' % flavor['id'])['filter'][
+            'virtualGuests']
+        self.assertEqual({'operation': flavor['cpus']},
+                         guest_filter['maxCpu'])
+        self.assertEqual({'operation': flavor['ram']},
+                         guest_filter['maxMemory'])
+        self.assertIsNone(self.get_params('flavor=does-not-exist'))
+
+    def test_image(self):
+        guest_filter = self.get_params('image=a1783280-6b1f')['filter'][
+            'virtualGuests']
+        self.assertEqual(
+            {'globalIdentifier': {'operation': 'a1783280-6b1f'}},
+            guest_filter['blockDeviceTemplateGroup'])
+
+    def test_changes_since(self):
+        guest_filter = self.get_params(
+            'changes-since=2014-01-02T03:04:05-01:00')['filter'][
+            'virtualGuests']
+        self.assertEqual('greaterThanDate',
+                         guest_filter['modifyDate']['operation'])
+        # In the API's local time, CST
+        self.assertEqual(['01/01/2014 22:04:05'],
+                         guest_filter['modifyDate']['options'][0]['value'])
+        self.assertRaises(ValueError, self.get_params, 'changes-since=junk')
+
+    def test_changes_since_daylight_saving(self):
+        guest_filter = self.get_params(
+            'changes-since=2014-07-01T12:00:00Z')['filter']['virtualGuests']
+        self.assertEqual(['07/01/2014 07:00:00'],
+                         guest_filter['modifyDate']['options'][0]['value'])
+
+
+def get_snapshot_guest(guest_id, modified, power_state='RUNNING'):
+    return {'id': guest_id,
+            'hostname': 'guest%s' % guest_id,
+            'createDate': '2014-01-01T00:00:00-06:00',
+            'modifyDate': modified,
+            'provisionDate': '2014-01-01T00:00:00-06:00',
+            'powerState': {'keyName': power_state},
+            'primaryIpAddress': '10.0.0.%s' % guest_id}
+
+
+class TestGuestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = servers.GuestSnapshot()
+        self.client = mock.MagicMock()
+        self.list_instances = mock.MagicMock()
+        patcher = mock.patch('SoftLayer.VSManager.list_instances',
+                             self.list_instances)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refresh_incremental(self):
+        self.list_instances.return_value = [
+            get_snapshot_guest(1, '2014-01-02T00:00:00-06:00'),
+            get_snapshot_guest(2, '2014-01-03T00:00:00-06:00')]
+        self.snapshot.refresh(self.client)
+        self.list_instances.assert_called_once_with(
+            mask=servers.SNAPSHOT_MASK)
+
+        self.list_instances.reset_mock()
+        self.list_instances.return_value = [
+            get_snapshot_guest(1, '2014-01-04T00:00:00-06:00', 'HALTED')]
+        self.snapshot.refresh(self.client)
+
+        guest_filter = self.list_instances.call_args[1]['filter'][
+            'virtualGuests']
+        # The newest modifyDate seen, in the API's local time, less the
+        # overlap
+        self.assertEqual(['01/02/2014 23:59:00'],
+                         guest_filter['modifyDate']['options'][0]['value'])
+        self.assertEqual('SHUTOFF', self.snapshot.guests[1].status)
+        self.assertEqual('ACTIVE', self.snapshot.guests[2].status)
+        self.assertEqual(('10.0.0.2',), self.snapshot.guests[2].ips)
+
+    def test_changed_since(self):
+        self.list_instances.return_value = [
+            get_snapshot_guest(1, '2014-01-02T00:00:00-06:00'),
+            get_snapshot_guest(2, '2014-01-03T00:00:00-06:00')]
+        self.snapshot.refresh(self.client)
+
+        changed = self.snapshot.changed_since(
+            servers.iso8601.parse_date('2014-01-02T12:00:00-06:00'))
+        self.assertEqual([2], [state.id for state in changed])
+
+    def test_refresh_started_after_request_shared(self):
+        self.list_instances.return_value = []
+        self.snapshot.refresh(self.client)
+        # Pretend a refresh started after the next request came in
+        self.snapshot._refreshed_from = servers.time.time() + 60
+
+        self.snapshot.refresh(self.client)
+
+        self.assertEqual(1, self.list_instances.call_count)
+
+    def test_failed_refresh_not_shared(self):
+        self.list_instances.side_effect = SoftLayer.SoftLayerAPIError(
+            500, 'Boom')
+        self.assertRaises(SoftLayer.SoftLayerAPIError,
+                          self.snapshot.refresh, self.client)
+        self.assertIsNone(self.snapshot._refreshed_from)
+
+
+class TestListInstances(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = mock.MagicMock()
+        patcher = mock.patch.object(servers, '_guest_snapshots',
+                                    mock.MagicMock())
+        snapshots = patcher.start()
+        self.addCleanup(patcher.stop)
+        snapshots.get.return_value = self.snapshot
+        self.snapshot.changed_since.return_value = [
+            servers.GuestState(1, 'guest1', None, 4, 'SHUTOFF', ()),
+            servers.GuestState(3, 'guest3', None, 4, 'SHUTOFF', ()),
+            servers.GuestState(2, 'guest2', None, 4, 'SHUTOFF', ())]
+        self.vs = mock.MagicMock()
+        self.vs.list_instances.return_value = [{'id': 3}, {'id': 2}]
+
+    def get_req(self, query_string):
+        client, env = get_client_env(query_string=query_string)
+        env['auth'] = {'user_id': 'fake_user', 'tenant_id': TENANT_ID}
+        return api.Request(env, sl_client=client)
+
+    def list_instances(self, query_string):
+        req = self.get_req(query_string)
+        return req, servers.list_instances(
+            req, self.vs, servers.get_list_params(req, FLAVOR_LIST))
+
+    def test_without_changes_since(self):
+        _, instances = self.list_instances('limit=10')
+        self.assertFalse(self.snapshot.refresh.called)
+        self.assertEqual([{'id': 3}, {'id': 2}], instances)
+        self.assertEqual(10, self.vs.list_instances.call_args[1]['limit'])
+
+    def test_changed_ids_only(self):
+        self.vs.list_instances.return_value = [{'id': 2}]
+        req, instances = self.list_instances(
+            'changes-since=2014-01-01T00:00:00Z&marker=1&limit=1')
+        self.snapshot.refresh.assert_called_once_with(req.sl_client)
+        servers._guest_snapshots.get.assert_called_once_with(TENANT_ID,
+                                                             'fake_user')
+
+        # Only the first page of ids is listed
+        self.assertEqual(1, self.vs.list_instances.call_count)
+        kwargs = self.vs.list_instances.call_args[1]
+        self.assertNotIn('limit', kwargs)
+        self.assertEqual(
+            {'operation': 'in', 'options': [{'name': 'data',
+                                             'value': [2]}]},
+            kwargs['filter']['virtualGuests']['id'])
+        self.assertEqual([{'id': 2}], instances)
+
+    def test_changed_ids_by_page(self):
+        # guest1 doesn't match the name filter
+        self.vs.list_instances.side_effect = [[], [{'id': 3}, {'id': 2}]]
+        req = self.get_req(
+            'changes-since=2014-01-01T00:00:00Z&name=guest&limit=1')
+        params = servers.get_list_params(req, FLAVOR_LIST)
+        guest_filter = params['filter']['virtualGuests']
+        operation = guest_filter['id']['operation']
+
+        instances = servers.list_instances(req, self.vs, params)
+
+        self.assertEqual([{'id': 2}], instances)
+        self.assertEqual(
+            [[1], [2]],
+            [call[1]['filter']['virtualGuests']['id']['options'][0]['value']
+             for call in self.vs.list_instances.call_args_list])
+        self.assertEqual(
+            {'operation': '~ guest'},
+            self.vs.list_instances.call_args[1]['filter']['virtualGuests'][
+                'hostname'])
+        # The caller's params are left alone
+        self.assertEqual(operation, guest_filter['id']['operation'])
+        self.assertEqual(1, params['limit'])
+
+    def test_status_not_changed(self):
+        _, instances = self.list_instances(
+            'changes-since=2014-01-01T00:00:00Z&status=active')
+        self.assertEqual([], instances)
+        self.assertFalse(self.vs.list_instances.called)
+
+    def test_nothing_changed_skips_listing(self):
+        self.snapshot.changed_since.return_value = []
+        req = self.get_req('changes-since=2014-01-01T00:00:00Z')
+        resp = falcon.Response()
+        with mock.patch('SoftLayer.VSManager.list_instances') as list_mock:
+            servers.ServersDetailV2(mock.MagicMock(), FLAVOR_LIST).on_get(
+                req, resp)
+        self.assertFalse(list_mock.called)
+        self.assertEqual(200, resp.status)
+        self.assertEqual([], list(resp.body['servers']))
+
+
+class TestGetFlavorId(unittest.TestCase):
+
+    def setUp(self):
+        servers.guest_flavors().clear()
+        self.flavors = flavor_list_loader.FlavorRegistry([
+            {'id': '1', 'name': 'small', 'cpus': 1, 'ram': 1024, 'disk': 25,
+             'disk-type': 'SAN'},
+            {'id': '2', 'name': 'small-disk', 'cpus': 1, 'ram': 1024,
+             'disk': 100, 'disk-type': 'SAN'},
+            {'id': '3', 'name': 'small-local', 'cpus': 1, 'ram': 1024,
+             'disk': 100, 'disk-type': 'LOCAL'},
+            {'id': '4', 'name': 'large', 'cpus': 4, 'ram': 4096,
+             'disk': 100, 'disk-type': 'SAN'}])
+        self.instance = {'id': 1234, 'modifyDate': '2014-01-01T00:00:00Z',
+                         'maxCpu': 4, 'maxMemory': 4096}
+
+    def test_from_shape(self):
+        self.assertEqual(4, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+
+    def test_tag_breaks_ties(self):
+        self.instance.update(maxCpu=1, maxMemory=1024, tagReferences=[
+            {'tag': {'name': '{"flavor_id": 2}'}}])
+        self.assertEqual(2, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+
+    def test_disk_type_breaks_ties(self):
+        self.instance.update(maxCpu=1, maxMemory=1024, localDiskFlag=True)
+        self.assertEqual(3, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+
+    def test_tag_of_other_shape_ignored(self):
+        self.instance['tagReferences'] = [
+            {'tag': {'name': '{"flavor_id": 1}'}}]
+        self.assertEqual(4, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+
+    def test_unknown_shape_uses_tag(self):
+        self.instance.update(maxCpu=16, tagReferences=[
+            {'tag': {'name': '{"flavor_id": 1}'}}])
+        self.assertEqual(1, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+        del self.instance['tagReferences']
+        self.instance['modifyDate'] = '2014-01-02T00:00:00Z'
+        self.assertIsNone(servers.get_flavor_id(self.instance,
+                                                self.flavors))
+
+    def test_cached_until_modified(self):
+        self.assertEqual(4, servers.get_flavor_id(self.instance,
+                                                  self.flavors))
+        with mock.patch.object(self.flavors, 'find_by_shape') as find_mock:
+            self.assertEqual(4, servers.get_flavor_id(self.instance,
+                                                      self.flavors))
+            self.assertFalse(find_mock.called)
+
+            self.instance['modifyDate'] = '2014-01-02T00:00:00Z'
+            find_mock.return_value = []
+            self.assertIsNone(servers.get_flavor_id(self.instance,
+                                                    self.flavors))
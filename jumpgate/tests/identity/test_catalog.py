@@ -0,0 +1,46 @@
+import unittest
+
+from jumpgate.identity.drivers.sl import catalog
+
+TEMPLATES = {
+    'RegionOne': {
+        'compute': {
+            'publicURL': 'http://localhost:5000/compute/v2/$(tenant_id)s',
+            'name': 'Compute Service',
+        },
+        'identity': {
+            'publicURL': 'http://localhost:5000/v2.0/users/$(user_id)s',
+        },
+    },
+}
+
+
+class TestCatalogTemplate(unittest.TestCase):
+    def test_render(self):
+        template = catalog.CatalogTemplate(TEMPLATES, maxsize=10)
+
+        rendered = template.render('1234', 'user')
+
+        self.assertEqual({
+            'RegionOne': {
+                'compute': {
+                    'publicURL': 'http://localhost:5000/compute/v2/1234',
+                    'name': 'Compute Service',
+                },
+                'identity': {
+                    'publicURL': 'http://localhost:5000/v2.0/users/user',
+                },
+            },
+        }, rendered)
+
+    def test_render_cached_per_user(self):
+        template = catalog.CatalogTemplate(TEMPLATES, maxsize=10)
+
+        rendered = template.render('1234', 'user')
+
+        self.assertIs(rendered, template.render('1234', 'user'))
+        self.assertIsNot(rendered, template.render('1234', 'other'))
+        self.assertEqual(
+            'http://localhost:5000/v2.0/users/other',
+            template.render('1234', 'other')['RegionOne']['identity'][
+                'publicURL'])
@@ -13,6 +13,7 @@ from mock import patch
 from jumpgate.common.exceptions import InvalidTokenError
 from jumpgate.common.exceptions import Unauthorized
 from jumpgate.common.sl import auth
+from jumpgate.identity.drivers import core
 from jumpgate.identity.drivers.sl import auth_tokens_v3
 from jumpgate.identity.drivers.sl.tokens import FakeTokenIdDriver
 from jumpgate.identity.drivers.sl.tokens import NoAuthDriver
@@ -23,7 +24,7 @@ TOKEN_TIMESTAMP_RE = r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z'
 
 
 class TestAuthTokensV3(unittest.TestCase):
-    @patch('SoftLayer.Client')
+    @patch('jumpgate.common.sl.pool.get_client')
     def test_create_token_by_api_key(self, sl_client_constructor):
         user_id = 123456
         username = 'fake_username'
@@ -73,12 +74,12 @@ class TestAuthTokensV3(unittest.TestCase):
         resp = falcon.Response()
         auth_tokens_v3.AuthTokensV3(templates_filename).on_post(req, resp)
 
-        # Ensure that SoftLayer.Client was called with the passed-in username
+        # Ensure that the client authenticates with the passed-in username
         # and api key as the api_key.
-        sl_client_constructor.assert_called_once_with(
-            username=username, api_key=fake_api_key, endpoint_url=mock.ANY,
-            proxy=mock.ANY
-        )
+        sl_client_constructor.assert_called_once_with(auth=mock.ANY)
+        sl_auth = sl_client_constructor.call_args[1]['auth']
+        self.assertEqual(username, sl_auth.username)
+        self.assertEqual(fake_api_key, sl_auth.api_key)
 
         self.assertEqual(201, resp.status)
         exp_user = {
@@ -118,7 +119,7 @@ class TestAuthTokensV3(unittest.TestCase):
             issued_time + datetime.timedelta(seconds=auth.TOKEN_LIFETIME_SEC))
         self.assertEqual(expires_time, exp_expires_time)
 
-    @patch('SoftLayer.Client')
+    @patch('jumpgate.common.sl.pool.get_client')
     def _get_token(self, sl_client_constructor):
         # Gets a valid token.
         user_id = 123456
@@ -221,3 +222,40 @@ class TestFakeTokenIdDriver(unittest.TestCase):
         mockNoAuthDriver.authenticate.return_value = None
         with self.assertRaises(Unauthorized):
             self.instance.token_from_id(self.token_id)
+
+
+class TestAESTokenIdDriver(unittest.TestCase):
+
+    def setUp(self):
+        core.token_cache().clear()
+        self.addCleanup(core.token_cache().clear)
+        self.instance = core.AESTokenIdDriver()
+
+    @patch('jumpgate.identity.drivers.core.aes')
+    def test_token_from_id_cached(self, aes_mock):
+        token = {'user_id': '1234', 'expires': 9999999999.0}
+        aes_mock.decode_aes.return_value = json.dumps(token)
+        token_id = 'dG9rZW4='
+
+        first = self.instance.token_from_id(token_id)
+        first['user_id'] = 'changed'
+        second = self.instance.token_from_id(token_id)
+
+        self.assertEqual(token, second)
+        self.assertEqual(1, aes_mock.decode_aes.call_count)
+        self.assertEqual(1, core.token_cache().hits)
+        self.assertEqual(1, core.token_cache().misses)
+
+    @patch('jumpgate.identity.drivers.core.aes')
+    def test_token_from_id_expired_not_cached(self, aes_mock):
+        token = {'user_id': '1234', 'expires': 1.0}
+        aes_mock.decode_aes.return_value = json.dumps(token)
+
+        self.instance.token_from_id('dG9rZW4=')
+        self.instance.token_from_id('dG9rZW4=')
+
+        self.assertEqual(2, aes_mock.decode_aes.call_count)
+
+    def test_token_from_id_malformed(self):
+        self.assertRaises(InvalidTokenError,
+                          self.instance.token_from_id, None)
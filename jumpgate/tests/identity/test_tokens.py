@@ -9,7 +9,9 @@ from falcon.testing import helpers
 import mock
 
 from jumpgate import api
+from jumpgate.common import config
 from jumpgate.common.sl import auth
+from jumpgate.identity.drivers import core as identity
 from jumpgate.identity.drivers.sl import tokens
 
 
@@ -18,7 +20,7 @@ ISSUED_AT_RE = r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z'
 
 
 class TestTokens(unittest.TestCase):
-    @mock.patch('SoftLayer.Client')
+    @mock.patch('jumpgate.common.sl.pool.get_client')
     def test_issue_token_using_api_key(self, sl_client_constructor):
         # A user can get a token using v2 using an API key.
 
@@ -81,3 +83,48 @@ class TestTokens(unittest.TestCase):
         expires_time = (expires_time - epoch).total_seconds()
 
         self.assertAlmostEqual(expires_time, exp_expires_time, delta=1)
+
+
+class TestAuthCache(unittest.TestCase):
+    def setUp(self):
+        identity.auth_cache().clear()
+        self.addCleanup(identity.auth_cache().clear)
+        # Cached token hashes are encrypted with the secret key
+        if not config.PARSER.has_option('DEFAULT', 'secret_key'):
+            config.PARSER.set('DEFAULT', 'secret_key', 'secret')
+            self.addCleanup(config.PARSER.remove_option, 'DEFAULT',
+                            'secret_key')
+
+    @mock.patch('jumpgate.common.sl.pool.get_client')
+    def test_api_key_user_cached(self, sl_client_constructor):
+        fake_user = {'id': 1, 'username': 'user', 'accountId': 2}
+        get_user = sl_client_constructor.return_value[
+            'Account'].getCurrentUser
+        get_user.return_value = fake_user
+
+        self.assertEqual(fake_user, auth.get_user_by_api_key('user', 'key'))
+        self.assertEqual(fake_user, auth.get_user_by_api_key('user', 'key'))
+        self.assertEqual(1, get_user.call_count)
+
+        auth.get_user_by_api_key('user', 'other-key')
+        self.assertEqual(2, get_user.call_count)
+
+    @mock.patch('jumpgate.common.sl.pool.get_client')
+    def test_password_login_cached(self, sl_client_constructor):
+        client = sl_client_constructor.return_value
+        client.authenticate_with_password.return_value = (1, 'hash')
+        client['Account'].getCurrentUser.return_value = {'id': 1}
+
+        for _ in range(2):
+            self.assertEqual((1, 'hash', {'id': 1}),
+                             auth.get_user_by_password('user', 'secret'))
+        client.authenticate_with_password.assert_called_once_with(
+            'user', 'secret')
+
+    def test_cache_key_hides_credentials(self):
+        key = identity.auth_cache_key('api_key', 'user', 'secret')
+        self.assertNotIn('secret', key)
+        self.assertEqual(key,
+                         identity.auth_cache_key('api_key', 'user', 'secret'))
+        self.assertNotEqual(
+            key, identity.auth_cache_key('api_key', 'user', 'secret2'))
@@ -128,10 +128,75 @@ class TestImageV2(unittest.TestCase):
             id='uuid', mask=images.IMAGE_MASK)
 
 
+    def test_on_get_pending_capture(self):
+        client, env = get_client_env()
+        job = mock.MagicMock(id='job-uuid', pending=True,
+                             info={'name': 'new image'})
+
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+
+        with mock.patch.object(images.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = job
+            images.ImageV2(self.app).on_get(req, resp, 'job-uuid')
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.body['id'], 'job-uuid')
+        self.assertEqual(resp.body['name'], 'new image')
+        self.assertEqual(resp.body['status'], 'saving')
+        vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+        self.assertFalse(vgbdtg.getObject.called)
+
+
+    def get_pending_image(self, group):
+        client, env = get_client_env()
+        vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+        vgbdtg.getObject.side_effect = [group, {
+            'globalIdentifier': 'uuid',
+            'name': 'new image',
+            'status': {'keyName': 'ACTIVE', 'name': 'Active'}}]
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+        image_id = images.get_pending_image_id(42)
+        with mock.patch.object(images.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = None
+            images.ImageV2(self.app).on_get(req, resp, image_id)
+        vgbdtg.getObject.assert_any_call(id=42,
+                                         mask=images.PENDING_IMAGE_MASK)
+        return resp
+
+    def test_on_get_pending_capture_other_process(self):
+        resp = self.get_pending_image({'id': 42, 'name': 'new image',
+                                       'globalIdentifier': None,
+                                       'transactionId': 1234})
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.body['id'], images.get_pending_image_id(42))
+        self.assertEqual(resp.body['name'], 'new image')
+        self.assertEqual(resp.body['status'], 'saving')
+
+    def test_on_get_captured_other_process(self):
+        resp = self.get_pending_image({'id': 42, 'name': 'new image',
+                                       'globalIdentifier': 'uuid'})
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.body['id'], 'uuid')
+        self.assertEqual(resp.body['status'], 'active')
+
+    def test_pending_image_id(self):
+        image_id = images.get_pending_image_id(42)
+        self.assertEqual(42, images.get_pending_group_id(image_id))
+        self.assertIsNone(images.get_pending_group_id('uuid'))
+        self.assertIsNone(images.get_pending_group_id(
+            '00000000-0000-0000-0000-00000000002a'))
+
+
 class TestImagesV2(unittest.TestCase):
 
     def setUp(self):
         self.app = mock.MagicMock()
+        images.image_catalog().invalidate()
+        self.addCleanup(images.image_catalog().invalidate)
 
     def test_get_v2_image_details_dict(self):
         expected_keys = [
@@ -284,3 +349,78 @@ class TestImagesV2(unittest.TestCase):
 
         self.assertEqual(resp.status, 200)
         self.assertEqual(len(resp.body['images']), 0)
+
+    def _set_up_catalog(self, client):
+        vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+        vgbdtg.getPublicImages.return_value = [
+            {'globalIdentifier': 'uuid-%s' % i, 'name': 'public'}
+            for i in range(3)]
+        client['Account'].getPrivateBlockDeviceTemplateGroups.return_value = [
+            {'globalIdentifier': 'uuid-p', 'name': 'private'}]
+        return vgbdtg
+
+    def test_on_get_cached(self):
+        client, env = get_client_env(query_string='marker=uuid-0&limit=1')
+        env['auth'] = {'tenant_id': '1234'}
+        vgbdtg = self._set_up_catalog(client)
+
+        for _ in range(2):
+            req = api.Request(env, sl_client=client)
+            resp = falcon.Response()
+            images.ImagesV2(self.app).on_get(req, resp)
+            self.assertEqual(['uuid-1'],
+                             [i['id'] for i in resp.body['images']])
+
+        self.assertEqual(1, vgbdtg.getPublicImages.call_count)
+        acct = client['Account']
+        self.assertEqual(
+            1, acct.getPrivateBlockDeviceTemplateGroups.call_count)
+
+        # Private images are cached per account, public ones are shared
+        env['auth'] = {'tenant_id': '5678'}
+        req = api.Request(env, sl_client=client)
+        images.ImagesV2(self.app).on_get(req, falcon.Response())
+        self.assertEqual(1, vgbdtg.getPublicImages.call_count)
+        self.assertEqual(
+            2, acct.getPrivateBlockDeviceTemplateGroups.call_count)
+
+    def test_on_delete_invalidates_catalog(self):
+        client, env = get_client_env()
+        env['auth'] = {'tenant_id': '1234'}
+        self._set_up_catalog(client)
+        vgbdtg = client['Virtual_Guest_Block_Device_Template_Group']
+        vgbdtg.getObject.return_value = {'id': 1,
+                                         'globalIdentifier': 'uuid-p'}
+        acct = client['Account']
+
+        req = api.Request(env, sl_client=client)
+        images.ImagesV2(self.app).on_get(req, falcon.Response())
+        images.ImagesV2(self.app).on_delete(req, falcon.Response(), 'uuid-p')
+        images.ImagesV2(self.app).on_get(req, falcon.Response())
+
+        vgbdtg.deleteObject.assert_called_once_with(id=1)
+        self.assertEqual(
+            2, acct.getPrivateBlockDeviceTemplateGroups.call_count)
+
+
+class TestImageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = images.ImageIndex([
+            {'globalIdentifier': 'C', 'name': 'a'},
+            {'globalIdentifier': 'a', 'name': 'b'},
+            {'globalIdentifier': 'b', 'name': 'a'},
+            {'name': 'no id'}])
+
+    def test_sorted(self):
+        self.assertEqual(['a', 'b', 'C'],
+                         [i['globalIdentifier'] for i in self.index.images])
+        self.assertEqual('b', self.index.by_id['a']['name'])
+
+    def test_page(self):
+        ids = lambda images: [i['globalIdentifier'] for i in images]
+        self.assertEqual(['b', 'C'], ids(self.index.page(marker='a')))
+        self.assertEqual(['b'], ids(self.index.page(marker='a', limit=1)))
+        self.assertEqual(['b', 'C'], ids(self.index.page(name='a')))
+        self.assertEqual(['C'], ids(self.index.page(name='a', marker='b')))
+        self.assertEqual([], ids(self.index.page(name='x')))
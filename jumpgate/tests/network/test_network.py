@@ -4,6 +4,7 @@ import falcon
 import mock
 
 from jumpgate import api
+from jumpgate.common.sl import topology
 from jumpgate.network.drivers.sl import networks
 from jumpgate.tests.network import utils
 
@@ -12,6 +13,8 @@ TENANT_ID = 999999
 
 
 def get_client_env(**kwargs):
+    # Every fake client stands for an account with a new topology
+    topology.topology_cache().invalidate()
     client = mock.MagicMock()
     return client, utils.get_env(client, tenant_id=TENANT_ID, **kwargs)
 
@@ -80,7 +83,7 @@ class TestNetworksV2(unittest.TestCase):
     def test_on_get_response_networksv2_show(self):
         """Test show function in NetworksV2"""
 
-        client, env = get_client_env(query_string='name=123321')
+        client, env = get_client_env(query_string='name=11')
         account = client['Account']
         fake_net = get_fake_net(network='PRIVATE')
         account.getNetworkVlans.return_value = [fake_net]
@@ -131,7 +134,7 @@ class TestNetworksV2(unittest.TestCase):
     def test_on_get_response_networksv2_list_with_filter(self):
         """Test list function"""
 
-        client, env = get_client_env(query_string='name=123321')
+        client, env = get_client_env(query_string='name=11')
         fake_net = get_fake_net(network='PRIVATE')
         client['Account'].getNetworkVlans.return_value = [fake_net]
 
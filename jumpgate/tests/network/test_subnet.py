@@ -4,6 +4,7 @@ import falcon
 import mock
 
 from jumpgate import api
+from jumpgate.common.sl import topology
 from jumpgate.network.drivers.sl import subnets
 from jumpgate.tests.network import utils
 
@@ -18,6 +19,8 @@ SUBNET_DICT = {'id': 10,
 
 
 def get_client_env(**kwargs):
+    # Every fake client stands for an account with a new topology
+    topology.topology_cache().invalidate()
     client = mock.MagicMock()
     return client, utils.get_env(client, **kwargs)
 
@@ -112,3 +115,75 @@ class TestSubnetsV2(unittest.TestCase):
 
         subnets.SubnetsV2().on_get(req, resp)
         self.check_body_response(resp.body['subnets'][0])
+
+    def test_on_get_subnetsv2_paginated(self):
+        client, env = get_client_env(query_string='marker=10&limit=1')
+        client['Account'].getSubnets.return_value = [
+            dict(SUBNET_DICT, id=subnet_id) for subnet_id in (12, 10, 11)]
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+
+        subnets.SubnetsV2().on_get(req, resp)
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(['11'],
+                         [subnet['id'] for subnet in resp.body['subnets']])
+        self.assertEqual(1, len(resp.body['subnets_links']))
+        self.assertEqual('next', resp.body['subnets_links'][0]['rel'])
+        self.assertTrue(resp.body['subnets_links'][0]['href'].endswith(
+            '?limit=1&marker=11'))
+
+    def test_on_get_subnetsv2_last_page(self):
+        client, env = get_client_env(query_string='marker=10&limit=5')
+        client['Account'].getSubnets.return_value = [
+            dict(SUBNET_DICT, id=subnet_id) for subnet_id in (12, 10, 11)]
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+
+        subnets.SubnetsV2().on_get(req, resp)
+        self.assertEqual(2, len(resp.body['subnets']))
+        self.assertNotIn('subnets_links', resp.body)
+
+    def test_on_get_subnetsv2_invalid_limit(self):
+        for limit in ('-1', 'bad'):
+            client, env = get_client_env(query_string='limit=' + limit)
+            req = api.Request(env, sl_client=client)
+            resp = falcon.Response()
+
+            subnets.SubnetsV2().on_get(req, resp)
+            self.assertEqual(resp.status, 400)
+
+    def test_on_get_subnetsv2_invalid_marker(self):
+        client, env = get_client_env(query_string='marker=bad')
+        req = api.Request(env, sl_client=client)
+        resp = falcon.Response()
+
+        subnets.SubnetsV2().on_get(req, resp)
+        self.assertEqual(resp.status, 400)
+
+
+class TestFormatSubnetwork(unittest.TestCase):
+
+    def setUp(self):
+        subnets.rendered_subnets().clear()
+        self.subnet = dict(SUBNET_DICT, id=10,
+                           modifyDate='2014-01-01T00:00:00-06:00')
+
+    @mock.patch('ipaddress.ip_network')
+    def test_rendering_reused(self, ip_network_mock):
+        ip_network_mock.return_value = [0, 1]
+        first = subnets.format_subnetwork(self.subnet, 1)
+        second = subnets.format_subnetwork(self.subnet, 2)
+
+        self.assertEqual(1, ip_network_mock.call_count)
+        self.assertEqual(1, first['tenant_id'])
+        self.assertEqual(2, second['tenant_id'])
+        self.assertEqual(first['allocation_pools'],
+                         second['allocation_pools'])
+
+    def test_modified_subnet_rendered_again(self):
+        subnets.format_subnetwork(self.subnet, 1)
+        self.subnet.update(networkIdentifier='9.0.4.0',
+                           modifyDate='2014-01-02T00:00:00-06:00')
+
+        self.assertEqual('9.0.4.0/28',
+                         subnets.format_subnetwork(self.subnet, 1)['cidr'])
@@ -0,0 +1,126 @@
+import ConfigParser
+import os
+import tempfile
+import unittest
+
+import mock
+import SoftLayer
+
+from jumpgate.benchmark import fake_softlayer
+from jumpgate.benchmark import runner
+from jumpgate.common.sl import pool
+
+
+class TestFakeSoftLayer(unittest.TestCase):
+    def setUp(self):
+        self.fake = fake_softlayer.FakeSoftLayer(guests=10, images=2,
+                                                 volumes=4, vlans=2)
+
+    def test_list_paged(self):
+        result, total = self.fake.call(
+            'SoftLayer_Account', 'getVirtualGuests',
+            {'resultLimit': {'offset': 2, 'limit': 3}}, [])
+        self.assertEqual(10, total)
+        self.assertEqual([100002, 100003, 100004],
+                         [guest['id'] for guest in result])
+
+    def test_list_filtered(self):
+        _filter = {'virtualGuests': {'id': {
+            'operation': 'in',
+            'options': [{'name': 'data', 'value': [100001, 100005]}]}}}
+        result, _ = self.fake.call(
+            'SoftLayer_Account', 'getVirtualGuests',
+            {'SoftLayer_AccountObjectFilter': _filter}, [])
+        self.assertEqual([100001, 100005], [guest['id'] for guest in result])
+
+    def test_get_object(self):
+        result, total = self.fake.call(
+            'SoftLayer_Virtual_Guest', 'getObject',
+            {'SoftLayer_Virtual_GuestInitParameters': {'id': 100003}}, [])
+        self.assertEqual('guest3', result['hostname'])
+        self.assertIsNone(total)
+
+    def test_unknown_method(self):
+        self.assertRaises(fake_softlayer.Fault, self.fake.call,
+                          'SoftLayer_Account', 'getUnknown', {}, [])
+
+
+class TestFakeSoftLayerServer(unittest.TestCase):
+    def setUp(self):
+        fake = fake_softlayer.FakeSoftLayer(guests=5, images=1, volumes=1,
+                                            vlans=1)
+        self.server = fake_softlayer.FakeSoftLayerServer(fake).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(pool.reset)
+
+    def test_xmlrpc(self):
+        client = SoftLayer.BaseClient(
+            transport=pool.get_transport(self.server.endpoint_url))
+
+        guests = client['Account'].getVirtualGuests(limit=2)
+        self.assertEqual(2, len(guests))
+        self.assertRaises(SoftLayer.SoftLayerAPIError,
+                          client['Account'].getUnknown)
+        self.assertEqual({'SoftLayer_Account::getVirtualGuests': 1,
+                          'SoftLayer_Account::getUnknown': 1},
+                         self.server.get_calls())
+
+
+class TestRunner(unittest.TestCase):
+    def test_percentile(self):
+        values = [0.1 * i for i in range(1, 11)]
+        self.assertEqual(0.5, runner.percentile(values, 50))
+        self.assertEqual(values[-1], runner.percentile(values, 99))
+        self.assertEqual(0.0, runner.percentile([], 50))
+
+    def test_run(self):
+        server = mock.MagicMock()
+        server.get_calls.side_effect = [
+            runner.collections.Counter({'A::b': 1}),
+            runner.collections.Counter({'A::b': 5})]
+        benchmark = runner.Benchmark(mock.MagicMock(), server)
+        statuses = iter(['200 OK', '500 Internal Server Error'] * 2)
+        with mock.patch.object(benchmark, 'request',
+                               side_effect=lambda w: (next(statuses), '')):
+            result = benchmark.run(runner.WORKLOADS['images_list'], 4,
+                                   concurrency=2)
+
+        self.assertEqual(4, result.requests)
+        self.assertEqual({'500 Internal Server Error': 2}, result.errors)
+        self.assertEqual(1.0, result.calls_per_request)
+        self.assertIn('images_list', runner.format_report([result]))
+
+    def test_write_config_enables_identity(self):
+        fd, path = tempfile.mkstemp(suffix='.conf')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        runner.write_config(path, 'http://localhost:1', ['image'])
+
+        parser = ConfigParser.RawConfigParser()
+        parser.read(path)
+        self.assertEqual('identity, image',
+                         parser.get('DEFAULT', 'enabled_services'))
+        self.assertEqual('auth_token',
+                         parser.get('DEFAULT', 'request_hooks'))
+
+    def run_main(self, errors):
+        result = runner.Result(runner.WORKLOADS['images_list'], [0.1],
+                               runner.collections.Counter(errors), 1.0,
+                               runner.collections.Counter())
+        with mock.patch.object(runner, 'Benchmark') as benchmark, \
+                mock.patch.object(runner.fake_softlayer,
+                                  'FakeSoftLayerServer'), \
+                mock.patch.object(runner.wsgi, 'make_api'), \
+                mock.patch('sys.argv', ['benchmark', '--warmup', '0',
+                                        '--workloads', 'images_list']), \
+                mock.patch('sys.stdout'), mock.patch('sys.stderr'):
+            benchmark.return_value.run.return_value = result
+            status = runner.main()
+        benchmark.return_value.login.assert_called_once_with()
+        return status
+
+    def test_main(self):
+        self.assertEqual(0, self.run_main({}))
+
+    def test_main_fails_on_errors(self):
+        self.assertEqual(1, self.run_main({'401 Unauthorized': 1}))
@@ -0,0 +1,33 @@
+import argparse
+import unittest
+
+from gunicorn import util
+
+from jumpgate import cmd_main
+
+
+def get_args(**kwargs):
+    args = {'host': '0.0.0.0', 'port': 5000, 'workers': 3, 'threads': 4,
+            'keepalive': 5, 'timeout': 120, 'graceful_timeout': 30,
+            'max_requests': 1000, 'pidfile': None}
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+class TestServerOptions(unittest.TestCase):
+    def test_threaded_workers(self):
+        options = cmd_main.get_server_options(get_args())
+        self.assertEqual('0.0.0.0:5000', options['bind'])
+        self.assertEqual(3, options['workers'])
+        self.assertEqual('gthread', options['worker_class'])
+        self.assertEqual(100, options['max_requests_jitter'])
+        self.assertFalse(options['preload_app'])
+
+    def test_sync_workers(self):
+        options = cmd_main.get_server_options(get_args(threads=1))
+        self.assertEqual('sync', options['worker_class'])
+
+    def test_worker_class_importable(self):
+        for threads in (1, 4):
+            options = cmd_main.get_server_options(get_args(threads=threads))
+            self.assertTrue(util.load_class(options['worker_class']))
@@ -4,6 +4,7 @@ import unittest
 
 from jumpgate import api
 from jumpgate.common import dispatcher
+from jumpgate.common import utils
 from jumpgate.common.hooks import core
 
 
@@ -76,7 +77,7 @@ class TestJumpgate(unittest.TestCase):
         url = self.app.get_endpoint_url('SERVICE', req, 'user_page0')
         self.assertEqual(url, 'http://some_host/path0/to/1234')
 
-    @mock.patch('jumpgate.api.importlib.import_module')
+    @mock.patch('jumpgate.api.Jumpgate.import_module')
     def test_load_drivers(self, import_module):
         compute_disp = mock.MagicMock()
         identity_disp = mock.MagicMock()
@@ -110,3 +111,101 @@ class TestJumpgate(unittest.TestCase):
                           'image': False,
                           'network': False,
                           'volume': False})
+
+
+class StubGetResource(object):
+    def on_get(self, req, resp, **kwargs):
+        resp.status = falcon.HTTP_200
+        resp.body = {'id': kwargs.get('item_id')}
+
+
+class TestLazyDriver(unittest.TestCase):
+    def setUp(self):
+        self.module = mock.MagicMock()
+        self.module.setup_routes.side_effect = (
+            lambda app, disp: disp.set_handler('item', StubGetResource()))
+
+        self.app = mock.MagicMock(before_hooks=[], after_hooks=[], _api=None)
+        self.app.import_module.return_value = self.module
+        self.disp = dispatcher.Dispatcher()
+        self.disp.add_endpoint('item', '/items/{item_id}')
+        self.disp.add_endpoint('unused', '/unused')
+
+        self.driver = api.LazyDriver(self.app, self.disp, 'path.to.driver')
+        self.driver.add_routes()
+
+    def call(self, nickname, method, **kwargs):
+        req = mock.MagicMock()
+        resp = falcon.Response()
+        handler = self.disp.get_handler(nickname)
+        getattr(handler, 'on_' + method)(req, resp, **kwargs)
+        return resp
+
+    def test_add_routes(self):
+        self.assertEqual(self.disp.get_unused_endpoints(), [])
+        for nickname in ('item', 'unused'):
+            self.assertIsInstance(self.disp.get_handler(nickname),
+                                  api.LazyHandler)
+        self.assertFalse(self.driver.loaded)
+        self.assertFalse(self.app.import_module.called)
+
+    def test_dispatch_loads_driver_once(self):
+        handler = self.disp.get_handler('item')
+        req = mock.MagicMock()
+        resp = falcon.Response()
+
+        handler.on_get(req, resp, item_id='1')
+        self.assertEqual(resp.status, falcon.HTTP_200)
+        self.assertEqual(resp.body, {'id': '1'})
+        self.app.import_module.assert_called_once_with('path.to.driver')
+        self.module.setup_routes.assert_called_once_with(self.app, self.disp)
+
+        handler.on_get(req, resp, item_id='2')
+        self.assertEqual(resp.body, {'id': '2'})
+        self.assertEqual(self.app.import_module.call_count, 1)
+
+    def test_dispatch_unsupported_method(self):
+        handler = self.disp.get_handler('item')
+        req = mock.MagicMock()
+        resp = falcon.Response()
+
+        self.assertRaises(falcon.HTTPMethodNotAllowed,
+                          handler.on_post, req, resp, item_id='1')
+
+        handler.on_options(req, resp, item_id='1')
+        self.assertEqual(resp.status, falcon.HTTP_204)
+        self.assertEqual(resp._headers['allow'], 'GET')
+
+    def test_dispatch_unused_endpoint(self):
+        resp = self.call('unused', 'get')
+        self.assertEqual(resp.status, 501)
+
+    def test_driver_fills_unused_endpoints(self):
+        def setup_routes(app, disp):
+            for nickname in disp.get_unused_endpoints():
+                disp.set_handler(nickname, StubGetResource())
+        self.module.setup_routes.side_effect = setup_routes
+
+        resp = self.call('unused', 'get', item_id='1')
+        self.assertEqual(resp.status, falcon.HTTP_200)
+        self.assertIsInstance(self.disp.get_handler('item'),
+                              StubGetResource)
+
+    def test_late_hooks(self):
+        hook = mock.MagicMock()
+        self.app._api = mock.MagicMock()
+        self.app.import_times = {'path.to.driver': (0.1, 3)}
+        self.module.setup_routes.side_effect = (
+            lambda app, disp: app.before_hooks.append(hook))
+
+        self.call('unused', 'get')
+        self.assertEqual(self.driver.before_hooks, [hook])
+        self.assertTrue(hook.called)
+
+
+class TestTimedImport(unittest.TestCase):
+    def test_timed_import(self):
+        module, seconds, new_modules = utils.timed_import('json')
+        self.assertEqual(module.__name__, 'json')
+        self.assertTrue(seconds >= 0)
+        self.assertTrue(new_modules >= 0)
@@ -1,6 +1,7 @@
 import json
 import mock
 import unittest
+import uuid
 
 import falcon
 from falcon.testing import helpers
@@ -211,10 +212,95 @@ class TestVolumeV1(unittest.TestCase):
         self.assertRaises(SoftLayer.SoftLayerAPIError)
 
 
+    def test_on_get_pending_volume(self):
+        """Show a volume whose order hasn't been delivered yet"""
+        volume_id = volumes.get_pending_volume_id(12345)
+        self.client['Billing_Order'].getOrderTopLevelItems.return_value = [
+            {'billingItem': {'resourceTableId': None}}]
+        with mock.patch.object(volumes.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = None
+            self.app.on_get(self.req, self.resp, TENANT_ID, volume_id)
+        self.assertEqual(self.resp.status, 200)
+        self.assertEqual(self.resp.body['volume']['id'], volume_id)
+        self.assertEqual(self.resp.body['volume']['status'], 'creating')
+        self.client['Billing_Order'].getOrderTopLevelItems.assert_called_with(
+            id=12345, mask='billingItem')
+
+    def test_on_get_unknown_pending_volume(self):
+        volume_id = volumes.get_pending_volume_id(12345)
+        self.client['Billing_Order'].getOrderTopLevelItems.side_effect = (
+            SoftLayer.SoftLayerAPIError(404, 'Unable to find object'))
+        with mock.patch.object(volumes.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = None
+            self.app.on_get(self.req, self.resp, TENANT_ID, volume_id)
+        self.assertEqual(self.resp.status, 404)
+
+    def test_on_get_random_uuid(self):
+        """A uuid which isn't a pending id isn't looked up as an order"""
+        self.client['Virtual_Disk_Image'].getObject.side_effect = (
+            SoftLayer.SoftLayerAPIError(404, 'Unable to find object'))
+        self.app.on_get(self.req, self.resp, TENANT_ID, str(uuid.uuid4()))
+        self.assertEqual(self.resp.status, 404)
+        self.assertFalse(
+            self.client['Billing_Order'].getOrderTopLevelItems.called)
+
+    def test_on_delete_pending_volume(self):
+        volume_id = volumes.get_pending_volume_id(12345)
+        job = mock.MagicMock(pending=True)
+        with mock.patch.object(volumes.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = job
+            self.app.on_delete(self.req, self.resp, TENANT_ID, volume_id)
+        self.assertEqual(self.resp.status, 400)
+
+
+class TestPendingVolumeId(unittest.TestCase):
+
+    def test_round_trip(self):
+        volume_id = volumes.get_pending_volume_id(12345)
+        self.assertEqual(36, len(volume_id))
+        self.assertEqual(12345, volumes.get_pending_order_id(volume_id))
+
+    def test_real_volume_id(self):
+        self.assertIsNone(volumes.get_pending_order_id(GOOD_VOLUME_ID))
+        self.assertIsNone(volumes.get_pending_order_id('not-a-uuid'))
+        self.assertIsNone(volumes.get_pending_order_id(str(uuid.uuid4())))
+
+    def test_order_id_out_of_range(self):
+        self.assertIsNone(volumes.get_pending_order_id(
+            volumes.PENDING_VOLUME_ID_PREFIX + 'ffffffffffff'))
+        self.assertIsNone(volumes.get_pending_order_id(
+            volumes.PENDING_VOLUME_ID_PREFIX + '000000000000'))
+
+    def test_resolve_volume_id(self):
+        client = mock.MagicMock()
+        volume_id = volumes.get_pending_volume_id(12345)
+        job = mock.MagicMock(pending=False, result=GOOD_VOLUME_ID)
+        with mock.patch.object(volumes.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = job
+            self.assertEqual(GOOD_VOLUME_ID,
+                             volumes.resolve_volume_id(client, volume_id))
+            self.assertEqual(GOOD_VOLUME_ID,
+                             volumes.resolve_volume_id(client,
+                                                       GOOD_VOLUME_ID))
+        self.assertFalse(client['Billing_Order'].called)
+
+    def test_resolve_volume_id_from_order(self):
+        client = mock.MagicMock()
+        client['Billing_Order'].getOrderTopLevelItems.return_value = [
+            {'billingItem': {'resourceTableId': 200}}]
+        volume_id = volumes.get_pending_volume_id(12345)
+        with mock.patch.object(volumes.jobs, 'job_tracker') as trackerMock:
+            trackerMock.return_value.get.return_value = None
+            self.assertEqual(200,
+                             volumes.resolve_volume_id(client, volume_id))
+
+
 class TestVolumesV1(unittest.TestCase):
     """Unit tests for class VolumesV1"""
 
     def setUp(self):
+        volumes.storage_catalog().invalidate()
+        self.addCleanup(volumes.storage_catalog().invalidate)
         self.body = {
             'volume': {
                 'display_name': 'test',
@@ -269,6 +355,41 @@ class TestVolumesV1(unittest.TestCase):
         # guest (virtual server) hostname.
         self.assertEqual('', attachment['host_name'])
 
+    def test_on_get_for_volume_detail_list_batches_guests(self):
+        """Detail list resolves attached guests in a single call"""
+        client, env, req, resp = _set_up_req_resp_body()
+        self.vtl, volume_types = _set_up_vol_types_vtl(json.dumps(EXPECTED))
+        app = volumes.VolumesV1(volume_types, detail=True)
+        vols = []
+        for i in range(3):
+            vols.append({'id': DISK_IMG_ID + i, 'typeId': 241,
+                         'localDiskFlag': False, 'billingItem': {},
+                         'blockDevices': [{'guestId': GUEST_ID + i,
+                                           'diskImageId': DISK_IMG_ID + i,
+                                           'device': BLKDEV_MOUNT_ID}]})
+        # The first guest hostname comes with the object mask
+        vols[0]['blockDevices'][0]['guest'] = {
+            'fullyQualifiedDomainName': 'masked.example.com'}
+        client['Account'].getVirtualDiskImages.return_value = vols
+        client['Account'].getVirtualGuests.return_value = [
+            {'id': GUEST_ID + 1, 'fullyQualifiedDomainName': 'one'},
+            {'id': GUEST_ID + 2, 'fullyQualifiedDomainName': 'two'}]
+
+        app.on_get(req, resp, TENANT_ID)
+
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(
+            ['masked.example.com', 'one', 'two'],
+            [vol['attachments'][0]['host_name']
+             for vol in resp.body['volumes']])
+        client['Account'].getVirtualGuests.assert_called_once_with(
+            mask='id,fullyQualifiedDomainName',
+            filter={'virtualGuests': {'id': {
+                'operation': 'in',
+                'options': [{'name': 'data',
+                             'value': [GUEST_ID + 1, GUEST_ID + 2]}]}}})
+        self.assertFalse(client['Virtual_Guest'].getObject.called)
+
     def test_on_post_volume_create_bad_request(self):
         self.body = {'volume': {'size': 'abcdh'}}
         client, env, req, resp = _set_up_req_resp_body(
@@ -472,3 +593,59 @@ def set_SL_client(req, operation=OP_CODE['GOOD_PATH']['SIMPLE']):
             mock.MagicMock(side_effect=_return_disk_img_2)
         req.sl_client['Product_Order'].placeOrder = \
             mock.MagicMock(return_value={'orderId': ORDERID})
+
+
+class TestStorageCatalog(unittest.TestCase):
+    """Unit tests for the portable storage package and price index"""
+
+    def setUp(self):
+        self.client = mock.MagicMock()
+        pkg = self.client['Product_Package']
+        pkg.getAllObjects.return_value = [
+            {'name': 'Other', 'isActive': 1, 'id': 1},
+            {'name': 'Portable Storage', 'isActive': 1, 'id': PROD_PKG_ID}]
+        pkg.getItems.return_value = [
+            {'capacity': '10', 'prices': [{'id': 10}]},
+            {'capacity': '50', 'prices': [{'id': 50}]},
+            {'capacity': '100', 'prices': [{'id': 100}]}]
+        self.client['Location_Datacenter'].getDatacenters.return_value = [
+            {'name': 'sjc01', 'id': 1}, {'name': DATACENTER_NAME,
+                                         'id': DATACENTER_ID}]
+
+    def test_get_index_cached(self):
+        catalog = volumes.StorageCatalog(ttl=60)
+
+        index = catalog.get_index(self.client)
+
+        self.assertIs(index, catalog.get_index(self.client))
+        self.assertEqual(PROD_PKG_ID, index.package_id)
+        self.client['Product_Package'].getItems.assert_called_once_with(
+            id=PROD_PKG_ID, mask='prices.id')
+        self.assertEqual(
+            1, self.client['Product_Package'].getAllObjects.call_count)
+
+        catalog.invalidate()
+        self.assertIsNot(index, catalog.get_index(self.client))
+
+    def test_match_prices(self):
+        index = volumes.StorageCatalog().get_index(self.client)
+
+        self.assertEqual([{'id': 10}], index.match_prices(1))
+        self.assertEqual([{'id': 50}], index.match_prices(60))
+        self.assertEqual([{'id': 100}], index.match_prices(1000))
+        self.assertEqual([{'id': 50}], index.match_prices(50, True))
+        self.assertRaises(SoftLayer.SoftLayerAPIError,
+                          index.match_prices, 60, True)
+
+    def test_get_location(self):
+        index = volumes.StorageCatalog().get_index(self.client)
+
+        self.assertEqual(DATACENTER_ID, index.get_location(DATACENTER_NAME))
+        self.assertEqual(1, index.get_location(None))
+        self.assertEqual(1, index.get_location('unknown'))
+
+    def test_missing_package(self):
+        self.client['Product_Package'].getAllObjects.return_value = []
+
+        self.assertRaises(SoftLayer.SoftLayerAPIError,
+                          volumes.StorageCatalog().get_index, self.client)
@@ -33,7 +33,8 @@ def setup_routes(app, disp):
     volume_types = vtl.get_volume_types()
 
     # V1 Routes
-    disp.set_handler('v1_volumes_detail', volumes.VolumesV1(volume_types))
+    disp.set_handler('v1_volumes_detail',
+                     volumes.VolumesV1(volume_types, detail=True))
     disp.set_handler('v1_volume', volumes.VolumeV1())
     disp.set_handler('v1_volumes', volumes.VolumesV1(volume_types))
     disp.set_handler('v1_volume_types', volumes.VolumeTypesV1(volume_types))
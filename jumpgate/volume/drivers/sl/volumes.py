@@ -1,3 +1,5 @@
+import bisect
+import functools
 import json
 import logging
 import time
@@ -6,8 +8,11 @@ import uuid
 import six
 import SoftLayer
 
+from jumpgate.common import cache
 from jumpgate.common import config
 from jumpgate.common import error_handling
+from jumpgate.common import fanout
+from jumpgate.common import jobs
 
 
 HTTP = six.moves.http_client  # pylint: disable=E1101
@@ -26,11 +31,21 @@ VIRTUAL_DISK_IMAGE_TYPE = {
     'SWAP': 246
 }
 
-RETRY_COUNT = 3
-WAIT_TIME = 2
+# Delivery of portable storage orders is polled in the background with an
+# exponential backoff
+ORDER_POLL_INTERVAL = 2
+ORDER_POLL_MAX_INTERVAL = 30
+ORDER_POLL_TIMEOUT = 10 * 60
+
+DEFAULT_CATALOG_TTL = 60 * 60
+
+_storage_catalog = None
 
 # openstack is use uuid.uuid4() to generate UUID.
 OPENSTACK_VOLUME_UUID_LEN = len(str(uuid.uuid4()))
+# Pending volume ids are the order id in the last group of a nil uuid,
+# which no uuid4 volume id starts with
+PENDING_VOLUME_ID_PREFIX = '00000000-0000-0000-0000-'
 
 
 class VolumeTypesV1(object):
@@ -79,9 +94,21 @@ class VolumeV1(object):
         client = req.sl_client
 
         if volume_id and len(volume_id) <= OPENSTACK_VOLUME_UUID_LEN:
+            try:
+                resolved_id = resolve_volume_id(client, volume_id)
+            except SoftLayer.SoftLayerAPIError:
+                return error_handling.not_found(
+                    resp, message="Volume could not be found")
+            if resolved_id is None:
+                # The order is still being processed
+                resp.status = HTTP.OK
+                resp.body = {'volume': format_volume(
+                    tenant_id, get_pending_volume(volume_id), client)}
+                resp.body['volume'].update({'status': 'creating'})
+                return
             # show volume details by volume id
             # /v1/{tenant_id}/volumes/{volume_id}
-            self._show_volume(tenant_id, volume_id, client, req, resp)
+            self._show_volume(tenant_id, resolved_id, client, req, resp)
         else:
             return error_handling.bad_request(resp,
                                               message="Malformed request body")
@@ -91,9 +118,17 @@ class VolumeV1(object):
         client = req.sl_client
 
         if volume_id and len(volume_id) <= OPENSTACK_VOLUME_UUID_LEN:
+            try:
+                resolved_id = resolve_volume_id(client, volume_id)
+            except SoftLayer.SoftLayerAPIError:
+                return error_handling.not_found(
+                    resp, message="Volume could not be found")
+            if resolved_id is None:
+                return error_handling.bad_request(
+                    resp, message="Volume is still being created")
             # show volume details by volume id
             # /v1/{tenant_id}/volumes/{volume_id}
-            self._delete_volume(tenant_id, volume_id, client, req, resp)
+            self._delete_volume(tenant_id, resolved_id, client, req, resp)
         else:
             return error_handling.bad_request(resp,
                                               message="Invalid volume Id")
@@ -152,8 +187,9 @@ class VolumesV1(object):
     GET /v1/{tenant_id}/volumes     -- Lists simple volume entities
     GET /v1/{tenant_id}/volumes/detail -- Lists details for volume entities
     """
-    def __init__(self, volume_types):
+    def __init__(self, volume_types, detail=False):
         self.volume_types = volume_types
+        self.detail = detail
 
     def on_get(self, req, resp, tenant_id):
 
@@ -226,23 +262,9 @@ class VolumesV1(object):
                                           exact_capacity=rounding)
 
             resp.status = HTTP.ACCEPTED
-
-            if volinfo:
-                resp.body = {'volume':
-                             format_volume(tenant_id, volinfo, client)}
-                resp.body['volume'].update({'status': 'creating'})
-            else:
-                # Cannot generate a valid response without knowning
-                # the volume id when order takes too long to complete.
-                # This should be a rare case, but it could break openstack
-                # since the volume create caller always expect a volume id
-                # uppon successful return. The approach here is to fail
-                # the volume create operation and leak one portable storage
-                # volume. User can always cancel from SL portal.
-
-                return error_handling.volume_fault(resp,
-                                                   "Portable storage"
-                                                   " order delayed")
+            resp.body = {'volume':
+                         format_volume(tenant_id, volinfo, client)}
+            resp.body['volume'].update({'status': 'creating'})
 
         except SoftLayer.SoftLayerAPIError as e:
             return error_handling.error(resp,
@@ -266,122 +288,35 @@ class VolumesV1(object):
         :param volume_type: volume type
         :param return: cinder volume info
         """
-        def _find_product_package_id():
-            """return SL product package id."""
-            prod_pkg = client['Product_Package'].getAllObjects()
-            prod = [item for item in prod_pkg
-                    if item['name'].lower() == "portable storage" and
-                    item['isActive'] == 1]
-            if prod:
-                return prod[0]['id']
-            else:
-                return None
-
-        def _match_portable_storage_prices(packageId, size, exact_capacity):
-            # match the SL portable storage capacity that closet
-            # to the requested size and return the prices
-
-            prod_pkg = client['Product_Package']
-            price_list = prod_pkg.getItems(id=packageId,
-                                           mask='prices.id')
-            # each item in price_list looks like this:
-            # {'capacity': '150',
-            # 'description': '150 GB (SAN)',
-            # 'id': 1221,
-            # 'prices': [{'id': 2262}],
-            # 'softwareDescriptionId': '',
-            # 'units': 'GB',
-            # 'upgradeItemId': ''}
-            price_matrix = {}
-            for x in price_list:
-                price_matrix.update({int(x['capacity']): x['prices']})
-            # find the closet capacity to the requested size
-            if exact_capacity:
-                ret = False
-                for x in price_matrix:
-                    if size == x:
-                        ret = True
-                        capacity_idx = x
-                        break
-                if not ret:
-                    raise SoftLayer.SoftLayerAPIError(
-                        HTTP.BAD_REQUEST,
-                        'volume_types: extra_specs: '
-                        'drivers:exact_capacity is set to'
-                        ' True and there is no volume with'
-                        ' matching capacity')
-            else:
-                capacity_idx = min(price_matrix, key=lambda x: abs(x - size))
-
-            return price_matrix[capacity_idx]
-
-        def _find_availibility_zone_location(zone):
-            # make sure there is an availability_zone selected
-            zonename = zone if zone else 'sjc01'
-
-            datacenter = client['Location_Datacenter']
-            locations = dict(map(lambda x: (x['name'], x['id']),
-                             datacenter.getDatacenters(mask="name,id")))
-            # use sjc01 as default datacenter. The disk cannot be found if
-            # being ordered without datacenter.
-            return locations.get(zonename, locations.get('sjc01'))
-
-        def _get_volume_id_from_ordered_items(order_id):
-            """Retreive volume id from order id
-
-            The SL placeOrder only returns the receipt not the
-            ordered items itself. Need to find the portable disk id
-            from the ordered item to generate the respond body for
-            volume create
-            """
-
-            bill = client['Billing_Order']
-            volume_id = None
-            count = 0
-            while count <= RETRY_COUNT:
-                items = bill.getOrderTopLevelItems(id=order_id,
-                                                   mask='billingItem')
-                # There is only one disk ordered per volume create.
-                try:
-                    # it seems billingItem may not be available
-                    # immediately after order. Retry as needed.
-                    volume_id = items[0]['billingItem']['resourceTableId']
-                    if volume_id:
-                        break
-                except Exception:
-                    time.sleep(WAIT_TIME * count)
-                    count += 1
-            if not volume_id:
-                # after waiting long enough, the order hasn't went through.
-                # There is no way to cancel the order as roll back method
-                # since we don't have the billingItem yet.
-                # This is the state we cannot handle in jumpgate right now.
-                # Will not return the volume info in the create volume
-                # response body.
-                LOG.info("Portable Storage order: %(ordid)s hasn't been"
-                         "delivered after waiting for %(wait)s seconds." %
-                         dict(ordid=order_id,
-                              wait=(WAIT_TIME * (count - 1))))
-            return volume_id
-
-        pkgid = _find_product_package_id()
-        prices = _match_portable_storage_prices(pkgid, size, exact_capacity)
-        loc = _find_availibility_zone_location(zone)
+        index = storage_catalog().get_index(client)
 
         data = {'complexType': CONTAINER_VIRT_DISK,
-                'prices': prices,
-                'packageId': pkgid,
-                'location': loc,
+                'prices': index.match_prices(size, exact_capacity),
+                'packageId': index.package_id,
+                'location': index.get_location(zone),
                 'diskDescription': name}
 
         LOG.debug("Portable storage order payload: %s" % str(data))
         product = client['Product_Order']
-        product.verifyOrder(data)
+        try:
+            product.verifyOrder(data)
+        except SoftLayer.SoftLayerAPIError:
+            # The cached prices or locations may have gone stale
+            storage_catalog().invalidate()
+            raise
         order = product.placeOrder(data)
         LOG.debug("Portable Storage order receipt: %s" % str(order))
-        volume_id = _get_volume_id_from_ordered_items(order['orderId'])
+        # The SL placeOrder only returns the receipt, the portable disk id
+        # is only known once the order has been delivered
+        volume_id = get_ordered_volume_id(client, order['orderId'])
         if not volume_id:
-            return None
+            # Answer right away with a pending id and let the order
+            # complete in the background instead of holding the request
+            pending_id = get_pending_volume_id(order['orderId'])
+            jobs.job_tracker().submit(wait_for_ordered_volume,
+                                      client, order['orderId'],
+                                      job_id=pending_id)
+            return get_pending_volume(pending_id, name=name, size=size)
 
         virtual_disk = client['Virtual_Disk_Image']
         volinfo = virtual_disk.getObject(id=volume_id,
@@ -414,17 +349,195 @@ class VolumesV1(object):
                     _getVirtualDiskImages(mask=get_virt_disk_img_mask())
                     if x['typeId'] != VIRTUAL_DISK_IMAGE_TYPE['SWAP'] and
                     not x['localDiskFlag']]
+            guests = None
+            if self.detail:
+                guests = get_attached_guests(client, vols)
             resp.body = {"volumes":
                          [format_volume(tenant_id,
                                         vol,
-                                        client) for vol in vols]}
+                                        client,
+                                        showDetails=self.detail,
+                                        guests=guests) for vol in vols]}
             resp.status = HTTP.OK
 
         except Exception as e:
             return error_handling.volume_fault(resp, str(e))
 
 
-def format_volume(tenant_id, volume, client, showDetails=False, version=1):
+def get_ordered_volume_id(client, order_id):
+    """Return the id of the volume an order delivered, None until then."""
+    items = client['Billing_Order'].getOrderTopLevelItems(id=order_id,
+                                                          mask='billingItem')
+    # There is only one disk ordered per volume create. The billingItem may
+    # not be available immediately after the order.
+    try:
+        return items[0]['billingItem']['resourceTableId'] or None
+    except (IndexError, KeyError, TypeError):
+        return None
+
+
+def wait_for_ordered_volume(client, order_id):
+    """Poll an order until its volume is delivered, run as a job."""
+    waited = 0
+    delay = ORDER_POLL_INTERVAL
+    while waited < ORDER_POLL_TIMEOUT:
+        volume_id = get_ordered_volume_id(client, order_id)
+        if volume_id:
+            return volume_id
+        time.sleep(delay)
+        waited += delay
+        delay = min(delay * 2, ORDER_POLL_MAX_INTERVAL)
+
+    # There is no way to cancel the order as roll back method since we
+    # don't have the billingItem yet. The pending id keeps resolving the
+    # order whenever the volume is polled.
+    LOG.info("Portable Storage order: %(ordid)s hasn't been "
+             "delivered after waiting for %(wait)s seconds.",
+             dict(ordid=order_id, wait=waited))
+    return None
+
+
+def get_pending_volume_id(order_id):
+    """Return the uuid shaped volume id handed out while order_id is open.
+
+    The order id is encoded in the uuid, so any jumpgate process can
+    resolve it, not only the one which placed the order.
+    """
+    return jobs.get_pending_id(PENDING_VOLUME_ID_PREFIX, order_id)
+
+
+def get_pending_order_id(volume_id):
+    """Return the order id of a pending volume id, None for other ids."""
+    return jobs.get_softlayer_id(PENDING_VOLUME_ID_PREFIX, volume_id)
+
+
+def resolve_volume_id(client, volume_id):
+    """Return the portable storage id for volume_id, None while pending."""
+    order_id = get_pending_order_id(volume_id)
+    if order_id is None:
+        return volume_id
+
+    job = jobs.job_tracker().get(volume_id)
+    if job is not None:
+        if job.pending:
+            return None
+        if job.result:
+            return job.result
+    return get_ordered_volume_id(client, order_id)
+
+
+def get_pending_volume(volume_id, name=None, size=None):
+    """Return a placeholder Virtual_Disk_Image for a volume on order."""
+    return {'id': volume_id,
+            'name': name,
+            'capacity': size,
+            'typeId': VIRTUAL_DISK_IMAGE_TYPE['SYSTEM'],
+            'blockDevices': [],
+            'billingItem': {}}
+
+
+class StorageIndex(object):
+    """Portable storage package, prices by capacity and datacenter ids."""
+
+    def __init__(self, package_id, items, datacenters):
+        self.package_id = package_id
+        # each item looks like this:
+        # {'capacity': '150',
+        # 'description': '150 GB (SAN)',
+        # 'id': 1221,
+        # 'prices': [{'id': 2262}],
+        # 'softwareDescriptionId': '',
+        # 'units': 'GB',
+        # 'upgradeItemId': ''}
+        self.prices = dict((int(item['capacity']), item['prices'])
+                           for item in items)
+        self.capacities = sorted(self.prices)
+        self.locations = dict((dc['name'], dc['id']) for dc in datacenters)
+
+    def match_prices(self, size, exact_capacity=False):
+        """Return the prices of the capacity closest to size."""
+        if exact_capacity:
+            if size not in self.prices:
+                raise SoftLayer.SoftLayerAPIError(
+                    HTTP.BAD_REQUEST,
+                    'volume_types: extra_specs: '
+                    'drivers:exact_capacity is set to'
+                    ' True and there is no volume with'
+                    ' matching capacity')
+            return self.prices[size]
+
+        if not self.capacities:
+            raise SoftLayer.SoftLayerAPIError(
+                HTTP.INTERNAL_SERVER_ERROR,
+                'No portable storage capacities are available')
+        i = bisect.bisect_left(self.capacities, size)
+        candidates = self.capacities[max(i - 1, 0):i + 1]
+        return self.prices[min(candidates, key=lambda x: abs(x - size))]
+
+    def get_location(self, zone):
+        # use sjc01 as default datacenter. The disk cannot be found if
+        # being ordered without datacenter.
+        return self.locations.get(zone or 'sjc01',
+                                  self.locations.get('sjc01'))
+
+
+class StorageCatalog(object):
+    """Periodically refreshed StorageIndex shared by all volume creates.
+
+    The product package catalog is large and rarely changes, so it is only
+    downloaded once per ttl instead of on every order.
+    """
+
+    def __init__(self, ttl=DEFAULT_CATALOG_TTL):
+        self._cache = cache.LRUCache(maxsize=1, ttl=ttl,
+                                     name='volume_storage_catalog')
+
+    def get_index(self, client):
+        index = self._cache.get('index')
+        if index is None:
+            index = self._build_index(client)
+            self._cache.set('index', index)
+        return index
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def _build_index(self, client):
+        package_id, datacenters = fanout.fan_out(
+            functools.partial(_find_product_package_id, client),
+            functools.partial(client['Location_Datacenter'].getDatacenters,
+                              mask='name,id'))
+        if package_id is None:
+            raise SoftLayer.SoftLayerAPIError(
+                HTTP.INTERNAL_SERVER_ERROR,
+                'Portable storage product package not found')
+        items = client['Product_Package'].getItems(id=package_id,
+                                                   mask='prices.id')
+        return StorageIndex(package_id, items, datacenters)
+
+
+def _find_product_package_id(client):
+    """return SL product package id."""
+    prod_pkg = client['Product_Package'].getAllObjects(
+        mask='id,name,isActive')
+    prod = [item for item in prod_pkg
+            if item['name'].lower() == "portable storage" and
+            item['isActive'] == 1]
+    if prod:
+        return prod[0]['id']
+    return None
+
+
+def storage_catalog():
+    global _storage_catalog
+    if _storage_catalog is None:
+        _storage_catalog = StorageCatalog(
+            ttl=config.getint('volume', 'catalog_ttl', DEFAULT_CATALOG_TTL))
+    return _storage_catalog
+
+
+def format_volume(tenant_id, volume, client, showDetails=False, version=1,
+                  guests=None):
     def _get_volume_status(volume):
 
         status = None
@@ -449,9 +562,13 @@ def format_volume(tenant_id, volume, client, showDetails=False, version=1):
     bootable = 'false'
     status = _get_volume_status(volume)
 
+    if showDetails and guests is None:
+        guests = get_attached_guests(client, [volume])
+
     for blkdev in blkdevs:
         attachment.append(
-            _translate_attachment(blkdev, client, showDetails=showDetails))
+            _translate_attachment(blkdev, client, showDetails=showDetails,
+                                  guests=guests))
         if blkdev.get('bootableFlag'):
             bootable = 'true'
 
@@ -483,7 +600,46 @@ def format_volume(tenant_id, volume, client, showDetails=False, version=1):
     return volinfo
 
 
-def _translate_attachment(blkdev, client, showDetails=False):
+def get_attached_guests(client, volumes):
+    """Return {guest id: hostname} for the guests the volumes attach to.
+
+    Hostnames come from the blockDevices.guest object mask, any guest
+    missing from it is fetched with a single bulk query.
+    """
+    guests = {}
+    missing = set()
+    for volume in volumes:
+        for blkdev in volume.get('blockDevices') or []:
+            guest_id = blkdev.get('guestId')
+            if not guest_id:
+                continue
+            guest = blkdev.get('guest')
+            if guest and 'fullyQualifiedDomainName' in guest:
+                guests[guest_id] = guest['fullyQualifiedDomainName']
+            else:
+                missing.add(guest_id)
+
+    missing.difference_update(guests)
+    if missing:
+        _filter = {
+            'virtualGuests': {
+                'id': {
+                    'operation': 'in',
+                    'options': [{'name': 'data', 'value': sorted(missing)}],
+                }
+            }
+        }
+        try:
+            for guest in client['Account'].getVirtualGuests(
+                    mask='id,fullyQualifiedDomainName', filter=_filter):
+                guests[guest['id']] = guest.get('fullyQualifiedDomainName')
+        except SoftLayer.SoftLayerAPIError as e:
+            LOG.warning("Unable to look up guests %s attached to volumes: "
+                        "%s", sorted(missing), e.faultString)
+    return guests
+
+
+def _translate_attachment(blkdev, client, showDetails=False, guests=None):
     d = {}
 
     d['id'] = blkdev.get('diskImageId')
@@ -493,16 +649,12 @@ def _translate_attachment(blkdev, client, showDetails=False):
     guestId = blkdev.get('guestId')
 
     if guestId and showDetails:
-        vs = client['Virtual_Guest']
-        try:
-            vsinfo = vs.getObject(id=blkdev.get('guestId'),
-                                  mask='billingItem')
-            hostname = vsinfo.get('fullyQualifiedDomainName')
-            d['server_id'] = str(blkdev.get('guestId'))
-            d['host_name'] = hostname
-
-        except Exception:
-            pass
+        if guests is None:
+            guests = get_attached_guests(client,
+                                         [{'blockDevices': [blkdev]}])
+        if guestId in guests:
+            d['server_id'] = str(guestId)
+            d['host_name'] = guests[guestId]
     else:
         d['server_id'] = str(blkdev.get('guestId'))
         d['host_name'] = ""
@@ -523,6 +675,7 @@ def get_virt_disk_img_mask():
         'description',
         'createDate',
         'blockDevices',
+        'blockDevices.guest.fullyQualifiedDomainName',
         'storageRepository.datacenter',
         'billingItem',
         'localDiskFlag']
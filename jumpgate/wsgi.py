@@ -20,10 +20,14 @@ def make_api(config_path=None):
 
     logger.info("PATH CONFIG %s "% os.path.isfile(virtualenv))
     config.PARSER.read(virtualenv)
+    if config_path:
+        # Overrides on top of the packaged defaults
+        config.PARSER.read(config_path)
     a = config.PARSER.options('softlayer')
     logger.info("Options %s"% a)
     app = Jumpgate()
     app.load_endpoints()
     app.load_drivers()
+    app.load_metrics()
 
     return app.make_api()